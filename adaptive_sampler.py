@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+
+"""
+Volatility-adaptive polling for the multi-pair tracker.
+
+Every pair gets a "heat" between 0 and 1 from how close its latest spreads
+are to the arbitrage threshold and how volatile those spreads have been.
+Hot pairs are polled close to the minimum interval and cold pairs close to
+the maximum one. Pairs are kept in a heap ordered by when they are next
+due. Each tick, the due pairs compete for a fixed request budget: the
+hottest go first, and pairs that are overdue gain priority so none starve.
+"""
+
+import heapq
+import math
+
+
+def spread_heat(finder):
+    """
+    Compute a pair's heat from its rolling spread statistics.
+
+    A series at or above the threshold has heat 1. Below it, the heat is the
+    larger of how close the spread is to the threshold (|spread| / threshold)
+    and how likely its recent volatility is to cover the remaining distance
+    (exp(-distance / std)).
+
+    Args:
+        finder (PriceDiscrepancyFinder): The pair's finder
+
+    Returns:
+        float: Heat between 0 and 1 (the hottest of the pair's spread series)
+    """
+    threshold = finder.threshold_percent
+    heat = 0.0
+    for stats in finder.spread_stats.stats.values():
+        last = stats.last
+        if last != last:
+            continue
+        spread = abs(last)
+        distance = threshold - spread
+        if distance <= 0:
+            return 1.0
+        std = stats.std
+        series_heat = spread / threshold
+        if std > 0:
+            series_heat = max(series_heat, math.exp(-distance / std))
+        if series_heat > heat:
+            heat = series_heat
+    return heat
+
+
+class AdaptiveSampler:
+    """Decides which pairs to check on each tick."""
+
+    def __init__(self, min_interval, max_interval, budget=None):
+        """
+        Initialize the sampler.
+
+        Args:
+            min_interval (float): Polling interval in seconds for the hottest pairs
+            max_interval (float): Polling interval in seconds for the coldest pairs
+            budget (int): Maximum number of pairs checked per tick (None for no limit)
+        """
+        if not 0 < min_interval <= max_interval:
+            raise ValueError("Sampler intervals must satisfy 0 < min_interval <= max_interval")
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.budget = budget
+        # pair id -> heat, next due time and number of checks
+        self.heat = {}
+        self.next_due = {}
+        self.samples = {}
+        self._heap = []
+        self._seq = 0
+
+    def _push(self, pair_id, due):
+        self.next_due[pair_id] = due
+        self._seq += 1
+        heapq.heappush(self._heap, (due, self._seq, pair_id))
+
+    def add(self, pair_id, now=0.0):
+        """Start sampling a pair; it is due immediately."""
+        self.heat.setdefault(pair_id, 0.0)
+        self.samples.setdefault(pair_id, 0)
+        self._push(pair_id, now)
+
+    def remove(self, pair_id):
+        """Stop sampling a pair. Its heap entry is discarded lazily."""
+        self.heat.pop(pair_id, None)
+        self.next_due.pop(pair_id, None)
+        self.samples.pop(pair_id, None)
+
+    def interval(self, pair_id):
+        """Return the current polling interval of a pair in seconds."""
+        heat = self.heat.get(pair_id, 0.0)
+        return self.max_interval - heat * (self.max_interval - self.min_interval)
+
+    def due(self, now):
+        """
+        Pop the pairs to check on this tick.
+
+        Args:
+            now (float): Current monotonic time
+
+        Returns:
+            list: Pair ids to check, hottest (and most overdue) first
+        """
+        heap = self._heap
+        candidates = []
+        while heap and heap[0][0] <= now:
+            due, _, pair_id = heapq.heappop(heap)
+            if self.next_due.get(pair_id) != due:
+                # Stale entry for a removed or rescheduled pair
+                continue
+            overdue = (now - due) / self.max_interval
+            candidates.append((self.heat[pair_id] + overdue, due, pair_id))
+
+        if self.budget is not None and len(candidates) > self.budget:
+            candidates.sort(reverse=True)
+            for _, due, pair_id in candidates[self.budget:]:
+                # Over budget: keep the original due time so the pair gains priority next tick
+                self._seq += 1
+                heapq.heappush(heap, (due, self._seq, pair_id))
+            candidates = candidates[:self.budget]
+
+        selected = []
+        for _, _, pair_id in candidates:
+            # Parked until record() reschedules it
+            self.next_due[pair_id] = None
+            selected.append(pair_id)
+        return selected
+
+    def record(self, pair_id, now, heat=None):
+        """
+        Reschedule a pair after a check.
+
+        Args:
+            pair_id (str): The pair id
+            now (float): Current monotonic time
+            heat (float): The pair's new heat (None keeps the previous heat)
+        """
+        if pair_id not in self.heat:
+            return
+        if heat is not None:
+            self.heat[pair_id] = heat
+        self.samples[pair_id] += 1
+        self._push(pair_id, now + self.interval(pair_id))
+
+    def stats(self):
+        """
+        Return sampling statistics.
+
+        Returns:
+            dict: pair id -> heat, current interval and number of checks
+        """
+        return {
+            pair_id: {
+                'heat': heat,
+                'interval': self.interval(pair_id),
+                'samples': self.samples[pair_id],
+            }
+            for pair_id, heat in self.heat.items()
+        }
@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+
+"""
+Historical backfill from exchange candle endpoints.
+
+Pulls candles for the configured pairs from Binance klines, Kraken OHLC and
+CoinGecko market_chart/range, aligns them on a common time grid (candle
+open times, floored to the interval) and writes them to the history store's
+'candles' table. Every (exchange, pair) runs as its own job on a thread pool;
+requests to each exchange go through a shared rate limiter, so hundreds of
+pairs are fetched concurrently without exceeding any exchange's limits.
+
+Progress is checkpointed per (exchange, pair, interval). Rows are buffered
+and a checkpoint only advances once its rows are on disk, so an interrupted
+backfill resumes where it stopped without duplicating candles.
+
+Exchange limits worth knowing:
+    Kraken OHLC only serves the most recent 720 candles of an interval.
+    CoinGecko has no OHLC at minute resolution; market_chart/range returns
+    ~5-minute points for ranges up to a day (fetched a day at a time) and
+    hourly points beyond that. Its points are bucketed onto the grid.
+
+Backfilled candles can seed the rolling spread statistics of a freshly
+started tracker (run.py --seed-history), so z-score alerting is not blind
+for its first hours.
+
+Usage:
+    python3 backfill.py -p BTC/USDT,ETH/USDT --days 14 --interval 1m
+"""
+
+import argparse
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from coingecko_utils import get_coingecko_coin_id, get_coingecko_currency
+from exchange_http import MarketDataClient, MarketDataError
+from history_store import HistoryStore
+from kraken_utils import get_kraken_asset_pair
+from quote import VENUE_BINANCE, VENUE_KRAKEN, VENUE_COINGECKO, VENUE_NAMES, VENUE_KEYS, NAN, make_pair_id, parse_pairs
+import history_store
+import json_utils
+import config
+
+logger = logging.getLogger(__name__)
+
+# Supported grid intervals in seconds, and the exchanges' names for them
+INTERVALS = {'1m': 60, '5m': 300, '15m': 900, '1h': 3600, '1d': 86400}
+KRAKEN_INTERVALS = {60: 1, 300: 5, 900: 15, 3600: 60, 86400: 1440}
+
+BINANCE_KLINE_LIMIT = 1000
+
+# CoinGecko returns ~5-minute points only for ranges of at most a day
+COINGECKO_FINE_WINDOW = 86400
+COINGECKO_COARSE_WINDOW = 90 * 86400
+
+CHECKPOINT_NAME = "backfill_checkpoints.json"
+
+# Requests per second per exchange
+DEFAULT_RATE_LIMITS = {"binance": 10.0, "kraken": 0.5, "coingecko": 0.2}
+
+MAX_ATTEMPTS = 4
+
+
+class RateLimiter:
+    """Token bucket shared by every thread calling one exchange."""
+
+    def __init__(self, rate, burst=1):
+        """
+        Initialize the limiter.
+
+        Args:
+            rate (float): Requests per second
+            burst (int): Requests that may be made back to back
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be made."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def align(ts, interval):
+    """Floor an epoch time to the grid."""
+    return math.floor(ts / interval) * interval
+
+
+def bucket_points(points, interval):
+    """
+    Turn (ts, price) points into one OHLC row per grid bucket.
+
+    Args:
+        points (list): (epoch seconds, price) in time order
+        interval (int): Grid interval in seconds
+
+    Returns:
+        list: (bucket ts, open, high, low, close, volume) rows; volume is NaN
+    """
+    rows = []
+    current = None
+    for ts, price in points:
+        bucket = align(ts, interval)
+        if current is not None and current[0] == bucket:
+            current[2] = max(current[2], price)
+            current[3] = min(current[3], price)
+            current[4] = price
+            continue
+        if current is not None:
+            rows.append(tuple(current))
+        current = [bucket, price, price, price, price, NAN]
+    if current is not None:
+        rows.append(tuple(current))
+    return rows
+
+
+class Backfill:
+    """Fetches candles for many (exchange, pair) jobs concurrently."""
+
+    def __init__(self, store=None, client=None, interval='1m', rate_limits=None, workers=8,
+                 segment_rows=history_store.DEFAULT_SEGMENT_ROWS):
+        """
+        Initialize the backfill.
+
+        Args:
+            store (HistoryStore): Destination (defaults to config.HISTORY_DIR)
+            client (MarketDataClient): HTTP client (a new one is created if omitted)
+            interval (str): Grid interval, a key of INTERVALS
+            rate_limits (dict): Exchange key -> requests per second
+            workers (int): Concurrent jobs
+            segment_rows (int): Rows buffered before a segment (and checkpoint) is written
+        """
+        if interval not in INTERVALS:
+            raise ValueError(f"Unsupported interval '{interval}', expected one of {', '.join(INTERVALS)}")
+        self.store = store or HistoryStore()
+        self.client = client or MarketDataClient(timeout=getattr(config, 'HTTP_TIMEOUT', 10))
+        self.interval_name = interval
+        self.interval = INTERVALS[interval]
+        limits = dict(DEFAULT_RATE_LIMITS)
+        limits.update(rate_limits or getattr(config, 'BACKFILL_RATE_LIMITS', {}))
+        self.limiters = {venue: RateLimiter(limits[key]) for venue, key in enumerate(VENUE_KEYS)}
+        self.workers = workers
+        self.segment_rows = segment_rows
+        self.checkpoint_path = os.path.join(self.store.root, CHECKPOINT_NAME)
+        self.checkpoints = self._load_checkpoints()
+        self._writer = self.store.writer('candles', f"backfill-{time.time_ns()}", segment_rows=2 ** 62)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.rows = 0
+
+    def _load_checkpoints(self):
+        try:
+            with open(self.checkpoint_path, 'rb') as f:
+                return json_utils.loads(f.read())
+        except FileNotFoundError:
+            return {}
+
+    def _save_checkpoints(self):
+        os.makedirs(self.store.root, exist_ok=True)
+        with open(f"{self.checkpoint_path}.tmp", 'wb') as f:
+            f.write(json_utils.dumps(self.checkpoints))
+        os.replace(f"{self.checkpoint_path}.tmp", self.checkpoint_path)
+
+    def checkpoint_key(self, venue, pair):
+        """Return the checkpoint key of an (exchange, pair) job."""
+        return f"{VENUE_KEYS[venue]}|{pair}|{self.interval_name}"
+
+    def _record(self, key, pair, venue, rows, progress):
+        """Buffer a window's rows; write a segment and advance checkpoints when the buffer is full."""
+        with self._lock:
+            writer = self._writer
+            interval = self.interval
+            for ts, open_, high, low, close, volume in rows:
+                writer.append(ts, pair, venue, interval, open_, high, low, close, volume)
+            self.rows += len(rows)
+            self._pending[key] = progress
+            if writer.rows >= self.segment_rows:
+                self._commit()
+
+    def _commit(self):
+        """Write buffered rows, then advance the checkpoints they cover (caller holds the lock)."""
+        self._writer.flush()
+        if self._pending:
+            self.checkpoints.update(self._pending)
+            self._pending = {}
+            self._save_checkpoints()
+
+    def _get(self, venue, path, params):
+        """GET an exchange endpoint under its rate limit, retrying transient failures."""
+        limiter = self.limiters[venue]
+        for attempt in range(MAX_ATTEMPTS):
+            limiter.acquire()
+            self.requests += 1
+            try:
+                return self.client.venue_json(venue, path, params)
+            except (MarketDataError, OSError, ValueError) as e:
+                if attempt == MAX_ATTEMPTS - 1:
+                    raise
+                # Rate-limit responses (HTTP 429/418) back off much longer than other failures
+                delay = 2 ** attempt * (15 if 'HTTP 4' in str(e) else 1)
+                logger.warning(f"{VENUE_NAMES[venue]} request failed ({e}); retrying in {delay}s")
+                time.sleep(delay)
+
+    def _binance_windows(self, market, start, end):
+        interval = self.interval
+        while start < end:
+            window_end = min(end, start + BINANCE_KLINE_LIMIT * interval)
+            klines = self._get(VENUE_BINANCE, "/api/v3/klines", {
+                'symbol': market,
+                'interval': self.interval_name,
+                'startTime': int(start * 1000),
+                'endTime': int(window_end * 1000) - 1,
+                'limit': BINANCE_KLINE_LIMIT,
+            })
+            rows = [(kline[0] / 1000.0, float(kline[1]), float(kline[2]), float(kline[3]),
+                     float(kline[4]), float(kline[5])) for kline in klines]
+            yield rows, window_end
+            start = window_end
+
+    def _kraken_windows(self, market, start, end):
+        # Kraken serves only the latest 720 candles, so one request covers whatever is available
+        result = self._get(VENUE_KRAKEN, "/0/public/OHLC", {
+            'pair': market,
+            'interval': KRAKEN_INTERVALS[self.interval],
+            'since': int(start) - 1,
+        })
+        if result.get('error'):
+            raise MarketDataError(f"Kraken API error: {result['error']}")
+        candles = next((value for name, value in result['result'].items() if name != 'last'), [])
+        rows = [(float(candle[0]), float(candle[1]), float(candle[2]), float(candle[3]),
+                 float(candle[4]), float(candle[6])) for candle in candles if start <= candle[0] < end]
+        if rows and rows[0][0] > start:
+            logger.info(f"Kraken history for {market} starts at {time.strftime('%Y-%m-%d %H:%M', time.localtime(rows[0][0]))} "
+                        f"(only the latest 720 candles are available)")
+        yield rows, end
+
+    def _coingecko_windows(self, market, start, end):
+        coin_id, currency = market
+        window = COINGECKO_FINE_WINDOW if self.interval < 3600 else COINGECKO_COARSE_WINDOW
+        while start < end:
+            window_end = min(end, start + window)
+            data = self._get(VENUE_COINGECKO, f"/api/v3/coins/{coin_id}/market_chart/range", {
+                'vs_currency': currency,
+                'from': int(start),
+                'to': int(window_end),
+            })
+            points = [(point[0] / 1000.0, point[1]) for point in data.get('prices', [])
+                      if start <= point[0] / 1000.0 < window_end]
+            yield bucket_points(points, self.interval), window_end
+            start = window_end
+
+    def jobs(self, pairs, start, end, venues=None):
+        """
+        Build one job per (exchange, pair), resuming from checkpoints.
+
+        Args:
+            pairs (list): (symbol, base_currency) tuples
+            start (float): Epoch time to backfill from
+            end (float): Epoch time to backfill to (exclusive; the unfinished candle is skipped)
+            venues (list): VENUE_* ids (defaults to the enabled exchanges)
+
+        Returns:
+            list: (venue, pair id, market, start, end) tuples with work left
+        """
+        if venues is None:
+            venues = [venue for venue, key in enumerate(VENUE_KEYS) if config.EXCHANGES.get(key)]
+        start = align(start, self.interval)
+        end = align(end, self.interval)
+        jobs = []
+        for symbol, base in pairs:
+            pair = make_pair_id(symbol, base)
+            for venue in venues:
+                if venue == VENUE_BINANCE:
+                    market = f"{symbol}{base}"
+                elif venue == VENUE_KRAKEN:
+                    market = get_kraken_asset_pair(symbol, base)
+                else:
+                    currency = get_coingecko_currency(base)
+                    # Stablecoin bases map to coin ids, which market_chart does not accept as a currency
+                    market = (get_coingecko_coin_id(symbol), 'usd' if currency != base.lower() else currency)
+                job_start = max(start, self.checkpoints.get(self.checkpoint_key(venue, pair), start))
+                if job_start < end:
+                    jobs.append((venue, pair, market, job_start, end))
+        return jobs
+
+    def _run_job(self, job):
+        venue, pair, market, start, end = job
+        windows = {
+            VENUE_BINANCE: self._binance_windows,
+            VENUE_KRAKEN: self._kraken_windows,
+            VENUE_COINGECKO: self._coingecko_windows,
+        }[venue]
+        key = self.checkpoint_key(venue, pair)
+        try:
+            for rows, progress in windows(market, start, end):
+                self._record(key, pair, venue, rows, progress)
+        except Exception as e:
+            logger.error(f"Backfill of {pair} from {VENUE_NAMES[venue]} stopped: {e}")
+            return False
+        logger.info(f"Backfilled {pair} from {VENUE_NAMES[venue]}")
+        return True
+
+    def run(self, pairs, start, end=None, venues=None):
+        """
+        Backfill candles for pairs between two times.
+
+        Args:
+            pairs (list): (symbol, base_currency) tuples
+            start (float): Epoch time to backfill from
+            end (float): Epoch time to backfill to (defaults to now)
+            venues (list): VENUE_* ids (defaults to the enabled exchanges)
+
+        Returns:
+            dict: Jobs run and failed, requests made and rows written
+        """
+        jobs = self.jobs(pairs, start, end if end is not None else time.time(), venues)
+        started = time.monotonic()
+        logger.info(f"Backfilling {len(jobs)} job(s) at {self.interval_name} resolution with {self.workers} worker(s)")
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="backfill") as executor:
+                outcomes = list(executor.map(self._run_job, jobs))
+        finally:
+            with self._lock:
+                self._commit()
+        elapsed = time.monotonic() - started
+        logger.info(f"Backfill wrote {self.rows} candles from {self.requests} requests in {elapsed:.1f} seconds")
+        return {'jobs': len(jobs), 'failed': outcomes.count(False),
+                'requests': self.requests, 'rows': self.rows}
+
+
+def seed_spread_stats(finder, store=None, interval='1m', since=None):
+    """
+    Feed backfilled candle closes into a finder's rolling spread statistics.
+
+    Series the finder already has statistics for (e.g., restored from a
+    state snapshot) are left alone.
+
+    Args:
+        finder (PriceDiscrepancyFinder): The finder to seed
+        store (HistoryStore): Source of candles (defaults to config.HISTORY_DIR)
+        interval (str): Candle interval to use, a key of INTERVALS
+        since (float): Only use candles at or after this epoch time
+
+    Returns:
+        int: Number of spread observations fed in
+    """
+    store = store or HistoryStore()
+    seconds = INTERVALS[interval]
+    columns, pairs = store.load('candles', pairs=[finder.pair_id], start=since,
+                                columns=('venue', 'interval', 'close'))
+    closes = {}
+    for ts, venue, candle_interval, close in zip(columns['ts'], columns['venue'],
+                                                 columns['interval'], columns['close']):
+        if candle_interval == seconds and close > 0:
+            closes.setdefault(ts, {})[venue] = close
+
+    registry = finder.spread_stats
+    seeded = set()
+    fresh = {}
+    observations = 0
+    for ts in sorted(closes):
+        prices = closes[ts]
+        venues = sorted(prices)
+        for i, venue1 in enumerate(venues):
+            for venue2 in venues[i + 1:]:
+                key = (finder.pair_id, venue1, venue2)
+                if key not in fresh:
+                    existing = registry.stats.get(key)
+                    fresh[key] = existing is None or existing.count == 0
+                if not fresh[key]:
+                    continue
+                price1, price2 = prices[venue1], prices[venue2]
+                diff_percent = abs(price1 - price2) / ((price1 + price2) / 2) * 100
+                registry.update(key, diff_percent if price1 >= price2 else -diff_percent)
+                seeded.add(key)
+                observations += 1
+    if observations:
+        logger.info(f"Seeded {len(seeded)} spread series for {finder.pair_id} with {observations} backfilled observations")
+    return observations
+
+
+def main():
+    """Parse command-line arguments and run the backfill."""
+    parser = argparse.ArgumentParser(
+        description="Backfill historical candles into the history store",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("-p", "--pairs", default=None,
+                        help="Comma-separated pairs (defaults to PAIRS, or SYMBOL/BASE_CURRENCY, in config.py)")
+    parser.add_argument("--days", type=float, default=7, help="How many days back to fetch")
+    parser.add_argument("--interval", choices=list(INTERVALS), default='1m', help="Candle interval")
+    parser.add_argument("--exchanges", default=None,
+                        help="Comma-separated exchanges (defaults to the enabled ones, e.g., binance,kraken)")
+    parser.add_argument("--history-dir", default=history_store.default_history_dir(), help="History store directory")
+    parser.add_argument("-j", "--workers", type=int, default=8, help="Concurrent (exchange, pair) jobs")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.pairs:
+        pairs = parse_pairs(args.pairs)
+    elif getattr(config, 'PAIRS', []):
+        pairs = parse_pairs(config.PAIRS)
+    else:
+        pairs = [(config.SYMBOL.upper(), config.BASE_CURRENCY.upper())]
+    venues = None
+    if args.exchanges:
+        try:
+            venues = [VENUE_KEYS.index(key.strip().lower()) for key in args.exchanges.split(',')]
+        except ValueError:
+            parser.error(f"Unknown exchange in --exchanges (expected {', '.join(VENUE_KEYS)})")
+
+    backfill = Backfill(HistoryStore(args.history_dir), interval=args.interval, workers=args.workers)
+    totals = backfill.run(pairs, time.time() - args.days * 86400, venues=venues)
+    print(f"Backfilled {totals['rows']} candles for {len(pairs)} pair(s) "
+          f"({totals['jobs'] - totals['failed']}/{totals['jobs']} jobs complete)")
+
+
+if __name__ == "__main__":
+    main()
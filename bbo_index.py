@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+
+"""
+Consolidated cross-venue top of book.
+
+A BBOIndex keeps the best bid and best ask of one pair across all venues
+in two heaps. A quote update pushes one entry per side (O(log venues)), and
+superseded entries are discarded lazily when they reach the top. The
+cross-venue opportunity is then a single comparison of the global best bid
+with the global best ask, instead of comparing every pair of venues.
+
+Venues that only publish a last price (e.g., CoinGecko) take part with
+that price on both sides.
+"""
+
+import heapq
+from quote import VENUE_NAMES
+
+
+class BBOIndex:
+    """Best bid and best ask across venues for one pair."""
+
+    __slots__ = ('pair', 'bids', 'asks', 'current', 'version')
+
+    def __init__(self, pair=None):
+        """
+        Initialize the index.
+
+        Args:
+            pair (str): The pair id (informational)
+        """
+        self.pair = pair
+        # Heap entries are (sort key, version, venue, price); bids are negated for a max-heap
+        self.bids = []
+        self.asks = []
+        # venue -> (bid, ask, version) for the venue's live quote
+        self.current = {}
+        self.version = 0
+
+    def __len__(self):
+        return len(self.current)
+
+    def update(self, venue, bid, ask):
+        """
+        Set a venue's bid and ask, replacing its previous quote.
+
+        Args:
+            venue (int): One of the VENUE_* identifiers
+            bid (float): Best bid on the venue
+            ask (float): Best ask on the venue
+        """
+        if not (bid > 0 and ask > 0):
+            self.remove(venue)
+            return
+        self.version += 1
+        version = self.version
+        self.current[venue] = (bid, ask, version)
+        heapq.heappush(self.bids, (-bid, version, venue, bid))
+        heapq.heappush(self.asks, (ask, version, venue, ask))
+        if len(self.bids) > 4 * len(self.current) + 8:
+            self._compact()
+
+    def update_quote(self, quote):
+        """
+        Update the index from a Quote.
+
+        Quotes without a book use their price on both sides.
+
+        Args:
+            quote (Quote): The venue's latest quote
+        """
+        bid = quote.bid
+        ask = quote.ask
+        if bid == bid and ask == ask:
+            self.update(quote.venue, bid, ask)
+        else:
+            price = quote.price
+            self.update(quote.venue, price, price)
+
+    def remove(self, venue):
+        """Drop a venue from the index (its heap entries are discarded lazily)."""
+        self.current.pop(venue, None)
+
+    def _compact(self):
+        """Rebuild both heaps from the live quotes, dropping superseded entries."""
+        self.bids = [(-bid, version, venue, bid) for venue, (bid, ask, version) in self.current.items()]
+        self.asks = [(ask, version, venue, ask) for venue, (bid, ask, version) in self.current.items()]
+        heapq.heapify(self.bids)
+        heapq.heapify(self.asks)
+
+    def _top(self, heap):
+        """Return the top live entry of a heap, popping superseded ones."""
+        current = self.current
+        while heap:
+            entry = heap[0]
+            live = current.get(entry[2])
+            if live is not None and live[2] == entry[1]:
+                return entry
+            heapq.heappop(heap)
+        return None
+
+    def best_bid(self):
+        """
+        Return the highest bid across venues.
+
+        Returns:
+            tuple or None: (price, venue)
+        """
+        entry = self._top(self.bids)
+        return (entry[3], entry[2]) if entry is not None else None
+
+    def best_ask(self):
+        """
+        Return the lowest ask across venues.
+
+        Returns:
+            tuple or None: (price, venue)
+        """
+        entry = self._top(self.asks)
+        return (entry[3], entry[2]) if entry is not None else None
+
+    def cross(self):
+        """
+        Compare the global best bid with the global best ask.
+
+        A positive spread means the market is crossed across venues: buying
+        at the best ask and selling at the best bid is profitable before
+        fees. When the same venue holds both the best bid and the best ask,
+        no pair of venues can be crossed.
+
+        Returns:
+            dict or None: Best bid/ask with their exchanges and the spread percentage,
+            or None if fewer than two venues are quoted
+        """
+        if len(self.current) < 2:
+            return None
+        bid = self._top(self.bids)
+        ask = self._top(self.asks)
+        bid_price, bid_venue = bid[3], bid[2]
+        ask_price, ask_venue = ask[3], ask[2]
+        spread_percent = (bid_price - ask_price) / ((bid_price + ask_price) / 2) * 100
+        return {
+            'best_bid': bid_price,
+            'best_bid_exchange': VENUE_NAMES[bid_venue],
+            'best_ask': ask_price,
+            'best_ask_exchange': VENUE_NAMES[ask_venue],
+            'spread_percent': spread_percent,
+            'crossed': spread_percent > 0 and bid_venue != ask_venue,
+        }
@@ -5,6 +5,8 @@ Utility functions for working with CoinGecko's API.
 CoinGecko uses specific coin IDs and currency formats that differ from other exchanges.
 """
 
+import time
+
 def get_coingecko_coin_id(symbol):
     """
     Convert a standard cryptocurrency symbol to CoinGecko's specific coin ID.
@@ -121,3 +123,34 @@ def parse_coingecko_price_data(price_data, coin_id, currency):
         return None
     except (KeyError, ValueError, TypeError):
         return None
+
+def parse_coingecko_quote(price_data, coin_id, currency):
+    """
+    Parse CoinGecko's simple/price response into quote fields.
+    
+    CoinGecko is a reference price source, so only the last price, the 24h
+    volume and the last-updated timestamp are available (when requested with
+    include_24hr_vol and include_last_updated_at).
+    
+    Args:
+        price_data (dict): The price data from CoinGecko's API
+        coin_id (str): The coin ID used in the request
+        currency (str): The currency used in the request
+        
+    Returns:
+        tuple or None: Quote.update() arguments (bid, ask, last, volume, exchange_ts, receive_ts),
+            or None if the price is unavailable
+    """
+    price = parse_coingecko_price_data(price_data, coin_id, currency)
+    if price is None:
+        return None
+    
+    coin_data = price_data[coin_id]
+    nan = float('nan')
+    try:
+        volume = float(coin_data.get(f"{currency}_24h_vol", nan))
+        exchange_ts = float(coin_data.get('last_updated_at', nan))
+    except (TypeError, ValueError):
+        volume = exchange_ts = nan
+    return (nan, nan, price, volume, exchange_ts, time.time())
+
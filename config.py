@@ -11,12 +11,43 @@ SYMBOL = "XRP"
 # Base currency for comparison
 BASE_CURRENCY = "USDT"
 
+# Pairs to track at the same time (e.g., ["BTC/USDT", "ETH/USDT"])
+# When empty, only SYMBOL/BASE_CURRENCY is tracked
+PAIRS = []
+
+# Maximum number of pairs checked at the same time
+MAX_CONCURRENT_PAIRS = 8
+
 # Minimum price difference percentage to log as a potential arbitrage opportunity
 THRESHOLD_PERCENT = 1.0
 
 # Time between price checks in seconds
 CHECK_INTERVAL = 60
 
+# Checks run on a fixed-rate schedule that does not drift with fetch time
+SCHEDULE_JITTER = 0.0  # Maximum random delay in seconds added to each check (does not accumulate)
+OVERRUN_POLICY = "skip"  # When a check takes longer than CHECK_INTERVAL: "skip" missed checks or "merge" them into one immediate check
+
+# Skip evaluating, logging and alerting for a pair when no exchange's price changed since its last check
+SKIP_UNCHANGED_QUOTES = True
+
+# Opportunity lifecycle
+# An opportunity opens when a spread reaches THRESHOLD_PERCENT and is logged once, then
+# reported again only when it grows or closes
+OPPORTUNITY_HYSTERESIS = 0.2  # Closes only after the spread falls below THRESHOLD_PERCENT * (1 - this)
+OPPORTUNITY_CLOSE_TICKS = 2  # Consecutive checks below the close level needed to close
+OPPORTUNITY_UPDATE_STEP = 0.25  # Report an update when the peak spread grows by this many percentage points
+OPPORTUNITY_UPDATE_INTERVAL = 300  # Report an update at least this often (seconds) while open
+
+# Adaptive sampling (continuous mode only)
+# When enabled, pairs whose spreads are close to the threshold or volatile are checked as often
+# as every SAMPLER_MIN_INTERVAL seconds, and quiet pairs as rarely as every CHECK_INTERVAL seconds
+ADAPTIVE_SAMPLING = False
+SAMPLER_MIN_INTERVAL = 10
+# Maximum number of pairs checked per SAMPLER_MIN_INTERVAL tick. None keeps the request rate
+# at roughly that of checking every pair each CHECK_INTERVAL.
+SAMPLER_BUDGET = None
+
 # Logging settings
 LOG_FILE = "arbitrage.log"
 LOG_LEVEL = "INFO"  # Options: DEBUG, INFO, WARNING, ERROR, CRITICAL
@@ -29,10 +60,49 @@ EXCHANGES = {
     "coingecko": True
 }
 
+# Market data backend for public price data
+# "http" uses the lightweight raw-HTTP adapters in exchange_http.py (no SDK clients are created)
+# "sdk" uses python-binance, krakenex and pycoingecko
+MARKET_DATA_BACKEND = "http"
+
+# Timeout in seconds for market data HTTP requests
+HTTP_TIMEOUT = 10
+
+# Latency budget in seconds for each exchange's price request (exchanges not listed use HTTP_TIMEOUT).
+# A request still running when its budget runs out is abandoned and the exchange is skipped for that check.
+VENUE_BUDGETS = {
+    "binance": 2.0,
+    "kraken": 3.0,
+    "coingecko": 5.0
+}
+
+# Hedged requests (HTTP backend): once a request has taken longer than the exchange's recent
+# HEDGE_QUANTILE latency, send a duplicate to an alternate host (Binance api1-api3) and use
+# whichever answers first
+HEDGE_REQUESTS = True
+HEDGE_QUANTILE = 0.95
+
 # Alert settings
 # Cooldown period between alerts in seconds (to avoid alert spam)
 ALERT_COOLDOWN = 300  # 5 minutes
 
+# Minimum spread percentage that triggers an alert under the fixed rule
+# (also used while z-score statistics are still warming up)
+ALERT_MIN_PERCENT = 1.0
+
+# Statistical alerting
+# When enabled, a spread alerts when it deviates from the rolling mean of its own
+# (pair, exchange pair) series by ZSCORE_THRESHOLD standard deviations
+ZSCORE_ALERTS = True
+ZSCORE_THRESHOLD = 4.0
+ZSCORE_MIN_SAMPLES = 30  # Observations needed before z-scores are used
+ZSCORE_MIN_SPREAD_PERCENT = 0.05  # Ignore deviations on spreads smaller than this
+
+# Rolling spread statistics
+SPREAD_EWMA_ALPHA = 0.05  # EWMA smoothing factor for the spread mean and variance
+SPREAD_QUANTILES = (0.5, 0.95, 0.99)  # Quantiles of the absolute spread to track
+SPREAD_QUANTILE_WINDOW = 1000  # Observations per quantile window
+
 # Enable different alert channels
 ENABLE_EMAIL_ALERTS = True
 ENABLE_SMS_ALERTS = False
@@ -65,6 +135,77 @@ WEBHOOK_HEADERS = {
     "Authorization": "Bearer your-token"
 }
 
+# Warm-start state snapshot
+# Resolved mappings, last quotes, alert cooldowns and spread statistics are saved here on exit
+# and loaded on startup. Set to None to disable.
+STATE_FILE = "tracker_state.json"
+STATE_MAX_AGE = 7 * 24 * 3600  # Ignore snapshots older than this many seconds
+
+# Local read API (serves the latest quotes, spreads, opportunities and health over HTTP)
+# Set READ_API_PORT to a port number to enable it
+READ_API_HOST = "127.0.0.1"
+READ_API_PORT = None
+
+# Local quote bus (publishes quotes, spreads and opportunity events to subscribers as they happen)
+# Set to a Unix socket path (e.g., "/tmp/arbitrage.sock") or "host:port" to enable it
+QUOTE_BUS_ADDRESS = None
+# Undelivered opportunity events after which a slow bus subscriber is disconnected
+QUOTE_BUS_MAX_PENDING_EVENTS = 10000
+
+# Live config reload
+# Path of a config file whose changes are applied while the tracker runs (e.g., "config.py").
+# Changed pairs, thresholds, intervals, exchanges and alert settings take effect on the next check.
+WATCH_CONFIG = None
+
+# Shared quote cache
+# Finders in the same process share one upstream request per (exchange, market) and reuse
+# its result for this many seconds. Keep it well below CHECK_INTERVAL. None disables it.
+QUOTE_CACHE_TTL = 1.0
+# Most (exchange, market) entries kept; the least recently used are evicted beyond this
+QUOTE_CACHE_MAX_ENTRIES = 10000
+
+# Recorded history (columnar segments written by log_importer.py and read by the analysis tools)
+HISTORY_DIR = "history"
+
+# Historical backfill (backfill.py)
+# Requests per second per exchange while backfilling candles
+BACKFILL_RATE_LIMITS = {
+    "binance": 10.0,
+    "kraken": 0.5,
+    "coingecko": 0.2
+}
+# Seed the rolling spread statistics of new series from backfilled candles on startup
+SEED_FROM_HISTORY = False
+SEED_HISTORY_INTERVAL = "1m"
+SEED_HISTORY_HOURS = 24
+
+# Recording (run.py --record-history): raw quotes plus rollups of prices and spreads (see rollups.py)
+RECORD_HISTORY = False
+ROLLUP_RESOLUTIONS = ["1m", "1h", "1d"]
+# Seconds between writes of recorded rows to the history store
+HISTORY_FLUSH_INTERVAL = 300
+# Flushes between merges of the recorder's small segments into larger ones (0 disables merging)
+HISTORY_COMPACT_FLUSHES = 12
+
+# Seconds between redraws of the terminal dashboard (run.py --dashboard, dashboard.py)
+DASHBOARD_REFRESH = 0.5
+
+# Memory budget for long runs (run.py --memory-limit, see memory_budget.py)
+# RSS ceiling in MB; above it the lowest-priority pairs are shed. None only measures memory.
+MEMORY_LIMIT_MB = None
+MEMORY_CHECK_INTERVAL = 60
+# Account memory per module with tracemalloc (adds overhead)
+MEMORY_TRACEMALLOC = False
+# Share of the pairs shed at a time, and the fewest pairs kept
+MEMORY_SHED_FRACTION = 0.1
+MEMORY_MIN_PAIRS = 1
+# Shed pairs are re-added one at a time once RSS is below this share of the ceiling
+MEMORY_RESUME_FRACTION = 0.7
+# Seconds between shedding or re-adding steps
+MEMORY_SHED_INTERVAL = 300
+# Opportunity events and alerts kept in memory for the run summary
+MAX_RECORDED_EVENTS = 10000
+
 # Advanced settings
 # Maximum number of consecutive errors before pausing
 MAX_ERRORS = 5
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+"""
+Live reload of config.py for the Cross-Exchange Price Discrepancy Finder.
+
+The watcher checks the config file's modification time and size once per
+tick. When the file changes it is re-executed, and only the settings whose
+values changed since the previous load are copied onto the `config` module
+and handed to the tracker, which applies them in place: pairs are added or
+removed, thresholds and intervals are updated, and venues are enabled or
+disabled without dropping the connections, caches and alert cooldowns of
+the pairs that did not change.
+"""
+
+import logging
+import os
+import runpy
+import config
+
+logger = logging.getLogger(__name__)
+
+
+def read_settings(path):
+    """
+    Execute a config file and return its settings.
+
+    Args:
+        path (str): Path to the config file
+
+    Returns:
+        dict: UPPERCASE setting name -> value
+    """
+    namespace = runpy.run_path(path)
+    return {key: value for key, value in namespace.items() if key.isupper()}
+
+
+class ConfigWatcher:
+    """Watches a config file and applies changed settings to a tracker."""
+
+    def __init__(self, path, tracker):
+        """
+        Initialize the watcher.
+
+        Settings overridden on the command line keep their override until
+        the same setting is edited in the file.
+
+        Args:
+            path (str): Path to the config file
+            tracker (MultiPairTracker): The tracker to apply changes to
+        """
+        self.path = path
+        self.tracker = tracker
+        self.reloads = 0
+        self._signature = self._stat()
+        try:
+            self._settings = read_settings(path)
+        except Exception as e:
+            logger.error(f"Error reading config file {path}: {e}")
+            self._settings = {}
+        logger.info(f"Watching {path} for configuration changes")
+
+    def _stat(self):
+        """Return the (mtime, size) signature of the config file, or None if it is missing."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def poll(self):
+        """
+        Reload the config file if it changed and apply the changed settings.
+
+        Returns:
+            dict: The changed settings (empty if nothing changed)
+        """
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return {}
+        self._signature = signature
+
+        try:
+            settings = read_settings(self.path)
+        except Exception as e:
+            # Keep running with the current settings until the file is fixed
+            logger.error(f"Ignoring invalid config file {self.path}: {e}")
+            return {}
+
+        previous = self._settings
+        changes = {}
+        for key, value in settings.items():
+            if key not in previous or previous[key] != value:
+                changes[key] = value
+        self._settings = settings
+        if not changes:
+            return {}
+
+        for key, value in changes.items():
+            if key == 'EXCHANGES':
+                # Update the shared dict in place; only venues edited in the file change
+                previous_exchanges = previous.get('EXCHANGES', {})
+                for venue, enabled in value.items():
+                    if previous_exchanges.get(venue) != enabled:
+                        config.EXCHANGES[venue] = enabled
+            else:
+                setattr(config, key, value)
+
+        self.reloads += 1
+        logger.info(f"Reloaded {self.path}: changed {', '.join(sorted(changes))}")
+        self.tracker.apply_config(changes)
+        return changes
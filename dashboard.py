@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+
+"""
+Live terminal dashboard for the tracker.
+
+Shows every tracked pair with its exchange prices, widest current spread
+and open opportunity, plus exchange health, in a `top`-style curses view.
+The view reads the tracker's in-memory snapshot (run.py --dashboard) or
+polls a running tracker's read API (dashboard.py --url).
+
+Only cells whose text changed since the previous frame are written, and
+curses sends only the changed characters to the terminal, so refreshing
+several times a second stays cheap over SSH with hundreds of pairs.
+
+Keys: s cycles the sort column, r reverses it, arrows and PgUp/PgDn
+scroll, q quits.
+
+Usage:
+    python3 run.py --pairs BTC/USDT,ETH/USDT --dashboard
+    python3 dashboard.py --url http://127.0.0.1:8765
+"""
+
+import argparse
+import curses
+import logging
+import time
+import requests
+from quote import VENUE_NAMES
+import json_utils
+import config
+
+logger = logging.getLogger(__name__)
+
+HEADER_LINES = 4
+
+# (title, width, right-aligned); the last column takes the remaining width
+COLUMNS = (
+    ("Pair", 14, False),
+    ("Status", 10, False),
+) + tuple((name, 14, True) for name in VENUE_NAMES) + (
+    ("Spread %", 9, True),
+    ("Exchanges", 20, False),
+    ("z", 6, True),
+    ("Opportunity", 0, False),
+)
+
+SORT_KEYS = ("spread", "pair", "status", "opportunity")
+
+# Pair status order when sorting by status (problems first)
+_STATUS_ORDER = {'error': 0, 'timeout': 1, 'insufficient_data': 2, 'paused': 3, 'pending': 4, 'ok': 5}
+
+
+def _format_duration(seconds):
+    seconds = int(max(0, seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+def _quote_price(quote):
+    if quote.get('last') is not None:
+        return quote['last']
+    if quote.get('bid') is not None and quote.get('ask') is not None:
+        return (quote['bid'] + quote['ask']) / 2
+    return None
+
+
+class SnapshotPoller:
+    """Fetches a tracker snapshot from the read API, reusing the last one while it is unchanged."""
+
+    def __init__(self, url, timeout=2.0):
+        """
+        Initialize the poller.
+
+        Args:
+            url (str): Read API base URL (e.g., http://127.0.0.1:8765)
+            timeout (float): Request timeout in seconds
+        """
+        self.url = url.rstrip('/') + '/snapshot'
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.snapshot = None
+        self.etag = None
+        self.error = None
+
+    def __call__(self):
+        """Return the latest snapshot (None until the first successful request)."""
+        headers = {'If-None-Match': self.etag} if self.etag else {}
+        try:
+            response = self.session.get(self.url, headers=headers, timeout=self.timeout)
+            if response.status_code == 200:
+                self.snapshot = json_utils.loads(response.content)
+                self.etag = response.headers.get('ETag')
+            elif response.status_code != 304:
+                raise ValueError(f"HTTP {response.status_code}")
+            self.error = None
+        except (requests.RequestException, ValueError) as e:
+            self.error = str(e)
+        return self.snapshot
+
+
+class Dashboard:
+    """Curses view of tracker snapshots."""
+
+    def __init__(self, source, refresh=0.5, threshold_percent=config.THRESHOLD_PERCENT, interval=None):
+        """
+        Initialize the dashboard.
+
+        Args:
+            source (callable): Returns the latest tracker snapshot (or None)
+            refresh (float): Seconds between redraws
+            threshold_percent (float): Spreads at or above this are highlighted
+            interval (float): The tracker's check interval in seconds; an exchange is shown as
+                stale after three intervals without a quote (defaults to config.CHECK_INTERVAL)
+        """
+        self.source = source
+        self.refresh = refresh
+        self.threshold_percent = threshold_percent
+        self.interval = getattr(config, 'CHECK_INTERVAL', 60) if interval is None else interval
+        self.sort_key = "spread"
+        self.reverse = False
+        self.offset = 0
+        self.screen = None
+        self.colors = {}
+        # (line, column) -> (text, attribute) currently on screen
+        self._cells = {}
+        self._lines = 0
+        self._rows = []
+
+    def run(self):
+        """Run until the user quits (restores the terminal on exit)."""
+        try:
+            curses.wrapper(self._main)
+        except KeyboardInterrupt:
+            pass
+
+    def _main(self, screen):
+        self.screen = screen
+        curses.curs_set(0)
+        screen.timeout(int(self.refresh * 1000))
+        if curses.has_colors():
+            curses.use_default_colors()
+            for index, color in enumerate((curses.COLOR_GREEN, curses.COLOR_YELLOW, curses.COLOR_RED), 1):
+                curses.init_pair(index, color, -1)
+            self.colors = {'ok': curses.color_pair(1), 'warn': curses.color_pair(2), 'bad': curses.color_pair(3)}
+        while True:
+            self.draw()
+            key = screen.getch()
+            if key in (ord('q'), ord('Q'), 27):
+                return
+            self.handle_key(key)
+
+    def handle_key(self, key):
+        """Apply a key press to the sort order or scroll position."""
+        height = self.screen.getmaxyx()[0] - HEADER_LINES
+        if key == ord('s'):
+            self.sort_key = SORT_KEYS[(SORT_KEYS.index(self.sort_key) + 1) % len(SORT_KEYS)]
+        elif key == ord('r'):
+            self.reverse = not self.reverse
+        elif key == curses.KEY_DOWN:
+            self.offset += 1
+        elif key == curses.KEY_UP:
+            self.offset -= 1
+        elif key == curses.KEY_NPAGE:
+            self.offset += height
+        elif key == curses.KEY_PPAGE:
+            self.offset -= height
+        elif key == curses.KEY_HOME:
+            self.offset = 0
+        elif key == curses.KEY_RESIZE:
+            # Everything has to be written again at the new size
+            self._cells.clear()
+            self.screen.erase()
+        self.offset = max(0, min(self.offset, len(self._rows) - height))
+
+    def build_rows(self, snapshot, now):
+        """
+        Turn a snapshot into sorted table rows.
+
+        Args:
+            snapshot (dict): A tracker snapshot (see MultiPairTracker.build_snapshot)
+            now (float): Current epoch time, for opportunity durations
+
+        Returns:
+            list: (cells, attributes) per pair, in display order
+        """
+        entries = []
+        for pair_id, pair in snapshot['pairs'].items():
+            prices = {quote['venue']: _quote_price(quote) for quote in pair['quotes']}
+            best = max(pair['spreads'], key=lambda spread: spread['diff_percent'], default=None)
+            opportunity = max(pair['opportunities'], key=lambda item: item['diff_percent'], default=None)
+            spread = best['diff_percent'] if best else None
+            cells = [pair_id, pair['status']]
+            cells += [f"{prices[name]:.8g}" if prices.get(name) is not None else "-" for name in VENUE_NAMES]
+            cells += [
+                f"{spread:.3f}" if spread is not None else "-",
+                "-".join(best['exchanges']) if best else "",
+                f"{best['zscore']:.1f}" if best and best.get('zscore') is not None else "",
+                (f"buy {opportunity['buy_exchange']} sell {opportunity['sell_exchange']} "
+                 f"{opportunity['diff_percent']:.2f}% for {_format_duration(now - opportunity['opened_at'])}"
+                 if opportunity else ""),
+            ]
+            attributes = [0] * len(cells)
+            attributes[1] = self.colors.get('ok' if pair['status'] == 'ok' else 'bad', 0)
+            if spread is not None and spread >= self.threshold_percent:
+                attributes[len(VENUE_NAMES) + 2] = self.colors.get('warn', curses.A_BOLD)
+            if opportunity:
+                attributes[-1] = self.colors.get('warn', curses.A_BOLD)
+            if self.sort_key == "spread":
+                sort_value = -spread if spread is not None else float('inf')
+            elif self.sort_key == "status":
+                sort_value = _STATUS_ORDER.get(pair['status'], len(_STATUS_ORDER))
+            elif self.sort_key == "opportunity":
+                sort_value = -opportunity['diff_percent'] if opportunity else float('inf')
+            else:
+                sort_value = 0
+            entries.append(((sort_value, pair_id), cells, attributes))
+        entries.sort(key=lambda entry: entry[0], reverse=self.reverse)
+        return [(cells, attributes) for _, cells, attributes in entries]
+
+    def header_lines(self, snapshot, now):
+        """Return the header as lines of (text, attribute) segments."""
+        if snapshot is None:
+            error = getattr(self.source, 'error', None)
+            return [[(f"Waiting for the first tracker snapshot{f' ({error})' if error else ''}...", 0)], [], []]
+        health = snapshot['health']
+        age = max(0.0, now - snapshot['generated_at'])
+        status_attr = self.colors.get({'ok': 'ok', 'degraded': 'warn'}.get(health['status'], 'bad'), 0)
+        first = [
+            (f"Tracker  tick {snapshot['tick']}  ", 0),
+            (health['status'], status_attr | curses.A_BOLD),
+            (f"  pairs {health['pairs_ok']}/{health['pairs_total']} ok  "
+             f"opportunities {len(snapshot['opportunities'])}  "
+             f"uptime {_format_duration(health['uptime_seconds'] + age)}  updated {age:.1f}s ago", 0),
+        ]
+        error = getattr(self.source, 'error', None)
+        if error:
+            first.append((f"  ({error})", self.colors.get('bad', 0)))
+        stale_after = 3 * self.interval
+        venues = [("Exchanges:", 0)]
+        for name in VENUE_NAMES:
+            venue = health['venues'].get(name)
+            if venue is None:
+                venues.append((f"  {name} no quotes", self.colors.get('bad', 0)))
+                continue
+            last_age = venue['last_quote_age_seconds'] + age
+            venues.append((f"  {name} {_format_duration(last_age)} ago",
+                           self.colors.get('ok' if last_age <= stale_after else 'bad', 0)))
+        order = " (reversed)" if self.reverse else ""
+        keys = [(f"Sort: {self.sort_key}{order}   [s]ort  [r]everse  arrows/PgUp/PgDn scroll  [q]uit", curses.A_DIM)]
+        return [first, venues, keys]
+
+    def _put(self, line, column, x, text, attribute, width):
+        """Write a cell if it differs from what is on screen."""
+        text = text[:width].ljust(width)
+        if self._cells.get((line, column)) == (text, attribute):
+            return
+        self._cells[(line, column)] = (text, attribute)
+        try:
+            self.screen.addstr(line, x, text, attribute)
+        except curses.error:
+            # Writing the bottom-right cell moves the cursor off screen
+            pass
+
+    def _put_segments(self, line, segments, width):
+        """Write a header line made of (text, attribute) segments if it changed."""
+        if self._cells.get((line, None)) == (segments, width):
+            return
+        self._cells[(line, None)] = (segments, width)
+        self.screen.move(line, 0)
+        self.screen.clrtoeol()
+        x = 0
+        for text, attribute in segments:
+            if x >= width - 1:
+                break
+            self.screen.addstr(line, x, text[:width - 1 - x], attribute)
+            x += len(text)
+
+    def draw(self):
+        """Draw one frame, writing only the cells that changed."""
+        height, width = self.screen.getmaxyx()
+        now = time.time()
+        snapshot = self.source()
+        if snapshot is not None:
+            # Rebuilt every frame so opportunity durations keep counting; unchanged cells are not redrawn
+            self._rows = self.build_rows(snapshot, now)
+            self.offset = max(0, min(self.offset, len(self._rows) - (height - HEADER_LINES)))
+
+        for line, segments in enumerate(self.header_lines(snapshot, now)[:HEADER_LINES - 1]):
+            if line < height:
+                self._put_segments(line, segments, width)
+
+        line = HEADER_LINES - 1
+        x = 0
+        widths = []
+        for title, column_width, right in COLUMNS:
+            column_width = column_width or max(0, width - x)
+            widths.append(column_width)
+            x += column_width + 1
+        if line < height:
+            self._put_line(line, [title for title, _, _ in COLUMNS], [curses.A_REVERSE] * len(COLUMNS), widths, width)
+
+        visible = self._rows[self.offset:self.offset + max(0, height - HEADER_LINES)]
+        for index, (cells, attributes) in enumerate(visible):
+            self._put_line(HEADER_LINES + index, cells, attributes, widths, width)
+        # Clear lines left over from a longer previous frame
+        for line in range(HEADER_LINES + len(visible), min(self._lines, height)):
+            self._put_line(line, [""] * len(COLUMNS), [0] * len(COLUMNS), widths, width)
+        self._lines = HEADER_LINES + len(visible)
+
+        self.screen.noutrefresh()
+        curses.doupdate()
+
+    def _put_line(self, line, cells, attributes, widths, width):
+        """Write a table line cell by cell."""
+        x = 0
+        for column, (text, attribute, column_width) in enumerate(zip(cells, attributes, widths)):
+            right = COLUMNS[column][2]
+            column_width = min(column_width, width - x)
+            if column_width <= 0:
+                break
+            text = text.rjust(column_width) if right else text
+            # The separating space is part of the cell so a narrower terminal still clears it
+            self._put(line, column, x, text + " ", attribute if text.strip() else 0,
+                      min(column_width + 1, width - x))
+            x += column_width + 1
+
+
+def main():
+    """Parse command-line arguments and show a running tracker's read API as a dashboard."""
+    parser = argparse.ArgumentParser(
+        description="Live terminal dashboard for a tracker started with run.py --serve-port",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("--url", default=f"http://127.0.0.1:{getattr(config, 'READ_API_PORT', None) or 8765}",
+                        help="Read API base URL")
+    parser.add_argument("--refresh", type=float, default=getattr(config, 'DASHBOARD_REFRESH', 0.5),
+                        help="Seconds between redraws")
+    parser.add_argument("-t", "--threshold", type=float, default=config.THRESHOLD_PERCENT,
+                        help="Highlight spreads at or above this percentage")
+    parser.add_argument("-i", "--interval", type=float, default=config.CHECK_INTERVAL,
+                        help="The tracker's check interval in seconds (exchanges are stale after three)")
+    args = parser.parse_args()
+
+    Dashboard(SnapshotPoller(args.url), refresh=args.refresh, threshold_percent=args.threshold,
+              interval=args.interval).run()
+
+
+if __name__ == "__main__":
+    main()
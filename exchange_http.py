@@ -0,0 +1,540 @@
+#!/usr/bin/env python3
+
+"""
+Lightweight read-only market data adapters built directly on HTTP.
+
+These talk to the public REST endpoints of Binance, Kraken and CoinGecko
+without going through the exchange SDKs. Responses are decoded with the
+fastest available JSON parser (see json_utils) and only the fields a Quote
+needs are converted to floats.
+
+Per-venue quote requests run under a latency budget: a request that has
+not answered when its budget runs out is abandoned and reported as an
+error, so one hung exchange cannot stall a tick. Once a request has taken
+longer than the venue's recently observed p95 latency, a hedged duplicate
+can be sent to an alternate host of the same API and the first response
+wins.
+
+Finders in one process share a single client (see get_market_data_client),
+so there is one connection pool per process, and latency statistics are
+kept per venue rather than per pair. Each venue has its own bounded request
+thread pool: abandoned requests to a hung venue keep their threads until
+the socket times out, and must not hold up requests to the other venues.
+"""
+
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import requests
+from requests.adapters import HTTPAdapter
+import json_utils
+from fixed_point import decimals_from_tick_size
+from kraken_utils import parse_kraken_quote
+from quote import VENUE_BINANCE, VENUE_KRAKEN, VENUE_COINGECKO, VENUE_NAMES, VENUE_KEYS, NAN
+import config
+
+logger = logging.getLogger(__name__)
+
+BINANCE_BASE_URL = "https://api.binance.com"
+KRAKEN_BASE_URL = "https://api.kraken.com"
+COINGECKO_BASE_URL = "https://api.coingecko.com"
+
+# Hosts serving each venue's public API, primary first. Hedged requests go to the alternates.
+VENUE_URLS = {
+    VENUE_BINANCE: (BINANCE_BASE_URL, "https://api1.binance.com", "https://api2.binance.com", "https://api3.binance.com"),
+    VENUE_KRAKEN: (KRAKEN_BASE_URL,),
+    VENUE_COINGECKO: (COINGECKO_BASE_URL,),
+}
+
+DEFAULT_TIMEOUT = 10
+
+# Observations a venue needs before its latency quantile is used to trigger hedged requests
+HEDGE_MIN_SAMPLES = 20
+
+
+class MarketDataError(Exception):
+    """Raised when an exchange returns an error payload or an unexpected response."""
+
+
+def binance_price_decimals(market):
+    """
+    Return the price decimals of a Binance exchangeInfo symbol entry.
+
+    Args:
+        market (dict): One entry of exchangeInfo's 'symbols' list
+
+    Returns:
+        int or None: Decimals implied by the PRICE_FILTER tick size, or None if it has none
+    """
+    for price_filter in market.get('filters', ()):
+        if price_filter.get('filterType') == 'PRICE_FILTER':
+            tick_size = price_filter.get('tickSize')
+            if tick_size and float(tick_size) > 0:
+                return decimals_from_tick_size(tick_size)
+    return None
+
+
+class LatencyTracker:
+    """Recent request latencies for one venue, updated by concurrent requests under `lock`."""
+
+    __slots__ = ('samples', 'requests', 'timeouts', 'hedges', 'hedge_wins', 'lock')
+
+    def __init__(self, window=200):
+        """
+        Initialize the tracker.
+
+        Args:
+            window (int): Number of recent latencies kept
+        """
+        self.samples = deque(maxlen=window)
+        self.requests = 0
+        self.timeouts = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.lock = threading.Lock()
+
+    def add(self, seconds):
+        """Record the latency of a completed (or timed-out) request."""
+        with self.lock:
+            self.samples.append(seconds)
+
+    def quantile(self, p):
+        """
+        Return the p-quantile of the recent latencies.
+
+        Returns:
+            float or None: The latency in seconds, or None if there are too few samples
+        """
+        with self.lock:
+            if len(self.samples) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+    def stats(self):
+        """
+        Return latency statistics.
+
+        Returns:
+            dict: Request, timeout and hedge counts plus p50/p95/p99 latency in seconds
+        """
+        with self.lock:
+            ordered = sorted(self.samples)
+        if ordered:
+            p50, p95, p99 = (ordered[min(len(ordered) - 1, int(len(ordered) * p))] for p in (0.5, 0.95, 0.99))
+        else:
+            p50 = p95 = p99 = None
+        return {
+            'requests': self.requests,
+            'timeouts': self.timeouts,
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'p50': p50,
+            'p95': p95,
+            'p99': p99,
+        }
+
+
+class MarketDataClient:
+    """
+    Public-endpoint market data client shared by all venues.
+
+    A single requests.Session is reused so that connections to each host
+    stay alive between ticks.
+    """
+
+    def __init__(self, session=None, timeout=DEFAULT_TIMEOUT, budgets=None, hedge=False, hedge_quantile=0.95,
+                 max_workers=4):
+        """
+        Initialize the client.
+
+        Args:
+            session (requests.Session): Session to reuse (a new one is created if omitted)
+            timeout (float): Request timeout in seconds
+            budgets (dict): VENUE_* id -> latency budget in seconds for quote requests
+                (venues without a budget use `timeout`)
+            hedge (bool): Send a duplicate request to an alternate host once a request
+                has outlived the venue's `hedge_quantile` latency
+            hedge_quantile (float): Latency quantile after which a request is hedged
+            max_workers (int): Size of each venue's request thread pool (and of the new
+                session's connection pool per host)
+        """
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=sum(len(hosts) for hosts in VENUE_URLS.values()),
+                                  pool_maxsize=max(10, max_workers))
+            session.mount('https://', adapter)
+        self.session = session
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.budgets = dict(budgets) if budgets else {}
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.latency = {venue: LatencyTracker() for venue in VENUE_URLS}
+        self._hedge_turns = itertools.count(1)
+        self._executors = {}
+        self._executor_lock = threading.Lock()
+
+    def get_json(self, url, params=None):
+        """
+        Perform a GET request and decode the JSON body.
+
+        Args:
+            url (str): The full endpoint URL
+            params (dict): Query string parameters
+
+        Returns:
+            The decoded JSON document
+        """
+        response = self.session.get(url, params=params, timeout=self.timeout)
+        if response.status_code != 200:
+            raise MarketDataError(f"HTTP {response.status_code} from {url}: {response.text[:200]}")
+        return json_utils.loads(response.content)
+
+    def _get_executor(self, venue):
+        """Return a venue's request thread pool, creating it on first use."""
+        with self._executor_lock:
+            executor = self._executors.get(venue)
+            if executor is None:
+                executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                              thread_name_prefix=f"market-data-{VENUE_KEYS[venue]}")
+                self._executors[venue] = executor
+            return executor
+
+    def _fetch(self, url, params, timeout):
+        """Perform one GET request with the given socket timeout and decode the JSON body."""
+        response = self.session.get(url, params=params, timeout=timeout)
+        if response.status_code != 200:
+            raise MarketDataError(f"HTTP {response.status_code} from {url}: {response.text[:200]}")
+        return json_utils.loads(response.content)
+
+    def venue_json(self, venue, path, params=None):
+        """
+        GET a venue endpoint within the venue's latency budget.
+
+        The request runs on a thread of the venue's own pool and is abandoned
+        when the budget runs out. With hedging enabled, a duplicate request goes to an
+        alternate host once the venue's observed latency quantile has passed
+        (or as soon as the first request fails), and the first successful
+        response wins.
+
+        Args:
+            venue (int): One of the VENUE_* identifiers
+            path (str): The endpoint path (e.g., '/api/v3/ticker/24hr')
+            params (dict): Query string parameters
+
+        Returns:
+            The decoded JSON document
+        """
+        hosts = VENUE_URLS[venue]
+        budget = self.budgets.get(venue, self.timeout)
+        latency = self.latency[venue]
+        with latency.lock:
+            latency.requests += 1
+
+        hedge_after = None
+        if self.hedge and len(hosts) > 1:
+            hedge_after = latency.quantile(self.hedge_quantile)
+
+        executor = self._get_executor(venue)
+        started = time.monotonic()
+        deadline = started + budget
+        primary = executor.submit(self._fetch, hosts[0] + path, params, budget)
+        pending = {primary}
+        hedged = False
+        error = None
+
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            timeout = deadline - now
+            if hedge_after is not None and not hedged:
+                timeout = min(timeout, max(0.0, started + hedge_after - now))
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                latency.add(time.monotonic() - started)
+                if future is not primary:
+                    with latency.lock:
+                        latency.hedge_wins += 1
+                return result
+
+            if hedge_after is not None and not hedged and (not pending or time.monotonic() >= started + hedge_after):
+                # Rotate through the alternate hosts so one slow alternate does not absorb every hedge
+                host = hosts[1 + next(self._hedge_turns) % (len(hosts) - 1)]
+                remaining = max(0.001, deadline - time.monotonic())
+                pending.add(executor.submit(self._fetch, host + path, params, remaining))
+                hedged = True
+                with latency.lock:
+                    latency.hedges += 1
+                logger.debug(f"Hedging {VENUE_NAMES[venue]} request to {host} after {time.monotonic() - started:.3f}s")
+            elif not pending:
+                raise error
+
+        # Count the abandoned request at its budget so the latency quantiles reflect it
+        latency.add(budget)
+        with latency.lock:
+            latency.timeouts += 1
+        raise MarketDataError(f"{VENUE_NAMES[venue]} request to {path} exceeded its {budget:g}s budget")
+
+    def close(self):
+        """Stop the request thread pools and close the session's connections."""
+        with self._executor_lock:
+            executors, self._executors = self._executors, {}
+        for executor in executors.values():
+            executor.shutdown(wait=False)
+        self.session.close()
+
+    def latency_stats(self):
+        """
+        Return request latency statistics per venue.
+
+        Returns:
+            dict: Venue name -> LatencyTracker.stats()
+        """
+        return {VENUE_NAMES[venue]: latency.stats() for venue, latency in self.latency.items()}
+
+    # Binance
+
+    def binance_quote(self, market):
+        """
+        Fetch Binance's 24h ticker for one market as quote fields.
+
+        Args:
+            market (str): The Binance symbol (e.g., 'XRPUSDT')
+
+        Returns:
+            tuple: Quote.update() arguments (bid, ask, last, volume, exchange_ts, receive_ts)
+        """
+        ticker = self.venue_json(VENUE_BINANCE, "/api/v3/ticker/24hr", {'symbol': market})
+        if 'code' in ticker:
+            raise MarketDataError(f"Binance API error: {ticker.get('msg')}")
+        return (
+            float(ticker['bidPrice']),
+            float(ticker['askPrice']),
+            float(ticker['lastPrice']),
+            float(ticker['volume']),
+            ticker['closeTime'] / 1000.0,
+            time.time()
+        )
+
+    def binance_quotes(self, batch, pair_ids=None):
+        """
+        Fill a QuoteBatch from Binance's all-symbol book ticker.
+
+        The book ticker is a fraction of the size of the all-symbol 24h
+        ticker and carries the bid/ask needed for spread comparison. The
+        last price is left as NaN, so Quote.price falls back to the midpoint.
+
+        Args:
+            batch (QuoteBatch): The batch to write into
+            pair_ids (dict): Maps Binance symbols to pair ids; other symbols are skipped.
+                If omitted, every symbol is written using the Binance symbol as pair id.
+
+        Returns:
+            int: The number of markets written
+        """
+        tickers = self.venue_json(VENUE_BINANCE, "/api/v3/ticker/bookTicker")
+        now = time.time()
+        written = 0
+        for ticker in tickers:
+            symbol = ticker['symbol']
+            if pair_ids is None:
+                pair = symbol
+            else:
+                pair = pair_ids.get(symbol)
+                if pair is None:
+                    continue
+            bid = float(ticker['bidPrice'])
+            ask = float(ticker['askPrice'])
+            if bid <= 0 or ask <= 0:
+                # Binance keeps delisted symbols in the list with zero prices
+                continue
+            batch.put(VENUE_BINANCE, pair, bid, ask, NAN, NAN, now, now)
+            written += 1
+        return written
+
+    def binance_markets(self):
+        """
+        Fetch Binance's tradable spot markets.
+
+        Returns:
+            list: (symbol, base_asset, quote_asset, price_decimals) tuples for markets currently trading
+                (price_decimals is None if the market has no price filter)
+        """
+        info = self.get_json(f"{BINANCE_BASE_URL}/api/v3/exchangeInfo", {'permissions': 'SPOT'})
+        return [
+            (market['symbol'], market['baseAsset'], market['quoteAsset'], binance_price_decimals(market))
+            for market in info['symbols']
+            if market.get('status') == 'TRADING'
+        ]
+
+    def binance_price_decimals(self, market):
+        """
+        Fetch the price decimals of one Binance market from its tick size.
+
+        Args:
+            market (str): The Binance symbol (e.g., 'XRPUSDT')
+
+        Returns:
+            int or None: The number of price decimals
+        """
+        info = self.get_json(f"{BINANCE_BASE_URL}/api/v3/exchangeInfo", {'symbol': market})
+        if 'code' in info:
+            raise MarketDataError(f"Binance API error: {info.get('msg')}")
+        return binance_price_decimals(info['symbols'][0])
+
+    # Kraken
+
+    def _kraken_result(self, method, params=None):
+        """Call a Kraken public method and return its result, raising on API errors."""
+        response = self.venue_json(VENUE_KRAKEN, f"/0/public/{method}", params)
+        if response.get('error'):
+            raise MarketDataError(f"Kraken API error: {response['error']}")
+        return response['result']
+
+    def kraken_quote(self, market):
+        """
+        Fetch Kraken's ticker for one market as quote fields.
+
+        Args:
+            market (str): The Kraken pair name (e.g., 'XRPUSDT')
+
+        Returns:
+            tuple: Quote.update() arguments (bid, ask, last, volume, exchange_ts, receive_ts)
+        """
+        result = self._kraken_result('Ticker', {'pair': market})
+        # Kraken may answer under a different key than the one requested; resolve it as the SDK backend does
+        fields = parse_kraken_quote({'result': result}, market)
+        if fields is None:
+            raise MarketDataError(f"Kraken returned no usable ticker for {market}")
+        return fields
+
+    def kraken_quotes(self, batch, pair_ids=None):
+        """
+        Fill a QuoteBatch from Kraken's all-pair ticker.
+
+        Args:
+            batch (QuoteBatch): The batch to write into
+            pair_ids (dict): Maps Kraken pair keys (as returned in the result) to pair ids;
+                other pairs are skipped. If omitted, every pair is written under its Kraken key.
+
+        Returns:
+            int: The number of markets written
+        """
+        result = self._kraken_result('Ticker')
+        now = time.time()
+        written = 0
+        for key, pair_data in result.items():
+            if pair_ids is None:
+                pair = key
+            else:
+                pair = pair_ids.get(key)
+                if pair is None:
+                    continue
+            batch.put(
+                VENUE_KRAKEN, pair,
+                float(pair_data['b'][0]),
+                float(pair_data['a'][0]),
+                float(pair_data['c'][0]),
+                float(pair_data['v'][1]),
+                now, now
+            )
+            written += 1
+        return written
+
+    def kraken_asset_pairs(self):
+        """
+        Fetch Kraken's tradable asset pairs.
+
+        Returns:
+            dict: Kraken's AssetPairs result keyed by pair name
+        """
+        return self._kraken_result('AssetPairs')
+
+    def kraken_price_decimals(self, market):
+        """
+        Fetch the price decimals of one Kraken pair.
+
+        Args:
+            market (str): The Kraken pair name (e.g., 'XRPUSDT')
+
+        Returns:
+            int or None: The number of price decimals
+        """
+        result = self._kraken_result('AssetPairs', {'pair': market})
+        if not result:
+            raise MarketDataError(f"Kraken returned no asset pair for {market}")
+        return next(iter(result.values())).get('pair_decimals')
+
+    # CoinGecko
+
+    def _coingecko_prices(self, coin_ids, currency):
+        """Fetch simple/price data for one or more coin ids."""
+        return self.venue_json(VENUE_COINGECKO, "/api/v3/simple/price", {
+            'ids': coin_ids,
+            'vs_currencies': currency,
+            'include_24hr_vol': 'true',
+            'include_last_updated_at': 'true',
+        })
+
+    def coingecko_quote(self, coin_id, currency):
+        """
+        Fetch CoinGecko's simple price for one coin as quote fields.
+
+        Args:
+            coin_id (str): The CoinGecko coin ID (e.g., 'ripple')
+            currency (str): The CoinGecko currency (e.g., 'usd')
+
+        Returns:
+            tuple or None: Quote.update() arguments (bid, ask, last, volume, exchange_ts, receive_ts),
+                or None if CoinGecko has no price for the currency
+        """
+        data = self._coingecko_prices(coin_id, currency).get(coin_id)
+        if not data or data.get(currency) is None:
+            return None
+        return (
+            NAN, NAN,
+            float(data[currency]),
+            float(data.get(f"{currency}_24h_vol") or NAN),
+            float(data.get('last_updated_at') or NAN),
+            time.time()
+        )
+
+
+_shared_client = None
+_shared_lock = threading.Lock()
+
+
+def get_market_data_client():
+    """
+    Return the process-wide market data client.
+
+    The client is created on first use, with request thread pools sized
+    for MAX_CONCURRENT_PAIRS checks of each venue and their hedges; later changes to
+    HTTP_TIMEOUT, VENUE_BUDGETS, HEDGE_REQUESTS and HEDGE_QUANTILE update it.
+
+    Returns:
+        MarketDataClient: The shared client
+    """
+    global _shared_client
+    timeout = getattr(config, 'HTTP_TIMEOUT', DEFAULT_TIMEOUT)
+    budgets = getattr(config, 'VENUE_BUDGETS', {})
+    with _shared_lock:
+        if _shared_client is None:
+            # One request per concurrent check, plus room for a hedged duplicate of each
+            max_workers = 2 * getattr(config, 'MAX_CONCURRENT_PAIRS', 8)
+            _shared_client = MarketDataClient(timeout=timeout, max_workers=max_workers)
+        _shared_client.timeout = timeout
+        _shared_client.budgets = {venue: budgets.get(key, timeout) for venue, key in enumerate(VENUE_KEYS)}
+        _shared_client.hedge = getattr(config, 'HEDGE_REQUESTS', False)
+        _shared_client.hedge_quantile = getattr(config, 'HEDGE_QUANTILE', 0.95)
+        return _shared_client
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+"""
+Fixed-point price helpers.
+
+Prices are represented as integer ticks: the price scaled by 10**decimals,
+where `decimals` comes from the market's tick size in exchange metadata
+(Binance PRICE_FILTER.tickSize, Kraken pair_decimals). Exchanges publish
+prices as decimal strings with at most that many decimals, so the tick
+value recovered from the parsed float is exact. Comparisons and spread
+numerators on ticks are therefore exact, ticks fit in int64 arrays, and
+prices can be logged at the market's own precision instead of a fixed
+two decimals.
+"""
+
+# 10**decimals for the precisions exchanges use
+SCALES = tuple(10 ** decimals for decimals in range(19))
+
+# Precision used when a market's tick size is unknown
+DEFAULT_DECIMALS = 8
+
+
+def decimals_from_tick_size(tick_size):
+    """
+    Return the number of decimals implied by a tick size.
+
+    Args:
+        tick_size (str or float): The tick size (e.g., '0.00010000' or 0.0001)
+
+    Returns:
+        int: Number of decimals (e.g., 4)
+    """
+    text = tick_size if isinstance(tick_size, str) else repr(float(tick_size))
+    if 'e' in text or 'E' in text:
+        text = f"{float(text):.18f}"
+    if '.' not in text:
+        return 0
+    return len(text.split('.', 1)[1].rstrip('0'))
+
+
+def format_ticks(ticks, decimals, min_decimals=None):
+    """
+    Format integer ticks as an exact decimal string.
+
+    Args:
+        ticks (int): The price in ticks
+        decimals (int): The market's price decimals
+        min_decimals (int): If given, trailing zeros are trimmed down to this many decimals
+
+    Returns:
+        str: The price with `decimals` decimals (fewer if trimmed)
+    """
+    sign = '-' if ticks < 0 else ''
+    whole, fraction = divmod(abs(ticks), SCALES[decimals])
+    if not decimals:
+        return f"{sign}{whole}"
+    digits = f"{fraction:0{decimals}d}"
+    if min_decimals is not None:
+        digits = digits.rstrip('0').ljust(min_decimals, '0')
+        if not digits:
+            return f"{sign}{whole}"
+    return f"{sign}{whole}.{digits}"
+
+
+def spread_percent_ticks(ticks1, decimals1, ticks2, decimals2):
+    """
+    Percentage difference between two prices given in ticks.
+
+    Uses the same definition as PriceDiscrepancyFinder.calculate_price_difference
+    (difference over the average price). Both prices are brought to the finer
+    precision first, so the numerator and denominator are exact integers.
+
+    Returns:
+        float or None: The percentage difference, or None if a price is missing
+    """
+    if ticks1 <= 0 or ticks2 <= 0:
+        return None
+    if decimals1 < decimals2:
+        ticks1 *= SCALES[decimals2 - decimals1]
+    elif decimals2 < decimals1:
+        ticks2 *= SCALES[decimals1 - decimals2]
+    return 200.0 * abs(ticks1 - ticks2) / (ticks1 + ticks2)
@@ -0,0 +1,504 @@
+#!/usr/bin/env python3
+
+"""
+Columnar on-disk store for recorded price history.
+
+Each table is a directory of immutable segment files. A segment holds up to
+a few hundred thousand rows as one contiguous array per column, so readers
+load a column with a single read and can hand it to NumPy without copying
+(numpy.frombuffer). Pair ids are dictionary-encoded per segment: the pair
+column stores small integer codes and the segment header lists the pairs.
+
+Segment layout:
+
+    MAGIC | u32 header length | JSON header | column 1 bytes | column 2 bytes | ...
+
+The header records the table, row count, column names and array typecodes,
+the pair dictionary, the byte order and the segment's time range, so scans
+can skip segments by time or pair without reading their columns.
+"""
+
+import logging
+import os
+import re
+import struct
+import sys
+from array import array
+import json_utils
+import config
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'ARBSEG1\n'
+_LENGTH = struct.Struct('<I')
+
+# Table name -> ((column name, array typecode), ...). Every table starts with
+# the row timestamp (epoch seconds) and the dictionary-encoded pair.
+TABLES = {
+    'quotes': (('ts', 'd'), ('pair', 'I'), ('venue', 'B'), ('price', 'd')),
+    'opportunities': (('ts', 'd'), ('pair', 'I'), ('buy_venue', 'B'), ('sell_venue', 'B'),
+                      ('buy_price', 'd'), ('sell_price', 'd'), ('percent', 'd')),
+    # Candles on a common grid: ts is the candle's open time, interval its length in seconds
+    'candles': (('ts', 'd'), ('pair', 'I'), ('venue', 'B'), ('interval', 'I'), ('open', 'd'),
+                ('high', 'd'), ('low', 'd'), ('close', 'd'), ('volume', 'd')),
+    # Rollups kept by the tracker (see rollups.py): ts is the period start, resolution its length in seconds
+    'quote_rollups': (('ts', 'd'), ('pair', 'I'), ('venue', 'B'), ('resolution', 'I'), ('open', 'd'),
+                      ('high', 'd'), ('low', 'd'), ('close', 'd'), ('mean', 'd'), ('count', 'I')),
+    'spread_rollups': (('ts', 'd'), ('pair', 'I'), ('venue_lo', 'B'), ('venue_hi', 'B'), ('resolution', 'I'),
+                       ('open', 'd'), ('high', 'd'), ('low', 'd'), ('close', 'd'), ('mean', 'd'), ('count', 'I')),
+}
+
+# Rows buffered per table before a segment is written
+DEFAULT_SEGMENT_ROWS = 500000
+
+_SOURCE_RE = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+def default_history_dir():
+    """Return the configured history directory."""
+    return getattr(config, 'HISTORY_DIR', 'history')
+
+
+class Segment:
+    """One segment's header and column arrays."""
+
+    __slots__ = ('path', 'table', 'rows', 'pairs', 'start', 'end', 'columns')
+
+    def __init__(self, path, header, columns):
+        self.path = path
+        self.table = header['table']
+        self.rows = header['rows']
+        self.pairs = header['pairs']
+        self.start = header['start']
+        self.end = header['end']
+        self.columns = columns
+
+    def pair_names(self):
+        """Decode the pair column into pair ids (allocates one reference per row)."""
+        pairs = self.pairs
+        return [pairs[code] for code in self.columns['pair']]
+
+
+def read_header(f):
+    """Read a segment header from an open binary file, leaving it positioned at the first column."""
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError(f"Not a history segment: {getattr(f, 'name', f)}")
+    (length,) = _LENGTH.unpack(f.read(_LENGTH.size))
+    return json_utils.loads(f.read(length))
+
+
+def read_segment(path, columns=None, header_only=False):
+    """
+    Read a segment file.
+
+    Args:
+        path (str): Path to the segment
+        columns (iterable): Column names to load (None for all)
+        header_only (bool): Skip the column data
+
+    Returns:
+        Segment: The segment (with an empty `columns` dict if header_only)
+    """
+    with open(path, 'rb') as f:
+        header = read_header(f)
+        loaded = {}
+        if not header_only:
+            swap = header['byteorder'] != sys.byteorder
+            for name, typecode in header['columns']:
+                values = array(typecode)
+                size = values.itemsize * header['rows']
+                if columns is not None and name not in columns:
+                    f.seek(size, os.SEEK_CUR)
+                    continue
+                values.frombytes(f.read(size))
+                if swap:
+                    values.byteswap()
+                loaded[name] = values
+    return Segment(path, header, loaded)
+
+
+def write_segment(path, table, pairs, columns, rows):
+    """
+    Write a segment file atomically.
+
+    Args:
+        path (str): Destination path
+        table (str): Table name
+        pairs (list): Pair dictionary (code -> pair id)
+        columns (list): (name, array) per column, in table order
+        rows (int): Number of rows
+    """
+    ts = columns[0][1]
+    header = {
+        'table': table,
+        'rows': rows,
+        'columns': [[name, values.typecode] for name, values in columns],
+        'pairs': pairs,
+        'byteorder': sys.byteorder,
+        'start': min(ts) if rows else None,
+        'end': max(ts) if rows else None,
+    }
+    header_bytes = json_utils.dumps(header)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(_LENGTH.pack(len(header_bytes)))
+        f.write(header_bytes)
+        for _, values in columns:
+            values.tofile(f)
+    os.replace(temp_path, path)
+
+
+class SegmentWriter:
+    """Buffers rows of one table in column arrays and writes them out as segments."""
+
+    def __init__(self, store, table, source, segment_rows=DEFAULT_SEGMENT_ROWS):
+        """
+        Initialize the writer.
+
+        Args:
+            store (HistoryStore): The store to write to
+            table (str): Table name (a key of TABLES)
+            source (str): Name identifying this writer's segments (e.g., the imported file)
+            segment_rows (int): Rows per segment
+        """
+        self.store = store
+        self.table = table
+        self.source = _SOURCE_RE.sub('_', source)
+        self.segment_rows = segment_rows
+        self.spec = TABLES[table]
+        self.sequence = 0
+        self.rows_written = 0
+        self.segments_written = 0
+        self._reset()
+
+    def _reset(self):
+        self.columns = [array(typecode) for _, typecode in self.spec]
+        self.pair_codes = {}
+        self.pairs = []
+        self.rows = 0
+        # Bound appends to the column arrays
+        self._append_ts = self.columns[0].append
+        self._append_pair = self.columns[1].append
+        self._append_values = [values.append for values in self.columns[2:]]
+
+    def pair_code(self, pair):
+        """Return the segment-local code for a pair id, adding it to the dictionary if needed."""
+        code = self.pair_codes.get(pair)
+        if code is None:
+            code = len(self.pairs)
+            self.pair_codes[pair] = code
+            self.pairs.append(pair)
+        return code
+
+    def append(self, ts, pair, *values):
+        """
+        Append one row.
+
+        Args:
+            ts (float): Row timestamp in epoch seconds
+            pair (str): Pair id
+            *values: The remaining columns, in table order
+        """
+        self._append_ts(ts)
+        code = self.pair_codes.get(pair)
+        self._append_pair(code if code is not None else self.pair_code(pair))
+        for append, value in zip(self._append_values, values):
+            append(value)
+        self.rows += 1
+        if self.rows >= self.segment_rows:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered rows as a segment."""
+        if not self.rows:
+            return
+        path = self.store.segment_path(self.table, self.source, self.sequence)
+        named = [(name, values) for (name, _), values in zip(self.spec, self.columns)]
+        write_segment(path, self.table, self.pairs, named, self.rows)
+        self.sequence += 1
+        self.rows_written += self.rows
+        self.segments_written += 1
+        self._reset()
+
+    def close(self):
+        """Flush the remaining rows."""
+        self.flush()
+
+    def compact(self, max_rows=DEFAULT_SEGMENT_ROWS):
+        """
+        Merge the small segments this writer has written so far (see HistoryStore.compact).
+
+        Returns:
+            int: The number of segment files removed
+        """
+        return self.store.compact(self.table, self.source, max_rows)
+
+
+class HistoryStore:
+    """A directory of columnar tables."""
+
+    def __init__(self, root=None):
+        """
+        Initialize the store.
+
+        Args:
+            root (str): Store directory (defaults to config.HISTORY_DIR)
+        """
+        self.root = root or default_history_dir()
+
+    def table_dir(self, table):
+        """Return (and create) a table's directory."""
+        path = os.path.join(self.root, table)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def segment_path(self, table, source, sequence):
+        """Return the path of a writer's segment."""
+        return os.path.join(self.table_dir(table), f"{source}.{sequence:05d}.seg")
+
+    def writer(self, table, source, segment_rows=DEFAULT_SEGMENT_ROWS):
+        """Return a SegmentWriter for a table."""
+        return SegmentWriter(self, table, source, segment_rows)
+
+    def segments(self, table, source=None):
+        """
+        List a table's segment files.
+
+        Args:
+            table (str): Table name
+            source (str): Only segments written under this source name (a prefix match)
+
+        Returns:
+            list: Segment paths in name order
+        """
+        directory = os.path.join(self.root, table)
+        if not os.path.isdir(directory):
+            return []
+        prefix = _SOURCE_RE.sub('_', source) + '.' if source is not None else ''
+        return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                      if name.endswith('.seg') and name.startswith(prefix))
+
+    def remove_source(self, table, source):
+        """Delete every segment a source wrote to a table; returns the number removed."""
+        paths = self.segments(table, source)
+        for path in paths:
+            os.remove(path)
+        return len(paths)
+
+    def compact(self, table, source, max_rows=DEFAULT_SEGMENT_ROWS):
+        """
+        Merge runs of a source's consecutive small segments.
+
+        Each run of segments totalling at most max_rows rows is rewritten as
+        one segment in place of the run's first segment, keeping row order,
+        and the rest of the run is deleted. The source's writer must not be
+        writing at the same time; pass a writer's own source (see
+        SegmentWriter.compact) for live writers.
+
+        Args:
+            table (str): Table name
+            source (str): Source name whose segments are merged
+            max_rows (int): Largest merged segment
+
+        Returns:
+            int: The number of segment files removed
+        """
+        runs = []
+        run = []
+        run_rows = 0
+        for path in self.segments(table, source):
+            rows = read_segment(path, header_only=True).rows
+            if run and run_rows + rows > max_rows:
+                runs.append(run)
+                run = []
+                run_rows = 0
+            run.append(path)
+            run_rows += rows
+        runs.append(run)
+
+        removed = 0
+        for run in runs:
+            if len(run) < 2:
+                continue
+            segments = [read_segment(path) for path in run]
+            pairs = []
+            pair_codes = {}
+            remaps = []
+            for segment in segments:
+                remap = []
+                for pair in segment.pairs:
+                    code = pair_codes.get(pair)
+                    if code is None:
+                        code = pair_codes[pair] = len(pairs)
+                        pairs.append(pair)
+                    remap.append(code)
+                remaps.append(remap)
+            columns = []
+            for name, typecode in TABLES[table]:
+                values = array(typecode)
+                for segment, remap in zip(segments, remaps):
+                    if name == 'pair':
+                        values.extend(remap[code] for code in segment.columns[name])
+                    else:
+                        values.extend(segment.columns[name])
+                columns.append((name, values))
+            write_segment(run[0], table, pairs, columns, sum(segment.rows for segment in segments))
+            for path in run[1:]:
+                os.remove(path)
+            removed += len(run) - 1
+        return removed
+
+    def scan(self, table, pairs=None, start=None, end=None, columns=None):
+        """
+        Iterate over a table's segments, skipping those outside the filters.
+
+        Rows inside a returned segment are not filtered; segments only
+        guarantee that some of their rows may match.
+
+        Args:
+            table (str): Table name
+            pairs (iterable): Only segments containing at least one of these pair ids
+            start (float): Only segments with rows at or after this epoch time
+            end (float): Only segments with rows before this epoch time
+            columns (iterable): Column names to load (None for all)
+
+        Yields:
+            Segment: Matching segments
+        """
+        wanted = set(pairs) if pairs is not None else None
+        for path in self.segments(table):
+            try:
+                header = read_segment(path, header_only=True)
+                if not header.rows:
+                    continue
+                if start is not None and header.end < start:
+                    continue
+                if end is not None and header.start >= end:
+                    continue
+                if wanted is not None and wanted.isdisjoint(header.pairs):
+                    continue
+                segment = read_segment(path, columns)
+            except FileNotFoundError:
+                # Merged into an earlier segment by compact() since the listing
+                continue
+            yield segment
+
+    def pairs(self, table):
+        """Return the sorted pair ids present in a table (reads headers only)."""
+        found = set()
+        for path in self.segments(table):
+            found.update(read_segment(path, header_only=True).pairs)
+        return sorted(found)
+
+    def load(self, table, pairs=None, start=None, end=None, columns=None):
+        """
+        Load matching rows of a table into single column arrays.
+
+        Rows are filtered by pair and time, and pair codes are re-encoded
+        against one dictionary for the whole result. Rows keep segment
+        order, which is not necessarily time order.
+
+        Args:
+            table (str): Table name
+            pairs (iterable): Pair ids to keep (None for all)
+            start (float): Keep rows at or after this epoch time
+            end (float): Keep rows before this epoch time
+            columns (iterable): Columns to load besides 'ts' and 'pair' (None for all)
+
+        Returns:
+            tuple: (dict of column name -> array, list of pair ids indexed by code)
+        """
+        spec = TABLES[table]
+        names = [name for name, _ in spec if columns is None or name in columns or name in ('ts', 'pair')]
+        typecodes = dict(spec)
+        result = {name: array(typecodes[name]) for name in names}
+        wanted = set(pairs) if pairs is not None else None
+        pair_ids = []
+        pair_codes = {}
+
+        for segment in self.scan(table, pairs, start, end, names):
+            remap = []
+            for pair in segment.pairs:
+                code = pair_codes.get(pair)
+                if code is None and (wanted is None or pair in wanted):
+                    code = len(pair_ids)
+                    pair_codes[pair] = code
+                    pair_ids.append(pair)
+                remap.append(code)
+            ts = segment.columns['ts']
+            pair_column = segment.columns['pair']
+            keep = [i for i in range(segment.rows)
+                    if remap[pair_column[i]] is not None
+                    and (start is None or ts[i] >= start)
+                    and (end is None or ts[i] < end)]
+            if len(keep) == segment.rows and remap == list(range(len(remap))):
+                for name in names:
+                    result[name].extend(segment.columns[name])
+                continue
+            for name in names:
+                values = segment.columns[name]
+                if name == 'pair':
+                    result[name].extend(remap[values[i]] for i in keep)
+                else:
+                    result[name].extend(values[i] for i in keep)
+        return result, pair_ids
+
+    def load_arrays(self, table, pairs=None, start=None, end=None, columns=None):
+        """
+        Load matching rows of a table as NumPy arrays.
+
+        Like load(), but pair remapping and row filtering are vectorized, so
+        this is the loader to use for large scans. Requires NumPy.
+
+        Args:
+            table (str): Table name
+            pairs (iterable): Pair ids to keep (None for all)
+            start (float): Keep rows at or after this epoch time
+            end (float): Keep rows before this epoch time
+            columns (iterable): Columns to load besides 'ts' and 'pair' (None for all)
+
+        Returns:
+            tuple: (dict of column name -> ndarray, list of pair ids indexed by code)
+        """
+        if np is None:
+            raise ImportError("NumPy is required to load history as arrays (pip install numpy)")
+        spec = TABLES[table]
+        names = [name for name, _ in spec if columns is None or name in columns or name in ('ts', 'pair')]
+        typecodes = dict(spec)
+        parts = {name: [] for name in names}
+        wanted = set(pairs) if pairs is not None else None
+        pair_ids = []
+        pair_codes = {}
+
+        for segment in self.scan(table, pairs, start, end, names):
+            remap = []
+            for pair in segment.pairs:
+                code = pair_codes.get(pair)
+                if code is None and (wanted is None or pair in wanted):
+                    code = len(pair_ids)
+                    pair_codes[pair] = code
+                    pair_ids.append(pair)
+                remap.append(-1 if code is None else code)
+            # Zero-copy views of the segment's column arrays
+            data = {name: np.frombuffer(segment.columns[name], dtype=typecodes[name]) for name in names}
+            codes = np.asarray(remap, dtype=np.int32)[data['pair']]
+            mask = codes >= 0
+            if start is not None:
+                mask &= data['ts'] >= start
+            if end is not None:
+                mask &= data['ts'] < end
+            data['pair'] = codes
+            for name in names:
+                parts[name].append(data[name][mask])
+
+        result = {
+            name: np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int32 if name == 'pair' else typecodes[name])
+            for name, chunks in parts.items()
+        }
+        return result, pair_ids
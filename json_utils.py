@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+
+"""
+Fast JSON encoding and decoding helpers.
+Uses orjson when it is installed and falls back to the standard library otherwise.
+"""
+
+try:
+    import orjson
+
+    BACKEND = "orjson"
+
+    def loads(data):
+        """Decode JSON from bytes or str."""
+        return orjson.loads(data)
+
+    def dumps(obj):
+        """Encode an object as compact JSON bytes."""
+        return orjson.dumps(obj)
+except ImportError:
+    import json
+
+    BACKEND = "json"
+
+    def loads(data):
+        """Decode JSON from bytes or str."""
+        return json.loads(data)
+
+    def dumps(obj):
+        """Encode an object as compact JSON bytes."""
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
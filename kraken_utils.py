@@ -5,6 +5,8 @@ Utility functions for working with Kraken's API.
 Kraken uses specific asset pair formatting that differs from other exchanges.
 """
 
+import time
+
 def get_kraken_asset_pair(symbol, base_currency):
     """
     Convert a standard symbol/base pair to Kraken's specific format.
@@ -102,26 +104,11 @@ def get_kraken_ticker_info(ticker_data, pair_name):
     Returns:
         dict: A dictionary with formatted ticker information
     """
-    if not ticker_data or 'result' not in ticker_data:
-        return None
-    
     # Kraken sometimes returns results with a different key than what was requested
-    # We need to find the actual key in the result
-    result = ticker_data['result']
-    if not result:
+    pair_data = _find_kraken_pair_data(ticker_data, pair_name)
+    if pair_data is None:
         return None
     
-    # If the exact pair name is in the result, use it
-    if pair_name in result:
-        pair_data = result[pair_name]
-    else:
-        # Otherwise, try to find the first (and hopefully only) key in the result
-        if len(result) > 0:
-            first_key = next(iter(result))
-            pair_data = result[first_key]
-        else:
-            return None
-    
     try:
         return {
             'last_price': float(pair_data['c'][0]),
@@ -134,4 +121,50 @@ def get_kraken_ticker_info(ticker_data, pair_name):
         }
     except (KeyError, IndexError, ValueError) as e:
         # If we can't parse the data properly, return None
-        return None 
\ No newline at end of file
+        return None
+
+def _find_kraken_pair_data(ticker_data, pair_name):
+    """Return the ticker entry for pair_name, tolerating Kraken's renamed result keys."""
+    if not ticker_data or 'result' not in ticker_data:
+        return None
+
+    result = ticker_data['result']
+    if not result:
+        return None
+
+    if pair_name in result:
+        return result[pair_name]
+    return next(iter(result.values()))
+
+def parse_kraken_quote(ticker_data, pair_name):
+    """
+    Parse Kraken's Ticker response into quote fields.
+    
+    Unlike get_kraken_ticker_info, this only converts the fields a Quote
+    carries and does not build an intermediate dictionary.
+    
+    Args:
+        ticker_data (dict): The ticker data from Kraken's API
+        pair_name (str): The pair name used in the request
+        
+    Returns:
+        tuple or None: Quote.update() arguments (bid, ask, last, volume, exchange_ts, receive_ts),
+            or None if the response could not be parsed
+    """
+    pair_data = _find_kraken_pair_data(ticker_data, pair_name)
+    if pair_data is None:
+        return None
+    
+    try:
+        # Kraken's public ticker carries no exchange timestamp, so receive time stands in for both
+        now = time.time()
+        return (
+            float(pair_data['b'][0]),
+            float(pair_data['a'][0]),
+            float(pair_data['c'][0]),
+            float(pair_data['v'][1]),
+            now,
+            now,
+        )
+    except (KeyError, IndexError, ValueError, TypeError):
+        return None
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+
+"""
+Exchange lead-lag analysis over recorded quote history.
+
+For every pair, each exchange's price series is resampled onto a common
+time grid (last price at or before each grid point) and turned into log
+returns. Lagged cross-correlations between every two exchanges are computed
+at once with FFTs: the series are cut into blocks, every block of every
+exchange is transformed in one batched rfft, and the cross-spectra of all
+exchange pairs are inverted in one batched irfft.
+
+The lag with the highest pooled correlation, refined between grid points by
+parabolic interpolation, is the lead-lag estimate. Confidence is reported
+two ways: the peak's z-score against uncorrelated returns, and the share of
+blocks whose own peak points the same way.
+
+Pairs are analyzed in parallel worker processes. Lags shorter than the
+grid step cannot be resolved; by default the step is the pair's median
+interval between recorded checks.
+
+Usage:
+    python3 lead_lag.py --days 7 -j 8
+"""
+
+import argparse
+import csv
+import logging
+import math
+import multiprocessing
+import os
+import sys
+import time
+import numpy as np
+from history_store import HistoryStore
+from quote import VENUE_NAMES
+import history_store
+
+logger = logging.getLogger(__name__)
+
+# Blocks the series are cut into; per-block peaks give the agreement measure
+DEFAULT_BLOCKS = 16
+
+# Grid points needed per block, as a multiple of the lag window
+MIN_BLOCK_LAGS = 4
+
+# Peaks below this z-score are shown without a leader
+MIN_ZSCORE = 3.0
+
+RESULT_FIELDS = ('pair', 'leader', 'follower', 'lag_ms', 'correlation', 'zero_lag_correlation', 'zscore',
+                 'agreement', 'samples', 'step_ms')
+
+
+def resample(ts, venue, price, step=None):
+    """
+    Resample one pair's quotes onto a common grid.
+
+    Args:
+        ts (ndarray): Quote timestamps, sorted within each venue
+        venue (ndarray): Venue ids
+        price (ndarray): Prices
+        step (float): Grid step in seconds (defaults to the median interval between checks)
+
+    Returns:
+        tuple: (venue ids, prices[venue, grid point], step), or None if fewer than two venues overlap
+    """
+    venues = [v for v in np.unique(venue) if np.count_nonzero(venue == v) > 1]
+    if len(venues) < 2:
+        return None
+    if step is None:
+        gaps = np.diff(np.unique(ts))
+        gaps = gaps[gaps > 0]
+        if not len(gaps):
+            return None
+        step = float(np.median(gaps))
+    series = [(ts[venue == v], price[venue == v]) for v in venues]
+    start = max(times[0] for times, _ in series)
+    end = min(times[-1] for times, _ in series)
+    if end <= start:
+        return None
+    grid = np.arange(start, end + step / 2, step)
+    prices = np.empty((len(venues), len(grid)))
+    for row, (times, values) in enumerate(series):
+        prices[row] = values[np.searchsorted(times, grid, side='right') - 1]
+    return np.asarray(venues), prices, step
+
+
+def cross_correlations(returns, first, second, max_lag, blocks):
+    """
+    Blocked FFT cross-correlation of several series pairs at once.
+
+    Args:
+        returns (ndarray): Returns[venue, grid point]
+        first (ndarray): Row of the first series of each pair
+        second (ndarray): Row of the second series of each pair
+        max_lag (int): Largest lag, in grid steps, in either direction
+        blocks (int): Number of blocks
+
+    Returns:
+        tuple: (pooled[pair, lag], per_block[pair, block, lag]) correlations for lags -max_lag..max_lag;
+        a positive lag means the first series moves after the second
+    """
+    length = returns.shape[1] // blocks
+    x = returns[:, :length * blocks].reshape(returns.shape[0], blocks, length)
+    x = x - x.mean(axis=2, keepdims=True)
+    nfft = 1 << (length + max_lag - 1).bit_length()
+    spectra = np.fft.rfft(x, nfft, axis=2)
+    # c[k] = sum_t a[t + k] * b[t], with negative lags wrapped to the end
+    cc = np.fft.irfft(spectra[first] * np.conj(spectra[second]), nfft, axis=2)
+    cc = cc[..., np.arange(-max_lag, max_lag + 1) % nfft]
+    energy = np.einsum('vbt,vbt->vb', x, x)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        per_block = cc / np.sqrt(energy[first] * energy[second])[..., None]
+        pooled = cc.sum(axis=1) / np.sqrt(energy[first].sum(axis=1) * energy[second].sum(axis=1))[:, None]
+    return pooled, per_block
+
+
+def peak_offset(values, index):
+    """Sub-step offset of a peak by parabolic interpolation of its neighbours."""
+    if index == 0 or index == len(values) - 1:
+        return 0.0
+    left, center, right = values[index - 1], values[index], values[index + 1]
+    curvature = left - 2 * center + right
+    if curvature >= 0:
+        return 0.0
+    return 0.5 * (left - right) / curvature
+
+
+def analyze_pair(pair, ts, venue, price, step=None, max_lag_seconds=30.0, blocks=DEFAULT_BLOCKS):
+    """
+    Estimate the lead-lag between every two exchanges quoting a pair.
+
+    Args:
+        pair (str): Pair id
+        ts (ndarray): Quote timestamps
+        venue (ndarray): Venue ids
+        price (ndarray): Prices
+        step (float): Grid step in seconds (defaults to the median interval between checks)
+        max_lag_seconds (float): Largest lead or lag considered
+        blocks (int): Number of blocks for the agreement measure
+
+    Returns:
+        list: Result dictionaries (see RESULT_FIELDS), one per exchange pair
+    """
+    order = np.lexsort((ts, venue))
+    resampled = resample(ts[order], venue[order], price[order], step)
+    if resampled is None:
+        return []
+    venues, prices, step = resampled
+    max_lag = max(1, int(round(max_lag_seconds / step)))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns = np.diff(np.log(prices), axis=1)
+    blocks = min(blocks, returns.shape[1] // (MIN_BLOCK_LAGS * max_lag))
+    if blocks < 1:
+        logger.debug(f"Not enough history for {pair} at a {step:g}s step")
+        return []
+
+    first, second = np.triu_indices(len(venues), 1)
+    pooled, per_block = cross_correlations(returns, first, second, max_lag, blocks)
+    samples = (returns.shape[1] // blocks) * blocks
+    results = []
+    for index in range(len(first)):
+        correlations = pooled[index]
+        if np.isnan(correlations).all():
+            continue
+        peak = int(np.nanargmax(correlations))
+        lag_steps = peak - max_lag + peak_offset(correlations, peak)
+        block_peaks = np.nanargmax(np.nan_to_num(per_block[index], nan=-np.inf), axis=1) - max_lag
+        agreement = float(np.mean(np.sign(block_peaks) == np.sign(peak - max_lag)))
+        # Positive lags mean the first exchange moves after the second
+        follower, leader = venues[first[index]], venues[second[index]]
+        if lag_steps < 0:
+            follower, leader = leader, follower
+        results.append({
+            'pair': pair,
+            'leader': VENUE_NAMES[leader],
+            'follower': VENUE_NAMES[follower],
+            'lag_ms': abs(lag_steps) * step * 1000,
+            'correlation': float(correlations[peak]),
+            'zero_lag_correlation': float(correlations[max_lag]),
+            'zscore': float(correlations[peak]) * math.sqrt(samples),
+            'agreement': agreement,
+            'samples': int(samples),
+            'step_ms': step * 1000,
+        })
+    return results
+
+
+def _analyze_task(arguments):
+    return analyze_pair(*arguments)
+
+
+def analyze(store, pairs=None, start=None, end=None, step=None, max_lag_seconds=30.0,
+            blocks=DEFAULT_BLOCKS, workers=None):
+    """
+    Run the lead-lag analysis for every pair with recorded quotes.
+
+    Args:
+        store (HistoryStore): Source of quote history
+        pairs (list): Pair ids to analyze (None for all)
+        start (float): Epoch time to start from
+        end (float): Epoch time to stop at
+        step (float): Grid step in seconds (defaults to each pair's median check interval)
+        max_lag_seconds (float): Largest lead or lag considered
+        blocks (int): Number of blocks for the agreement measure
+        workers (int): Worker processes (defaults to the CPU count)
+
+    Returns:
+        list: Result dictionaries ordered by pair
+    """
+    columns, pair_ids = store.load_arrays('quotes', pairs, start, end)
+    order = np.argsort(columns['pair'], kind='stable')
+    codes = columns['pair'][order]
+    bounds = np.searchsorted(codes, np.arange(len(pair_ids) + 1))
+    tasks = [
+        (pair_ids[code], columns['ts'][order[lo:hi]], columns['venue'][order[lo:hi]],
+         columns['price'][order[lo:hi]], step, max_lag_seconds, blocks)
+        for code, (lo, hi) in enumerate(zip(bounds[:-1], bounds[1:])) if hi > lo
+    ]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) <= 1:
+        outputs = map(_analyze_task, tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(min(workers, len(tasks)))
+        outputs = pool.imap(_analyze_task, tasks, chunksize=max(1, len(tasks) // (workers * 4)))
+    try:
+        results = [result for output in outputs for result in output]
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return sorted(results, key=lambda result: (result['pair'], result['leader'], result['follower']))
+
+
+def print_results(results):
+    """Print lead-lag results as a table."""
+    if not results:
+        print("No pair has enough overlapping price history from two exchanges")
+        return
+    print(f"{'Pair':<14} {'Leader':<10} {'Follower':<10} {'Lag ms':>10} {'Corr':>7} {'Corr@0':>7} "
+          f"{'z':>8} {'Agree':>6} {'Samples':>9}")
+    for result in results:
+        # No leader when the peak is within half a step of zero or not significant
+        significant = result['lag_ms'] >= result['step_ms'] / 2 and result['zscore'] >= MIN_ZSCORE
+        leader = result['leader'] if significant else "-"
+        print(f"{result['pair']:<14} {leader:<10} {result['follower'] if leader != '-' else '-':<10} "
+              f"{result['lag_ms']:>10.0f} {result['correlation']:>7.3f} {result['zero_lag_correlation']:>7.3f} "
+              f"{result['zscore']:>8.1f} {result['agreement'] * 100:>5.0f}% {result['samples']:>9}")
+
+
+def main():
+    """Parse command-line arguments and print the lead-lag estimates."""
+    parser = argparse.ArgumentParser(
+        description="Estimate which exchange leads price discovery for each pair",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("-p", "--pairs", default=None, help="Comma-separated pairs (defaults to all recorded pairs)")
+    parser.add_argument("--days", type=float, default=7, help="How many days back to analyze")
+    parser.add_argument("--step", type=float, default=None,
+                        help="Grid step in seconds (defaults to each pair's median check interval)")
+    parser.add_argument("--max-lag", type=float, default=30.0, help="Largest lead or lag considered, in seconds")
+    parser.add_argument("--blocks", type=int, default=DEFAULT_BLOCKS, help="Blocks for the agreement measure")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Worker processes (defaults to the CPU count)")
+    parser.add_argument("--csv", action="store_true", help="Print CSV instead of a table")
+    parser.add_argument("--history-dir", default=history_store.default_history_dir(), help="History store directory")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    pairs = [pair.strip().upper() for pair in args.pairs.split(',')] if args.pairs else None
+    started = time.monotonic()
+    results = analyze(HistoryStore(args.history_dir), pairs, start=time.time() - args.days * 86400,
+                      step=args.step, max_lag_seconds=args.max_lag, blocks=args.blocks, workers=args.workers)
+    logger.info(f"Analyzed {len({result['pair'] for result in results})} pair(s) "
+                f"in {time.monotonic() - started:.2f} seconds")
+    if args.csv:
+        writer = csv.DictWriter(sys.stdout, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+    else:
+        print_results(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,557 @@
+#!/usr/bin/env python3
+
+"""
+Bulk importer for existing arbitrage.log history.
+
+Parses the "Current prices" and "ARBITRAGE OPPORTUNITY" lines of tracker
+logs into the columnar history store (see history_store): one quote row
+per exchange price and one opportunity row per logged opportunity.
+
+Both log formats are understood:
+
+    [2025-03-18 00:41:19] Current prices - Binance: $2.336400, Kraken: $2.336730
+    [2025-03-18 00:41:19] Current prices for XRP/USDT - Binance: $2.3364, Kraken: $2.33673
+    ARBITRAGE OPPORTUNITY: Buy on Binance ($2.336400) and sell on Kraken ($2.365730) - Potential profit: 1.25%
+    ARBITRAGE OPPORTUNITY: XRP/USDT: Buy on Binance ($2.3364) and sell on Kraken ($2.36573) - Potential profit: 1.25%
+
+Older lines do not name the pair; it is taken from the most recent
+"Initialized price discrepancy finder for ..." or "Symbol:"/"Base currency:"
+startup lines, or from --pair. Row timestamps come from the logging prefix
+(local time, millisecond precision).
+
+Plain files are split into byte ranges and compressed files (.gz, .bz2,
+.xz) are handled one per task. Before a plain file is split, one
+sequential pass records the offset of every startup line and the pair it
+leaves in effect, so each range starts with the right pair. Tasks run in
+parallel across cores, stream their input in large buffered reads, and
+write a segment every segment-rows rows, so memory stays constant whatever
+the input size.
+Imported files are recorded in a manifest and skipped on later runs, unless
+they have grown since (including a live log rotated after its last import).
+
+Usage:
+    python3 log_importer.py arbitrage.log* /var/log/tracker/
+"""
+
+import argparse
+import bisect
+import bz2
+import glob
+import gzip
+import hashlib
+import logging
+import lzma
+import multiprocessing
+import os
+import re
+import time
+import history_store
+from history_store import HistoryStore
+from quote import VENUE_NAMES, make_pair_id
+import json_utils
+import config
+
+logger = logging.getLogger(__name__)
+
+# Plain files larger than this are split into byte ranges imported in parallel
+CHUNK_BYTES = 64 * 1024 * 1024
+
+READ_BUFFER = 1024 * 1024
+
+MANIFEST_NAME = "imports.json"
+
+_OPENERS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+
+_PREFIX = rb'^(\d{4}-\d\d-\d\d \d\d:\d\d):(\d\d)[,.](\d{3}) - \w+ - '
+PRICES_RE = re.compile(_PREFIX + rb'\[[^\]]*\] Current prices(?: for (\S+))? - (.*)$')
+PRICE_RE = re.compile(rb'(\w+): \$([0-9.eE+-]+)')
+OPPORTUNITY_RE = re.compile(
+    _PREFIX + rb'ARBITRAGE OPPORTUNITY: (?:(\S+): )?Buy on (\w+) \(\$([0-9.eE+-]+)\) '
+    rb'and sell on (\w+) \(\$([0-9.eE+-]+)\) - Potential profit: ([0-9.]+)%'
+)
+INIT_MARKER = b'Initialized price discrepancy finder for '
+SYMBOL_MARKER = b' - Symbol: '
+BASE_MARKER = b' - Base currency: '
+STARTUP_RE = re.compile(b'(?:' + b'|'.join(re.escape(marker) for marker in (INIT_MARKER, SYMBOL_MARKER, BASE_MARKER))
+                        + rb')[^\r\n]*')
+
+_VENUES = {name.encode(): venue for venue, name in enumerate(VENUE_NAMES)}
+
+
+def open_log(path):
+    """Open a log file for binary reading, decompressing by extension."""
+    opener = _OPENERS.get(os.path.splitext(path)[1].lower())
+    if opener is None:
+        return open(path, 'rb', buffering=READ_BUFFER)
+    return opener(path, 'rb')
+
+
+def is_compressed(path):
+    """Return True if the file is decompressed on read."""
+    return os.path.splitext(path)[1].lower() in _OPENERS
+
+
+def fingerprint(path):
+    """
+    Identify a log by its first line.
+
+    The first line (with its millisecond timestamp) survives rotation,
+    renaming and compression, so a rotated copy of an imported log is
+    recognised as the same file.
+
+    Returns:
+        str: A short hex digest, or None for an empty file
+    """
+    with open_log(path) as f:
+        first = f.readline(64 * 1024)
+    if not first:
+        return None
+    return hashlib.sha1(first.rstrip(b'\r\n')).hexdigest()[:16]
+
+
+def stream_length(path):
+    """Return the number of bytes read from a log: its size, or its decompressed size."""
+    if not is_compressed(path):
+        return os.path.getsize(path)
+    length = 0
+    with open_log(path) as f:
+        for block in iter(lambda: f.read(READ_BUFFER), b''):
+            length += len(block)
+    return length
+
+
+def expand_inputs(inputs):
+    """
+    Expand files, directories and glob patterns into log paths.
+
+    Directories contribute their arbitrage.log* files (or config.LOG_FILE's
+    name), including rotated and compressed ones.
+
+    Returns:
+        list: Sorted, de-duplicated file paths
+    """
+    log_name = os.path.basename(getattr(config, 'LOG_FILE', 'arbitrage.log'))
+    paths = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.update(glob.glob(os.path.join(item, f"{glob.escape(log_name)}*")))
+        elif any(char in item for char in '*?['):
+            paths.update(glob.glob(item))
+        else:
+            paths.add(item)
+    return sorted(path for path in paths if os.path.isfile(path) and not path.endswith('.tmp'))
+
+
+def plan_tasks(path, source, chunk_bytes=CHUNK_BYTES):
+    """
+    Split one file into import tasks.
+
+    Returns:
+        list: (path, start, end, source, pair) per task; end is None for the whole file,
+            and pair is the pair in effect at start (None if no startup line precedes it)
+    """
+    if is_compressed(path):
+        return [(path, 0, None, f"{source}-0000", None)]
+    size = os.path.getsize(path)
+    starts = range(0, max(size, 1), chunk_bytes)
+    contexts = startup_contexts(path) if len(starts) > 1 else ([], [])
+    tasks = []
+    for index, start in enumerate(starts):
+        end = min(start + chunk_bytes, size)
+        tasks.append((path, start, end, f"{source}-{index:04d}", pair_at(contexts, start)))
+    return tasks
+
+
+def _context_pair(line):
+    """Return (kind, value) for a startup line that identifies the pair, or None."""
+    index = line.find(INIT_MARKER)
+    if index >= 0:
+        return 'pair', line[index + len(INIT_MARKER):].split()[0]
+    index = line.find(SYMBOL_MARKER)
+    if index >= 0:
+        return 'symbol', line[index + len(SYMBOL_MARKER):].strip()
+    index = line.find(BASE_MARKER)
+    if index >= 0:
+        return 'base', line[index + len(BASE_MARKER):].strip()
+    return None
+
+
+def startup_contexts(path, block=READ_BUFFER):
+    """
+    Record where a plain log's startup lines change the pair.
+
+    One sequential pass over the file that only looks for the startup
+    markers, so each byte range can look up its starting pair instead of
+    searching backwards from its offset.
+
+    Returns:
+        tuple: (offsets, pairs) lists; pairs[i] is in effect for lines starting after offsets[i]
+    """
+    offsets = []
+    pairs = []
+    pair = symbol = None
+    with open(path, 'rb', buffering=0) as f:
+        position = 0
+        tail = b''
+        while True:
+            data = f.read(block)
+            buffer = tail + data
+            # Only whole lines are scanned; the last partial line waits for the next block
+            cut = len(buffer) if not data else buffer.rfind(b'\n') + 1
+            for match in STARTUP_RE.finditer(buffer, 0, cut):
+                kind, value = _context_pair(match.group())
+                value = value.decode('utf-8', 'replace')
+                if kind == 'pair':
+                    pair = value
+                elif kind == 'symbol':
+                    symbol = value
+                    continue
+                elif symbol is not None:
+                    pair = make_pair_id(symbol, value)
+                    symbol = None
+                else:
+                    continue
+                offsets.append(position + buffer.rfind(b'\n', 0, match.start()) + 1)
+                pairs.append(pair)
+            if not data:
+                return offsets, pairs
+            position += cut
+            tail = buffer[cut:]
+
+
+def pair_at(contexts, offset):
+    """
+    Return the pair in effect for lines starting at or after a byte offset.
+
+    Args:
+        contexts (tuple): (offsets, pairs) from startup_contexts
+        offset (int): Byte offset in the file
+
+    Returns:
+        str or None: The pair id, or None if no startup line starts before the offset
+    """
+    offsets, pairs = contexts
+    index = bisect.bisect_left(offsets, offset)
+    return pairs[index - 1] if index else None
+
+
+class _Timestamps:
+    """Converts logging timestamps to epoch seconds, caching the conversion per minute."""
+
+    def __init__(self):
+        self.minutes = {}
+
+    def __call__(self, minute, seconds, millis):
+        base = self.minutes.get(minute)
+        if base is None:
+            if len(self.minutes) >= 10000:
+                self.minutes.clear()
+            base = time.mktime(time.strptime(minute.decode(), "%Y-%m-%d %H:%M"))
+            self.minutes[minute] = base
+        return base + int(seconds) + int(millis) / 1000.0
+
+
+class _LineParser:
+    """Parses log lines into quote and opportunity rows, following the pair set by startup lines."""
+
+    def __init__(self, pair, append_quote, append_opportunity):
+        """
+        Initialize the parser.
+
+        Args:
+            pair (str): Pair for old-format lines until a startup line names one (may be None)
+            append_quote (callable): Receives (ts, pair, venue, price) per quote row
+            append_opportunity (callable): Receives (ts, pair, buy_venue, sell_venue, buy_price,
+                sell_price, percent) per opportunity row
+        """
+        self.pair = pair
+        self.symbol = None
+        self.append_quote = append_quote
+        self.append_opportunity = append_opportunity
+        self.timestamps = _Timestamps()
+        self.lines = 0
+        self.skipped = 0
+
+    def feed(self, f, start=0, end=None):
+        """
+        Parse the lines of an open log that start inside a byte range.
+
+        Args:
+            f (file): The log, opened with open_log
+            start (int): Byte offset of the range
+            end (int): Byte offset the range ends before (None for the end of the file)
+        """
+        count = 0
+        prices = self.prices
+        opportunity = self.opportunity
+        context = self.context
+        position = start
+        if start > 0:
+            # Resume at the first line that starts inside this range
+            f.seek(start - 1)
+            position = start - 1 + len(f.readline())
+        for line in f:
+            if end is not None and position >= end:
+                break
+            position += len(line)
+            count += 1
+            if b'Current prices' in line:
+                prices(line)
+            elif b'ARBITRAGE OPPORTUNITY' in line:
+                opportunity(line)
+            elif b' - INFO - ' in line:
+                context(line)
+        self.lines += count
+
+    def prices(self, line):
+        """Append one quote row per known exchange in a "Current prices" line."""
+        match = PRICES_RE.match(line.rstrip(b'\r\n'))
+        if match is None:
+            return
+        minute, seconds, millis, line_pair, rest = match.groups()
+        line_pair = line_pair.decode('utf-8', 'replace') if line_pair else self.pair
+        if line_pair is None:
+            self.skipped += 1
+            return
+        ts = self.timestamps(minute, seconds, millis)
+        for name, price in PRICE_RE.findall(rest):
+            venue = _VENUES.get(name)
+            if venue is not None:
+                self.append_quote(ts, line_pair, venue, float(price))
+
+    def opportunity(self, line):
+        """Append the opportunity row of an "ARBITRAGE OPPORTUNITY" line."""
+        match = OPPORTUNITY_RE.match(line)
+        if match is None:
+            return
+        (minute, seconds, millis, line_pair, buy_name, buy_price,
+         sell_name, sell_price, percent) = match.groups()
+        line_pair = line_pair.decode('utf-8', 'replace') if line_pair else self.pair
+        buy_venue = _VENUES.get(buy_name)
+        sell_venue = _VENUES.get(sell_name)
+        if line_pair is None or buy_venue is None or sell_venue is None:
+            self.skipped += 1
+            return
+        self.append_opportunity(self.timestamps(minute, seconds, millis), line_pair, buy_venue, sell_venue,
+                                float(buy_price), float(sell_price), float(percent))
+
+    def context(self, line):
+        """Follow the pair named by a startup line."""
+        context = _context_pair(line)
+        if context is None:
+            return
+        kind, value = context
+        value = value.decode('utf-8', 'replace')
+        if kind == 'pair':
+            self.pair = value
+        elif kind == 'symbol':
+            self.symbol = value
+        elif self.symbol is not None:
+            self.pair = make_pair_id(self.symbol, value)
+            self.symbol = None
+
+
+def import_range(task, store_root, default_pair=None, segment_rows=history_store.DEFAULT_SEGMENT_ROWS):
+    """
+    Import one task's byte range of a log file.
+
+    Args:
+        task (tuple): (path, start, end, source, pair) from plan_tasks
+        store_root (str): History store directory
+        default_pair (str): Pair for old-format lines before any startup line
+        segment_rows (int): Rows per written segment
+
+    Returns:
+        dict: Line, quote, opportunity and segment counts
+    """
+    path, start, end, source, pair = task
+    store = HistoryStore(store_root)
+    quotes = store.writer('quotes', source, segment_rows)
+    opportunities = store.writer('opportunities', source, segment_rows)
+    parser = _LineParser(pair or default_pair, quotes.append, opportunities.append)
+    with open_log(path) as f:
+        parser.feed(f, start, end)
+
+    quotes.close()
+    opportunities.close()
+    return {
+        'lines': parser.lines,
+        'quotes': quotes.rows_written,
+        'opportunities': opportunities.rows_written,
+        'segments': quotes.segments_written + opportunities.segments_written,
+        'skipped': parser.skipped,
+    }
+
+
+def _run_task(arguments):
+    task, store_root, default_pair, segment_rows = arguments
+    return task, import_range(task, store_root, default_pair, segment_rows)
+
+
+def load_manifest(store):
+    """Load the store's import manifest (fingerprint -> file details)."""
+    try:
+        with open(os.path.join(store.root, MANIFEST_NAME), 'rb') as f:
+            return json_utils.loads(f.read())
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(store, manifest):
+    """Write the import manifest atomically."""
+    os.makedirs(store.root, exist_ok=True)
+    path = os.path.join(store.root, MANIFEST_NAME)
+    with open(f"{path}.tmp", 'wb') as f:
+        f.write(json_utils.dumps(manifest))
+    os.replace(f"{path}.tmp", path)
+
+
+def manifest_entry(path, previous=None):
+    """
+    Build a file's manifest entry, or decide it needs no import.
+
+    Args:
+        path (str): The log file
+        previous (dict): The manifest entry recorded for the file's fingerprint, if any
+
+    Returns:
+        dict or None: The new entry, or None if the file was already imported as it is
+    """
+    stat = os.stat(path)
+    entry = {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if previous is not None and previous['path'] == entry['path']:
+        if previous['size'] == entry['size'] and previous['mtime_ns'] == entry['mtime_ns']:
+            logger.info(f"Skipping {path}: unchanged since the last import")
+            return None
+    entry['length'] = stream_length(path)
+    if previous is not None and previous['path'] != entry['path']:
+        # Entries written before lengths were recorded only have the file size
+        if entry['length'] <= previous.get('length', previous['size']):
+            logger.info(f"Skipping {path}: already imported as {previous['path']}")
+            return None
+        logger.info(f"Re-importing {path}: it grew after being imported as {previous['path']}")
+    return entry
+
+
+def run_tasks(tasks, store_root, totals, default_pair=None, workers=None,
+              segment_rows=history_store.DEFAULT_SEGMENT_ROWS):
+    """
+    Run import tasks, in parallel worker processes when there are several.
+
+    Args:
+        tasks (list): Tasks from plan_tasks
+        store_root (str): History store directory
+        totals (dict): Receives the summed line, quote, opportunity and segment counts
+        default_pair (str): Pair for old-format lines before any startup line
+        workers (int): Worker processes (defaults to the CPU count)
+        segment_rows (int): Rows per written segment
+    """
+    workers = workers or os.cpu_count() or 1
+    arguments = [(task, store_root, default_pair, segment_rows) for task in tasks]
+    if workers == 1 or len(tasks) == 1:
+        results = map(_run_task, arguments)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(min(workers, len(tasks)))
+        results = pool.imap_unordered(_run_task, arguments)
+    try:
+        for (path, start, end, source, _), counts in results:
+            for key, value in counts.items():
+                totals[key] += value
+            logger.info(f"Imported {path} [{start}:{end if end is not None else 'end'}]: "
+                        f"{counts['quotes']} quotes, {counts['opportunities']} opportunities")
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+
+def import_logs(inputs, store=None, default_pair=None, workers=None, force=False,
+                chunk_bytes=CHUNK_BYTES, segment_rows=history_store.DEFAULT_SEGMENT_ROWS):
+    """
+    Import log files into the history store.
+
+    A file whose fingerprint is already in the manifest is skipped, unless
+    it has changed since: the same path with a new size or mtime, or a
+    renamed (rotated) copy that is longer than what was imported. A live
+    log that kept growing before it was rotated is such a copy. A changed
+    file is imported again under the same source, replacing its earlier
+    segments.
+
+    Args:
+        inputs (list): Files, directories or glob patterns
+        store (HistoryStore): Destination (defaults to config.HISTORY_DIR)
+        default_pair (str): Pair for old-format lines before any startup line
+        workers (int): Worker processes (defaults to the CPU count)
+        force (bool): Re-import files already in the manifest
+        chunk_bytes (int): Byte range size for splitting plain files
+        segment_rows (int): Rows per written segment
+
+    Returns:
+        dict: Totals over all imported files
+    """
+    store = store or HistoryStore()
+    manifest = load_manifest(store)
+    tasks = []
+    pending = {}
+
+    for path in expand_inputs(inputs):
+        source = fingerprint(path)
+        if source is None:
+            continue
+        if source in pending:
+            logger.info(f"Skipping {path}: same log as {pending[source]['path']}")
+            continue
+        entry = manifest_entry(path, None if force else manifest.get(source))
+        if entry is None:
+            continue
+        for table in history_store.TABLES:
+            store.remove_source(table, source)
+        pending[source] = entry
+        tasks.extend(plan_tasks(path, source, chunk_bytes))
+
+    totals = {'files': len(pending), 'lines': 0, 'quotes': 0, 'opportunities': 0, 'segments': 0, 'skipped': 0}
+    if not tasks:
+        return totals
+
+    started = time.monotonic()
+    run_tasks(tasks, store.root, totals, default_pair, workers, segment_rows)
+
+    manifest.update(pending)
+    save_manifest(store, manifest)
+    elapsed = time.monotonic() - started
+    logger.info(f"Imported {totals['files']} file(s), {totals['lines']} lines in {elapsed:.1f} seconds")
+    if totals['skipped']:
+        logger.warning(f"Skipped {totals['skipped']} line(s) whose pair could not be determined (use --pair)")
+    return totals
+
+
+def main():
+    """Parse command-line arguments and import the given logs."""
+    parser = argparse.ArgumentParser(
+        description="Import arbitrage.log history into the columnar history store",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("inputs", nargs='*', default=[getattr(config, 'LOG_FILE', 'arbitrage.log')],
+                        help="Log files, directories or glob patterns (rotated and .gz/.bz2/.xz files included)")
+    parser.add_argument("--history-dir", default=history_store.default_history_dir(),
+                        help="History store directory")
+    parser.add_argument("--pair", default=None,
+                        help="Pair for old-format lines when the log has no startup lines (e.g., XRP/USDT)")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="Worker processes (defaults to the number of CPUs)")
+    parser.add_argument("--force", action="store_true", help="Re-import files that were already imported")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    default_pair = None
+    if args.pair:
+        symbol, _, base = args.pair.partition('/')
+        default_pair = make_pair_id(symbol, base)
+    totals = import_logs(args.inputs, HistoryStore(args.history_dir), default_pair, args.workers, args.force)
+    print(f"Imported {totals['files']} file(s): {totals['quotes']} quotes and "
+          f"{totals['opportunities']} opportunities from {totals['lines']} lines")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+
+"""
+Memory budget for long-running trackers.
+
+MemoryBudget is checked by the tracker after every tick. At most every
+`interval` seconds it measures the process's resident set size and, when
+tracemalloc accounting is enabled, the Python memory allocated by each
+subsystem (module of this project, or library package).
+
+When RSS exceeds the configured ceiling, it first frees what it can without
+losing pairs (stale quote cache entries, a garbage collection). If the
+process is still over budget, it sheds the lowest-priority pairs (the ones
+whose spreads are furthest from the threshold; pairs with an open
+opportunity are kept) a few at a time, saving their warm-start state. It
+only sheds again once RSS has fallen since the last shedding step: if
+shedding gave no memory back, shedding more would only lose pairs. Shed
+pairs are added back one at a time once RSS falls well below the ceiling.
+"""
+
+import gc
+import logging
+import math
+import os
+import time
+import tracemalloc
+from adaptive_sampler import spread_heat
+from quote_cache import get_quote_cache
+import config
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+_PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def current_rss():
+    """
+    Return the process's resident set size in bytes.
+
+    Only /proc (Linux) gives the current RSS. getrusage() elsewhere only
+    reports the peak, which never falls after pairs are shed, so it is not
+    used: the budget measures nothing and sheds nothing there.
+
+    Returns:
+        int or None: RSS in bytes, or None if it cannot be measured
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def subsystem(filename):
+    """Name the subsystem that owns a source file: a project module or a library package."""
+    directory, name = os.path.split(os.path.abspath(filename))
+    if directory == _PROJECT_DIR:
+        return os.path.splitext(name)[0]
+    parts = directory.replace('\\', '/').split('/')
+    if 'site-packages' in parts:
+        index = parts.index('site-packages')
+        package = parts[index + 1] if index + 1 < len(parts) else name
+        return package.split('.')[0]
+    return 'python'
+
+
+def traced_by_subsystem(limit=10):
+    """
+    Group memory allocated by Python (as traced by tracemalloc) by subsystem.
+
+    Returns:
+        dict: Subsystem -> bytes for the `limit` largest, plus 'other' for the rest
+    """
+    totals = {}
+    for stat in tracemalloc.take_snapshot().statistics('filename'):
+        name = subsystem(stat.traceback[0].filename)
+        totals[name] = totals.get(name, 0) + stat.size
+    ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+    result = dict(ranked[:limit])
+    rest = sum(size for _, size in ranked[limit:])
+    if rest:
+        result['other'] = rest
+    return result
+
+
+class MemoryBudget:
+    """Keeps a tracker's memory under a ceiling by shedding low-priority pairs."""
+
+    def __init__(self, tracker, limit_mb=None, interval=None, trace=None, shed_fraction=None,
+                 min_pairs=None, resume_fraction=None, shed_interval=None):
+        """
+        Initialize the budget.
+
+        Args:
+            tracker (MultiPairTracker): The tracker to watch
+            limit_mb (float): RSS ceiling in MB (defaults to config.MEMORY_LIMIT_MB; None only measures)
+            interval (float): Seconds between measurements (defaults to config.MEMORY_CHECK_INTERVAL)
+            trace (bool): Account memory per subsystem with tracemalloc (defaults to config.MEMORY_TRACEMALLOC)
+            shed_fraction (float): Share of the pairs shed at a time (defaults to config.MEMORY_SHED_FRACTION)
+            min_pairs (int): Never shed below this many pairs (defaults to config.MEMORY_MIN_PAIRS)
+            resume_fraction (float): Re-add shed pairs below this share of the ceiling
+                (defaults to config.MEMORY_RESUME_FRACTION)
+            shed_interval (float): Seconds between shedding or re-adding steps, so RSS can settle
+                (defaults to config.MEMORY_SHED_INTERVAL)
+        """
+        self.tracker = tracker
+        if limit_mb is None:
+            limit_mb = getattr(config, 'MEMORY_LIMIT_MB', None)
+        self.limit = limit_mb * MB if limit_mb else None
+        self.interval = getattr(config, 'MEMORY_CHECK_INTERVAL', 60) if interval is None else interval
+        self.trace = getattr(config, 'MEMORY_TRACEMALLOC', False) if trace is None else trace
+        self.shed_fraction = (getattr(config, 'MEMORY_SHED_FRACTION', 0.1)
+                              if shed_fraction is None else shed_fraction)
+        self.min_pairs = getattr(config, 'MEMORY_MIN_PAIRS', 1) if min_pairs is None else min_pairs
+        self.resume_fraction = (getattr(config, 'MEMORY_RESUME_FRACTION', 0.7)
+                                if resume_fraction is None else resume_fraction)
+        self.shed_interval = (getattr(config, 'MEMORY_SHED_INTERVAL', 300)
+                              if shed_interval is None else shed_interval)
+
+        if self.trace and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+        self.rss = None
+        self.peak_rss = 0
+        self.subsystems = {}
+        self.over_budget_checks = 0
+        # Shed pair ids, most recently shed last
+        self.shed = []
+        # RSS when pairs were last shed, until the process is back under budget
+        self.rss_at_shed = None
+        self._next_check = 0.0
+        self._next_step = 0.0
+
+    def check(self):
+        """Measure memory if a check is due, and shed or re-add pairs as needed."""
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.interval
+        self.measure()
+        # Pairs re-added by a config reload are no longer shed
+        self.shed = [pair_id for pair_id in self.shed if pair_id not in self.tracker.finders]
+        if self.limit is None or self.rss is None:
+            return
+
+        if self.rss > self.limit:
+            self.over_budget_checks += 1
+            self.relieve()
+            if self.rss > self.limit and now >= self._next_step:
+                self._next_step = now + self.shed_interval
+                if self.rss_at_shed is not None and self.rss >= self.rss_at_shed:
+                    logger.warning(f"Memory use {self.rss / MB:.0f} MB has not fallen since pairs were last shed "
+                                   f"at {self.rss_at_shed / MB:.0f} MB; not shedding more")
+                    return
+                self.rss_at_shed = self.rss
+                self.shed_pairs()
+            return
+
+        self.rss_at_shed = None
+        if self.shed and self.rss < self.limit * self.resume_fraction and now >= self._next_step:
+            self._next_step = now + self.shed_interval
+            self.restore_pair()
+
+    def measure(self):
+        """Update the RSS and per-subsystem figures."""
+        self.rss = current_rss()
+        if self.rss is not None:
+            self.peak_rss = max(self.peak_rss, self.rss)
+        if self.trace:
+            self.subsystems = traced_by_subsystem()
+        logger.debug(f"Memory: RSS {self.rss / MB if self.rss else 0:.1f} MB, "
+                     f"{len(self.tracker.finders)} pair(s)")
+
+    def relieve(self):
+        """Free memory without dropping pairs, then measure again."""
+        quote_cache = get_quote_cache()
+        if quote_cache is not None:
+            quote_cache.prune()
+        gc.collect()
+        self.measure()
+
+    def priority(self, pair_id):
+        """
+        Return a pair's priority: higher is kept longer.
+
+        Pairs with an open opportunity come first, then pairs by spread heat.
+        """
+        finder = self.tracker.finders[pair_id]
+        result = self.tracker.results.get(pair_id)
+        if result and result['opportunities']:
+            return 2.0
+        return spread_heat(finder)
+
+    def shed_pairs(self):
+        """Stop tracking the lowest-priority pairs."""
+        pairs = list(self.tracker.finders)
+        count = min(max(1, math.ceil(len(pairs) * self.shed_fraction)), len(pairs) - self.min_pairs)
+        if count <= 0:
+            logger.warning(f"Memory use {self.rss / MB:.0f} MB is over the {self.limit / MB:.0f} MB budget, "
+                           f"but only {len(pairs)} pair(s) are left")
+            return
+        victims = sorted(pairs, key=self.priority)[:count]
+        logger.warning(f"Memory use {self.rss / MB:.0f} MB is over the {self.limit / MB:.0f} MB budget; "
+                       f"shedding {count} pair(s): {', '.join(victims)}")
+        for pair_id in victims:
+            self.tracker.remove_pair(pair_id)
+            self.shed.append(pair_id)
+        gc.collect()
+
+    def restore_pair(self):
+        """Track the most recently shed pair again."""
+        pair_id = self.shed.pop()
+        symbol, base = pair_id.split('/', 1)
+        logger.info(f"Memory use {self.rss / MB:.0f} MB is back under budget; resuming {pair_id}")
+        self.tracker.add_pair(symbol, base)
+
+    def stats(self):
+        """
+        Return memory statistics.
+
+        Returns:
+            dict: RSS, peak and limit in MB, traced MB per subsystem and the shed pairs
+        """
+        return {
+            'rss_mb': self.rss / MB if self.rss is not None else None,
+            'peak_rss_mb': self.peak_rss / MB,
+            'limit_mb': self.limit / MB if self.limit is not None else None,
+            'subsystems_mb': {name: size / MB for name, size in self.subsystems.items()},
+            'over_budget_checks': self.over_budget_checks,
+            'shed_pairs': list(self.shed),
+        }
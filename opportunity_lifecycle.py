@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+
+"""
+Opportunity lifecycle tracking for the Cross-Exchange Price Discrepancy Finder.
+
+Instead of reporting an arbitrage opportunity on every tick it stays above
+the threshold, each (pair, venue, venue) spread series runs a small state
+machine that emits compact events:
+
+- open: the spread reached the threshold
+- update: the peak spread grew noticeably, or a heartbeat interval passed
+- close: the spread stayed below the (lower) close threshold for a few ticks
+
+Open and close use different thresholds (hysteresis) so a spread hovering
+around the threshold does not flap. Every observation is O(1).
+"""
+
+import time
+
+EVENT_OPEN = "open"
+EVENT_UPDATE = "update"
+EVENT_CLOSE = "close"
+
+# Returned by observe() on the common no-event path so it does not allocate
+_NO_EVENTS = ()
+
+
+class Opportunity:
+    """An open opportunity on one (pair, venue, venue) spread series."""
+
+    __slots__ = ('pair', 'buy_exchange', 'sell_exchange', 'direction', 'opened_at', 'last_ts',
+                 'current', 'peak', 'area', 'buy_price', 'sell_price', 'reported_peak',
+                 'reported_at', 'updates', 'below_ticks')
+
+    def __init__(self, pair, buy_exchange, sell_exchange, direction, ts, spread, buy_price, sell_price):
+        """
+        Initialize the opportunity.
+
+        Args:
+            pair (str): The pair id
+            buy_exchange (str): Exchange with the lower price
+            sell_exchange (str): Exchange with the higher price
+            direction (int): Sign of the series' signed spread (1 or -1)
+            ts (float): Unix time the opportunity opened
+            spread (float): Spread percentage when it opened
+            buy_price (float): Buy-side price when it opened
+            sell_price (float): Sell-side price when it opened
+        """
+        self.pair = pair
+        self.buy_exchange = buy_exchange
+        self.sell_exchange = sell_exchange
+        self.direction = direction
+        self.opened_at = ts
+        self.last_ts = ts
+        self.current = spread
+        self.peak = spread
+        self.area = 0.0
+        self.buy_price = buy_price
+        self.sell_price = sell_price
+        self.reported_peak = spread
+        self.reported_at = ts
+        self.updates = 0
+        self.below_ticks = 0
+
+    def advance(self, ts, spread):
+        """Fold in an observation, integrating the previous spread over the elapsed time."""
+        elapsed = ts - self.last_ts
+        if elapsed > 0:
+            self.area += self.current * elapsed
+            self.last_ts = ts
+        self.current = spread
+        if spread > self.peak:
+            self.peak = spread
+
+    @property
+    def duration(self):
+        """Seconds between opening and the latest observation."""
+        return self.last_ts - self.opened_at
+
+    @property
+    def average(self):
+        """Time-weighted average spread percentage."""
+        duration = self.last_ts - self.opened_at
+        if duration <= 0:
+            return self.current
+        return self.area / duration
+
+    def to_event(self, kind):
+        """
+        Build an event describing the opportunity.
+
+        Args:
+            kind (str): EVENT_OPEN, EVENT_UPDATE or EVENT_CLOSE
+
+        Returns:
+            dict: The event
+        """
+        return {
+            'event': kind,
+            'pair': self.pair,
+            'buy_exchange': self.buy_exchange,
+            'sell_exchange': self.sell_exchange,
+            'opened_at': self.opened_at,
+            'timestamp': self.last_ts,
+            'duration': self.duration,
+            'spread_percent': self.current,
+            'peak_percent': self.peak,
+            'average_percent': self.average,
+            'buy_price': self.buy_price,
+            'sell_price': self.sell_price,
+        }
+
+    def to_state(self):
+        """Return a JSON-serializable representation of the opportunity."""
+        return [self.pair, self.buy_exchange, self.sell_exchange, self.direction, self.opened_at,
+                self.last_ts, self.current, self.peak, self.area, self.buy_price, self.sell_price,
+                self.reported_peak, self.reported_at, self.updates]
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild an opportunity from to_state() output."""
+        (pair, buy_exchange, sell_exchange, direction, opened_at, last_ts, current, peak, area,
+         buy_price, sell_price, reported_peak, reported_at, updates) = state
+        opportunity = cls(pair, buy_exchange, sell_exchange, direction, opened_at, current, buy_price, sell_price)
+        opportunity.last_ts = last_ts
+        opportunity.peak = peak
+        opportunity.area = area
+        opportunity.reported_peak = reported_peak
+        opportunity.reported_at = reported_at
+        opportunity.updates = updates
+        return opportunity
+
+
+class OpportunityLifecycle:
+    """Runs the open/update/close state machine for every spread series of a pair."""
+
+    def __init__(self, open_percent, hysteresis=0.2, close_ticks=2, update_step=0.25, update_interval=300):
+        """
+        Initialize the lifecycle tracker.
+
+        Args:
+            open_percent (float): Spread percentage at which an opportunity opens
+            hysteresis (float): Fraction of open_percent the spread must fall by before the
+                opportunity can close (0.2 closes below 80% of the open threshold)
+            close_ticks (int): Consecutive ticks below the close threshold needed to close
+            update_step (float): Growth of the peak spread, in percentage points, that emits an update
+            update_interval (float): Seconds after which an open opportunity emits a heartbeat update
+        """
+        self.hysteresis = hysteresis
+        self.close_ticks = close_ticks
+        self.update_step = update_step
+        self.update_interval = update_interval
+        self.set_threshold(open_percent)
+        # (pair id, venue id, venue id) -> Opportunity
+        self.open = {}
+
+    def set_threshold(self, open_percent):
+        """Change the open threshold (the close threshold follows it)."""
+        self.open_percent = open_percent
+        self.close_percent = open_percent * (1 - self.hysteresis)
+
+    def observe(self, key, signed_percent, buy_exchange, sell_exchange, buy_price, sell_price, ts=None):
+        """
+        Feed one spread observation into the state machine.
+
+        Args:
+            key (tuple): (pair id, venue id, venue id) with the venue ids in ascending order
+            signed_percent (float): The series' signed spread percentage
+            buy_exchange (str): Exchange with the lower price
+            sell_exchange (str): Exchange with the higher price
+            buy_price (float): The lower price
+            sell_price (float): The higher price
+            ts (float): Unix time of the observation (defaults to now)
+
+        Returns:
+            tuple or list: Events emitted by this observation (usually none)
+        """
+        if ts is None:
+            ts = time.time()
+        spread = abs(signed_percent)
+        direction = 1 if signed_percent >= 0 else -1
+        opportunity = self.open.get(key)
+        if opportunity is None and spread < self.open_percent:
+            return _NO_EVENTS
+        events = []
+
+        if opportunity is not None and opportunity.direction != direction:
+            # The cheap and expensive sides swapped; the old opportunity is over
+            opportunity.advance(ts, 0.0)
+            del self.open[key]
+            events.append(opportunity.to_event(EVENT_CLOSE))
+            opportunity = None
+
+        if opportunity is None:
+            if spread >= self.open_percent:
+                opportunity = Opportunity(key[0], buy_exchange, sell_exchange, direction, ts,
+                                          spread, buy_price, sell_price)
+                self.open[key] = opportunity
+                events.append(opportunity.to_event(EVENT_OPEN))
+            return events or _NO_EVENTS
+
+        opportunity.advance(ts, spread)
+        opportunity.buy_price = buy_price
+        opportunity.sell_price = sell_price
+
+        if spread < self.close_percent:
+            opportunity.below_ticks += 1
+            if opportunity.below_ticks >= self.close_ticks:
+                del self.open[key]
+                return [opportunity.to_event(EVENT_CLOSE)]
+            return _NO_EVENTS
+        opportunity.below_ticks = 0
+
+        if (opportunity.peak >= opportunity.reported_peak + self.update_step or
+                ts - opportunity.reported_at >= self.update_interval):
+            opportunity.reported_peak = opportunity.peak
+            opportunity.reported_at = ts
+            opportunity.updates += 1
+            return [opportunity.to_event(EVENT_UPDATE)]
+        return _NO_EVENTS
+
+    def to_state(self):
+        """Return the open opportunities as JSON-serializable data."""
+        return [[key[1], key[2], opportunity.to_state()] for key, opportunity in self.open.items()]
+
+    def load_state(self, entries, now=None):
+        """
+        Restore open opportunities from to_state() output.
+
+        Nothing was observed while the process was down. Opportunities last
+        seen more than update_interval ago are assumed to be over and are not
+        restored. The others resume at `now`: their average so far is kept,
+        and the next observation only integrates the time since the restore.
+
+        Args:
+            entries (list): to_state() output
+            now (float): Unix time of the restore (defaults to now)
+
+        Returns:
+            int: The number of opportunities restored
+        """
+        if now is None:
+            now = time.time()
+        restored = 0
+        for venue1, venue2, state in entries:
+            opportunity = Opportunity.from_state(state)
+            if now - opportunity.last_ts > self.update_interval:
+                continue
+            if now > opportunity.last_ts:
+                opportunity.area = opportunity.average * (now - opportunity.opened_at)
+                opportunity.last_ts = now
+            self.open[(opportunity.pair, venue1, venue2)] = opportunity
+            restored += 1
+        return restored
+
+
+def format_duration(seconds):
+    """Format a duration in seconds as e.g. '45s', '5m12s' or '2h03m'."""
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
@@ -9,8 +9,17 @@ import requests
 from binance.client import Client as BinanceClient
 import krakenex
 from pycoingecko import CoinGeckoAPI
-from kraken_utils import get_kraken_asset_pair, get_kraken_ticker_info
-from coingecko_utils import get_coingecko_coin_id, get_coingecko_currency, parse_coingecko_price_data
+from kraken_utils import get_kraken_asset_pair, parse_kraken_quote
+from coingecko_utils import get_coingecko_coin_id, get_coingecko_currency, parse_coingecko_quote
+from exchange_http import get_market_data_client, binance_price_decimals
+from fixed_point import spread_percent_ticks, DEFAULT_DECIMALS
+from spread_stats import SpreadStatsRegistry
+from bbo_index import BBOIndex
+from opportunity_lifecycle import OpportunityLifecycle, EVENT_OPEN, EVENT_UPDATE, format_duration
+from scheduler import FixedRateScheduler
+from state_snapshot import restore_snapshot, save_snapshot, exit_on_sigterm
+from quote_cache import get_quote_cache
+from quote import Quote, VENUE_BINANCE, VENUE_KRAKEN, VENUE_COINGECKO, VENUE_NAMES, VENUE_KEYS, make_pair_id
 import config
 
 # Configure logging
@@ -42,26 +51,124 @@ class PriceDiscrepancyFinder:
         self.threshold_percent = threshold_percent
         self.binance_pair = f"{symbol}{base_currency}"
         self.kraken_pair = get_kraken_asset_pair(symbol, base_currency)
+        self.pair_id = make_pair_id(symbol, base_currency)
+        self.coingecko_coin_id = get_coingecko_coin_id(symbol)
+        # The CoinGecko currency that actually returned a price (resolved on first success)
+        self.coingecko_currency = None
+        
+        # One reusable Quote per venue, indexed by VENUE_* id. Adapters return
+        # plain field tuples that are copied into these in place, so a tick
+        # does not allocate new quote objects.
+        self.quotes = [Quote(venue, self.pair_id) for venue in range(len(VENUE_NAMES))]
+        self._valid_quotes = []
+        # Price decimals (from each market's tick size) are looked up once, on the first check
+        self._decimals_resolved = False
+        
+        # Change detection: quote versions at the last evaluation, and the result returned
+        # while no quote has moved since then
+        self.skip_unchanged = getattr(config, 'SKIP_UNCHANGED_QUOTES', True)
+        self._evaluated_versions = None
+        self._unchanged_result = None
+        self.unchanged_checks = 0
+        # Consolidated best bid/ask across venues, updated as each venue's quote arrives
+        self.bbo = BBOIndex(self.pair_id)
         
         # Error tracking
         self.consecutive_errors = 0
         
+        # Lightweight HTTP adapters for public market data, shared by every finder
+        # in the process. When enabled the exchange SDK clients are not created.
+        self.market_data = None
+        if getattr(config, 'MARKET_DATA_BACKEND', 'sdk') == 'http':
+            self.market_data = get_market_data_client()
+            logger.info("Using lightweight HTTP market data adapters")
+        self.load_latency_settings()
+        
+        # Process-wide quote cache shared with the other finders in this process
+        self.quote_cache = get_quote_cache()
+        
         # Initialize exchange clients
-        if config.EXCHANGES["binance"]:
+        self.binance_client = None
+        self.kraken_client = None
+        self.coingecko_client = None
+        if self.market_data is None:
+            self._init_sdk_clients()
+        
+        # Initialize alert tracking
+        self.last_alert_time = None
+        self.load_alert_settings()
+        
+        # Rolling spread statistics
+        self.spread_stats = SpreadStatsRegistry(
+            alpha=getattr(config, 'SPREAD_EWMA_ALPHA', 0.05),
+            quantiles=getattr(config, 'SPREAD_QUANTILES', (0.5, 0.95, 0.99)),
+            window=getattr(config, 'SPREAD_QUANTILE_WINDOW', 1000)
+        )
+        
+        # Open/update/close state machine per spread series, with hysteresis
+        self.lifecycle = OpportunityLifecycle(
+            threshold_percent,
+            hysteresis=getattr(config, 'OPPORTUNITY_HYSTERESIS', 0.2),
+            close_ticks=getattr(config, 'OPPORTUNITY_CLOSE_TICKS', 2),
+            update_step=getattr(config, 'OPPORTUNITY_UPDATE_STEP', 0.25),
+            update_interval=getattr(config, 'OPPORTUNITY_UPDATE_INTERVAL', 300)
+        )
+        
+        logger.info(f"Initialized price discrepancy finder for {symbol}/{base_currency}")
+        logger.info(f"Binance pair: {self.binance_pair}, Kraken pair: {self.kraken_pair}")
+        logger.info(f"Arbitrage threshold set to {threshold_percent}%")
+        logger.info(f"Enabled exchanges: {', '.join([k for k, v in config.EXCHANGES.items() if v])}")
+    
+    def load_alert_settings(self):
+        """(Re)load the alert rule settings from config."""
+        self.alert_cooldown = config.ALERT_COOLDOWN if hasattr(config, 'ALERT_COOLDOWN') else 300  # Default 5 minutes
+        self.alert_min_percent = getattr(config, 'ALERT_MIN_PERCENT', 1.0)
+        self.zscore_alerts = getattr(config, 'ZSCORE_ALERTS', False)
+        self.zscore_threshold = getattr(config, 'ZSCORE_THRESHOLD', 4.0)
+        self.zscore_min_samples = getattr(config, 'ZSCORE_MIN_SAMPLES', 30)
+        self.zscore_min_spread_percent = getattr(config, 'ZSCORE_MIN_SPREAD_PERCENT', 0.05)
+    
+    def load_latency_settings(self):
+        """(Re)load the per-exchange latency budgets and hedging settings from config."""
+        budgets = getattr(config, 'VENUE_BUDGETS', {})
+        default = getattr(config, 'HTTP_TIMEOUT', 10)
+        # Budget in seconds per VENUE_* id
+        self.venue_budgets = [budgets.get(key, default) for key in VENUE_KEYS]
+        if self.market_data is not None:
+            # Refreshes the shared client's budgets and hedging settings
+            self.market_data = get_market_data_client()
+        elif getattr(self, 'coingecko_client', None) is not None:
+            self.coingecko_client.request_timeout = self.venue_budgets[VENUE_COINGECKO]
+    
+    def ensure_clients(self):
+        """
+        Create SDK clients for exchanges that were enabled after initialization.
+        
+        Existing clients are kept, so their connections are not dropped.
+        """
+        if self.market_data is not None:
+            return
+        if ((config.EXCHANGES["binance"] and self.binance_client is None) or
+                (config.EXCHANGES["kraken"] and self.kraken_client is None) or
+                (config.EXCHANGES["coingecko"] and self.coingecko_client is None)):
+            self._init_sdk_clients()
+    
+    def _init_sdk_clients(self):
+        """Create the exchange SDK clients for enabled exchanges that do not have one yet."""
+        if config.EXCHANGES["binance"] and self.binance_client is None:
             try:
                 self.binance_client = BinanceClient(
                     os.getenv('BINANCE_API_KEY'),
-                    os.getenv('BINANCE_API_SECRET')
+                    os.getenv('BINANCE_API_SECRET'),
+                    requests_params={'timeout': self.venue_budgets[VENUE_BINANCE]}
                 )
                 logger.info("Binance client initialized successfully")
             except Exception as e:
                 logger.error(f"Error initializing Binance client: {e}")
                 self.binance_client = None
                 config.EXCHANGES["binance"] = False
-        else:
-            self.binance_client = None
             
-        if config.EXCHANGES["kraken"]:
+        if config.EXCHANGES["kraken"] and self.kraken_client is None:
             try:
                 self.kraken_client = krakenex.API(
                     key=os.getenv('KRAKEN_API_KEY'),
@@ -72,66 +179,91 @@ class PriceDiscrepancyFinder:
                 logger.error(f"Error initializing Kraken client: {e}")
                 self.kraken_client = None
                 config.EXCHANGES["kraken"] = False
-        else:
-            self.kraken_client = None
             
-        if config.EXCHANGES["coingecko"]:
+        if config.EXCHANGES["coingecko"] and self.coingecko_client is None:
             try:
                 # Use the free API tier without an API key
                 self.coingecko_client = CoinGeckoAPI()
+                self.coingecko_client.request_timeout = self.venue_budgets[VENUE_COINGECKO]
                 logger.info("CoinGecko client initialized successfully")
             except Exception as e:
                 logger.error(f"Error initializing CoinGecko client: {e}")
                 self.coingecko_client = None
                 config.EXCHANGES["coingecko"] = False
-        else:
-            self.coingecko_client = None
-        
-        # Initialize alert tracking
-        self.last_alert_time = None
-        self.alert_cooldown = config.ALERT_COOLDOWN if hasattr(config, 'ALERT_COOLDOWN') else 300  # Default 5 minutes
+    
+    def close(self):
+        """
+        Release the connections this finder holds.
         
-        logger.info(f"Initialized price discrepancy finder for {symbol}/{base_currency}")
-        logger.info(f"Binance pair: {self.binance_pair}, Kraken pair: {self.kraken_pair}")
-        logger.info(f"Arbitrage threshold set to {threshold_percent}%")
-        logger.info(f"Enabled exchanges: {', '.join([k for k, v in config.EXCHANGES.items() if v])}")
+        Closes the exchange SDK clients' sessions. The HTTP market data
+        client and the quote cache are shared with the other finders in
+        the process and stay open.
+        """
+        if self.binance_client is not None:
+            self.binance_client.close_connection()
+            self.binance_client = None
+        if self.kraken_client is not None:
+            self.kraken_client.close()
+            self.kraken_client = None
+        if self.coingecko_client is not None:
+            self.coingecko_client.session.close()
+            self.coingecko_client = None
     
-    def get_binance_price(self):
-        """Get the current price from Binance."""
-        if not config.EXCHANGES["binance"] or self.binance_client is None:
+    def get_binance_quote(self):
+        """
+        Get the current quote from Binance.
+        
+        Returns:
+            Quote or None: The venue's reusable Quote, updated in place
+        """
+        if not config.EXCHANGES["binance"]:
+            return None
+            
+        if self.market_data is None and self.binance_client is None:
             return None
             
         try:
-            ticker = self.binance_client.get_ticker(symbol=self.binance_pair)
+            quote = self._cached_quote(VENUE_BINANCE, self.binance_pair, self._fetch_binance_quote)
             self.consecutive_errors = 0  # Reset error counter on success
-            return float(ticker['lastPrice'])
+            return quote
         except Exception as e:
             logger.error(f"Error fetching Binance price: {e}")
             self.consecutive_errors += 1
             return None
     
-    def get_kraken_price(self):
-        """Get the current price from Kraken."""
-        if not config.EXCHANGES["kraken"] or self.kraken_client is None:
+    def _fetch_binance_quote(self):
+        """Fetch the Binance ticker as quote fields."""
+        if self.market_data is not None:
+            return self.market_data.binance_quote(self.binance_pair)
+        
+        ticker = self.binance_client.get_ticker(symbol=self.binance_pair)
+        return (
+            float(ticker['bidPrice']),
+            float(ticker['askPrice']),
+            float(ticker['lastPrice']),
+            float(ticker['volume']),
+            ticker['closeTime'] / 1000.0,
+            time.time()
+        )
+    
+    def get_kraken_quote(self):
+        """
+        Get the current quote from Kraken.
+        
+        Returns:
+            Quote or None: The venue's reusable Quote, updated in place
+        """
+        if not config.EXCHANGES["kraken"]:
             return None
             
-        try:
-            response = self.kraken_client.query_public('Ticker', {'pair': self.kraken_pair})
-            if 'error' in response and response['error']:
-                logger.error(f"Kraken API error: {response['error']}")
-                self.consecutive_errors += 1
-                return None
-            
-            # Extract the price from the response using our utility function
-            ticker_info = get_kraken_ticker_info(response, self.kraken_pair)
-            if ticker_info:
-                self.consecutive_errors = 0  # Reset error counter on success
-                return ticker_info['last_price']
+        if self.market_data is None and self.kraken_client is None:
+            return None
             
-            # Fallback to direct extraction if our utility function fails
-            for pair_name, pair_data in response['result'].items():
+        try:
+            quote = self._cached_quote(VENUE_KRAKEN, self.kraken_pair, self._fetch_kraken_quote)
+            if quote is not None:
                 self.consecutive_errors = 0  # Reset error counter on success
-                return float(pair_data['c'][0])  # 'c' is the last trade closed array, [0] is the price
+                return quote
             
             self.consecutive_errors += 1
             return None
@@ -140,34 +272,57 @@ class PriceDiscrepancyFinder:
             self.consecutive_errors += 1
             return None
     
-    def get_coingecko_price(self):
-        """Get the current price from CoinGecko."""
-        if not config.EXCHANGES["coingecko"] or self.coingecko_client is None:
+    def _fetch_kraken_quote(self):
+        """Fetch the Kraken ticker as quote fields."""
+        if self.market_data is not None:
+            return self.market_data.kraken_quote(self.kraken_pair)
+        
+        response = self.kraken_client.query_public('Ticker', {'pair': self.kraken_pair},
+                                                   timeout=self.venue_budgets[VENUE_KRAKEN])
+        if 'error' in response and response['error']:
+            raise ValueError(f"Kraken API error: {response['error']}")
+        
+        # Extract the quote from the response using our utility function
+        return parse_kraken_quote(response, self.kraken_pair)
+    
+    def get_coingecko_quote(self):
+        """
+        Get the current quote from CoinGecko.
+        
+        Returns:
+            Quote or None: The venue's reusable Quote, updated in place
+        """
+        if not config.EXCHANGES["coingecko"]:
+            return None
+        if self.market_data is None and self.coingecko_client is None:
             return None
             
         try:
-            # Convert symbol and base_currency to CoinGecko format using utility functions
-            coin_id = get_coingecko_coin_id(self.symbol)
-            currency = get_coingecko_currency(self.base_currency)
-            
-            # Get the price from CoinGecko
-            price_data = self.coingecko_client.get_price(ids=coin_id, vs_currencies=currency)
-            
-            # Parse the price data using utility function
-            price = parse_coingecko_price_data(price_data, coin_id, currency)
+            coin_id = self.coingecko_coin_id
             
-            # If price is None and we were trying to use USDT, fall back to USD
-            if price is None and self.base_currency.lower() == 'usdt':
-                logger.info("Falling back to USD for CoinGecko price")
-                fallback_currency = 'usd'
-                price_data = self.coingecko_client.get_price(ids=coin_id, vs_currencies=fallback_currency)
-                price = parse_coingecko_price_data(price_data, coin_id, fallback_currency)
+            # Once a currency has returned a price, keep using it without probing again
+            if self.coingecko_currency is not None:
+                currency = self.coingecko_currency
+                quote = self._fetch_coingecko_quote(coin_id, currency)
+            else:
+                # Convert base_currency to CoinGecko format using utility function
+                currency = get_coingecko_currency(self.base_currency)
+                quote = self._fetch_coingecko_quote(coin_id, currency)
+                
+                # If price is None and we were trying to use USDT, fall back to USD
+                if quote is None and self.base_currency.lower() == 'usdt':
+                    logger.info("Falling back to USD for CoinGecko price")
+                    currency = 'usd'
+                    quote = self._fetch_coingecko_quote(coin_id, currency)
+                
+                if quote is not None:
+                    self.coingecko_currency = currency
             
-            if price is not None:
+            if quote is not None:
                 self.consecutive_errors = 0  # Reset error counter on success
-                return price
+                return quote
             else:
-                logger.error(f"CoinGecko API returned unexpected data format: {price_data}")
+                logger.error(f"CoinGecko API returned no price for {coin_id} in {currency}")
                 self.consecutive_errors += 1
                 return None
         except Exception as e:
@@ -175,6 +330,201 @@ class PriceDiscrepancyFinder:
             self.consecutive_errors += 1
             return None
     
+    def _fetch_coingecko_quote(self, coin_id, currency):
+        """Fetch and parse one CoinGecko price into the reusable quote."""
+        return self._cached_quote(VENUE_COINGECKO, f"{coin_id}/{currency}",
+                                  lambda: self._fetch_coingecko_price(coin_id, currency))
+    
+    def _fetch_coingecko_price(self, coin_id, currency):
+        """Fetch one CoinGecko price as quote fields."""
+        if self.market_data is not None:
+            return self.market_data.coingecko_quote(coin_id, currency)
+        
+        price_data = self.coingecko_client.get_price(
+            ids=coin_id, vs_currencies=currency,
+            include_24hr_vol='true', include_last_updated_at='true'
+        )
+        return parse_coingecko_quote(price_data, coin_id, currency)
+    
+    def _cached_quote(self, venue, market, fetch):
+        """
+        Fetch a venue's quote through the shared quote cache.
+        
+        Concurrent finders asking for the same market share one upstream
+        request. The fetched fields are copied into this finder's own
+        reusable Quote, so its version and ticks stay per finder.
+        
+        Args:
+            venue (int): One of the VENUE_* identifiers
+            market (str): The venue's market identifier (e.g., 'XRPUSDT')
+            fetch (callable): Returns the Quote.update() arguments, or None if no price
+            
+        Returns:
+            Quote or None: The venue's reusable Quote, updated in place
+        """
+        if self.quote_cache is None:
+            fields = fetch()
+        else:
+            fields = self.quote_cache.get((venue, market), fetch)
+        if fields is None:
+            return None
+        return self.quotes[venue].update(*fields)
+    
+    def get_binance_price(self):
+        """Get the current last price from Binance."""
+        quote = self.get_binance_quote()
+        return quote.last if quote is not None else None
+    
+    def get_kraken_price(self):
+        """Get the current last price from Kraken."""
+        quote = self.get_kraken_quote()
+        return quote.last if quote is not None else None
+    
+    def get_coingecko_price(self):
+        """Get the current price from CoinGecko."""
+        quote = self.get_coingecko_quote()
+        return quote.last if quote is not None else None
+    
+    def fetch_quotes(self):
+        """
+        Fetch a quote from every enabled venue.
+        
+        Returns:
+            list: The valid quotes for this tick (a reused list; copy it to keep it)
+        """
+        valid_quotes = self._valid_quotes
+        valid_quotes.clear()
+        bbo = self.bbo
+        for venue, quote in ((VENUE_BINANCE, self.get_binance_quote()),
+                             (VENUE_KRAKEN, self.get_kraken_quote()),
+                             (VENUE_COINGECKO, self.get_coingecko_quote())):
+            if quote is not None and quote.is_valid():
+                valid_quotes.append(quote)
+                bbo.update_quote(quote)
+            else:
+                bbo.remove(venue)
+        return valid_quotes
+    
+    def get_state(self):
+        """
+        Return the finder's warm-start state as JSON-serializable data.
+        
+        Returns:
+            dict: Resolved mappings, last quotes, alert cooldown and spread statistics
+        """
+        last_alert = self.last_alert_time.timestamp() if self.last_alert_time else None
+        quotes = []
+        for quote in self.quotes:
+            if quote.is_valid():
+                quotes.append([quote.venue, quote.bid, quote.ask, quote.last, quote.volume,
+                               quote.exchange_ts, quote.receive_ts])
+        return {
+            'mappings': {
+                'binance': self.binance_pair,
+                'kraken': self.kraken_pair,
+                'coingecko': [self.coingecko_coin_id, self.coingecko_currency],
+                'price_decimals': [quote.decimals for quote in self.quotes],
+            },
+            'quotes': [[value if value == value else None for value in row] for row in quotes],
+            'last_alert_time': last_alert,
+            'spread_stats': self.spread_stats.to_state(self.pair_id),
+            'opportunities': self.lifecycle.to_state(),
+        }
+    
+    def restore_state(self, state):
+        """
+        Restore warm-start state produced by get_state().
+        
+        Args:
+            state (dict): The saved state
+        """
+        mappings = state.get('mappings', {})
+        self.binance_pair = mappings.get('binance', self.binance_pair)
+        self.kraken_pair = mappings.get('kraken', self.kraken_pair)
+        coin_id, currency = mappings.get('coingecko', (self.coingecko_coin_id, None))
+        self.coingecko_coin_id = coin_id
+        self.coingecko_currency = currency
+        
+        for quote, decimals in zip(self.quotes, mappings.get('price_decimals', ())):
+            quote.decimals = decimals
+        
+        nan = float('nan')
+        for venue, bid, ask, last, volume, exchange_ts, receive_ts in state.get('quotes', []):
+            row = [nan if value is None else value for value in (bid, ask, last, volume, exchange_ts, receive_ts)]
+            self.quotes[venue].update(*row)
+        
+        if state.get('last_alert_time') is not None:
+            self.last_alert_time = datetime.fromtimestamp(state['last_alert_time'])
+        
+        self.spread_stats.load_state(state.get('spread_stats', []))
+        saved = state.get('opportunities', [])
+        restored = self.lifecycle.load_state(saved)
+        if restored < len(saved):
+            logger.info(f"Dropped {len(saved) - restored} stale open opportunities for {self.pair_id}")
+    
+    def resolve_price_decimals(self):
+        """
+        Look up each enabled venue's price decimals from its market metadata.
+        
+        Quotes with known decimals also carry exact integer ticks. CoinGecko
+        publishes no tick size, so its prices use DEFAULT_DECIMALS. Lookups
+        that fail are not retried until the next start; those venues fall
+        back to float arithmetic.
+        """
+        self._decimals_resolved = True
+        for venue, quote in enumerate(self.quotes):
+            if quote.decimals is not None or not config.EXCHANGES[VENUE_KEYS[venue]]:
+                continue
+            try:
+                quote.decimals = self._fetch_price_decimals(venue)
+            except Exception as e:
+                logger.warning(f"Could not fetch {VENUE_NAMES[venue]} price decimals for {self.pair_id}: {e}")
+                continue
+            if quote.decimals is not None:
+                logger.debug(f"{VENUE_NAMES[venue]} {self.pair_id} prices have {quote.decimals} decimals")
+    
+    def _fetch_price_decimals(self, venue):
+        """Fetch the price decimals of this pair's market on one venue."""
+        if venue == VENUE_COINGECKO:
+            return DEFAULT_DECIMALS
+        if self.market_data is not None:
+            if venue == VENUE_BINANCE:
+                return self.market_data.binance_price_decimals(self.binance_pair)
+            return self.market_data.kraken_price_decimals(self.kraken_pair)
+        
+        if venue == VENUE_BINANCE:
+            if self.binance_client is None:
+                return None
+            info = self.binance_client.get_symbol_info(self.binance_pair)
+            return binance_price_decimals(info) if info else None
+        if self.kraken_client is None:
+            return None
+        response = self.kraken_client.query_public('AssetPairs', {'pair': self.kraken_pair},
+                                                   timeout=self.venue_budgets[VENUE_KRAKEN])
+        if response.get('error') or not response.get('result'):
+            return None
+        return next(iter(response['result'].values())).get('pair_decimals')
+    
+    def quote_difference(self, quote1, quote2):
+        """
+        Calculate the percentage difference between two quotes' prices.
+        
+        Uses exact integer ticks when both markets' decimals are known and
+        falls back to calculate_price_difference otherwise.
+        
+        Args:
+            quote1 (Quote): First quote
+            quote2 (Quote): Second quote
+            
+        Returns:
+            float: Percentage difference
+        """
+        ticks1 = quote1.price_ticks()
+        ticks2 = quote2.price_ticks()
+        if ticks1 is not None and ticks2 is not None:
+            return spread_percent_ticks(ticks1[0], ticks1[1], ticks2[0], ticks2[1])
+        return self.calculate_price_difference(quote1.price, quote2.price)
+    
     def calculate_price_difference(self, price1, price2):
         """
         Calculate the percentage difference between two prices.
@@ -193,18 +543,43 @@ class PriceDiscrepancyFinder:
         diff_percent = abs(price1 - price2) / avg_price * 100
         return diff_percent
     
+    def should_alert(self, diff_percent, zscore, stats):
+        """
+        Decide whether a spread should trigger an alert.
+        
+        With z-score alerting enabled, a spread alerts when it deviates from
+        the rolling mean of its own (pair, venue pair) series by at least
+        ZSCORE_THRESHOLD standard deviations. Until the series has
+        ZSCORE_MIN_SAMPLES observations, and when z-score alerting is off,
+        the fixed ALERT_MIN_PERCENT rule applies.
+        
+        Args:
+            diff_percent (float): Absolute spread percentage
+            zscore (float): Z-score of the signed spread (NaN if unavailable)
+            stats (SpreadStats): Rolling statistics of the series
+            
+        Returns:
+            bool: True if an alert should be sent
+        """
+        if self.zscore_alerts and stats.count > self.zscore_min_samples and zscore == zscore:
+            return abs(zscore) >= self.zscore_threshold and diff_percent >= self.zscore_min_spread_percent
+        return diff_percent >= self.alert_min_percent
+    
     def send_alert(self, message):
         """
         Send an alert when a significant price discrepancy is detected.
         
         Args:
             message (str): The alert message
+            
+        Returns:
+            bool: True if the alert was sent, False if it was suppressed by the cooldown
         """
         # Check if we're within the cooldown period
         current_time = datetime.now()
         if self.last_alert_time and (current_time - self.last_alert_time).total_seconds() < self.alert_cooldown:
             logger.debug(f"Alert suppressed due to cooldown: {message}")
-            return
+            return False
         
         # Update the last alert time
         self.last_alert_time = current_time
@@ -221,6 +596,8 @@ class PriceDiscrepancyFinder:
         
         if hasattr(config, 'ENABLE_WEBHOOK_ALERTS') and config.ENABLE_WEBHOOK_ALERTS:
             self.send_webhook_alert(message)
+        
+        return True
     
     def send_email_alert(self, message):
         """Send an email alert."""
@@ -405,77 +782,206 @@ class PriceDiscrepancyFinder:
             logger.error(f"Failed to send webhook alert: {e}")
     
     def check_arbitrage_opportunity(self):
-        """Check for arbitrage opportunities between exchanges."""
-        binance_price = self.get_binance_price()
-        kraken_price = self.get_kraken_price()
-        coingecko_price = self.get_coingecko_price()
-        
-        # Store prices in a dictionary for easier comparison
-        prices = {
-            "Binance": binance_price,
-            "Kraken": kraken_price,
-            "CoinGecko": coingecko_price
-        }
+        """
+        Check for arbitrage opportunities between exchanges.
         
-        # Filter out None values
-        valid_prices = {k: v for k, v in prices.items() if v is not None}
+        Returns:
+            dict or None: The tick's quotes, spreads, opportunities and alerts,
+            or None if fewer than two exchanges returned a price
+        """
+        if not self._decimals_resolved:
+            self.resolve_price_decimals()
+        valid_quotes = self.fetch_quotes()
         
-        if len(valid_prices) < 2:
-            logger.warning("Could not fetch prices from at least two exchanges")
-            return
+        if len(valid_quotes) < 2:
+            logger.warning(f"Could not fetch prices for {self.pair_id} from at least two exchanges")
+            self._evaluated_versions = None
+            return None
         
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        if self._unchanged_since_last_check(valid_quotes):
+            return self._unchanged_result
+        
+        now = time.time()
+        timestamp = datetime.fromtimestamp(now).strftime("%Y-%m-%d %H:%M:%S")
+        result = {
+            'pair': self.pair_id,
+            'timestamp': timestamp,
+            'quotes': [quote.to_dict() for quote in valid_quotes],
+            'spreads': [],
+            'opportunities': [],
+            'events': [],
+            'alerts': [],
+            'bbo': self.bbo.cross(),
+            'changed': True,
+        }
         
         # Log all available prices
         price_strings = []
-        for exchange, price in valid_prices.items():
-            price_strings.append(f"{exchange}: ${price:.2f}")
+        for quote in valid_quotes:
+            price_strings.append(f"{quote.venue_name}: ${quote.format_price()}")
         
-        logger.info(f"[{timestamp}] Current prices - {', '.join(price_strings)}")
+        logger.info(f"[{timestamp}] Current prices for {self.pair_id} - {', '.join(price_strings)}")
         
         # Compare all pairs of exchanges
-        for exchange1, price1 in valid_prices.items():
-            for exchange2, price2 in valid_prices.items():
-                if exchange1 >= exchange2:  # Skip duplicate comparisons
-                    continue
-                
-                diff_percent = self.calculate_price_difference(price1, price2)
-                
-                if diff_percent is None:
-                    continue
-                
-                logger.info(f"Price difference between {exchange1} and {exchange2}: {diff_percent:.2f}%")
-                
-                if diff_percent >= self.threshold_percent:
-                    # Determine which exchange has the lower price (buy) and which has the higher price (sell)
-                    buy_exchange = exchange2 if price1 > price2 else exchange1
-                    sell_exchange = exchange1 if price1 > price2 else exchange2
-                    buy_price = min(price1, price2)
-                    sell_price = max(price1, price2)
-                    
-                    # Create the arbitrage opportunity message
-                    arb_message = f"Buy on {buy_exchange} (${buy_price:.2f}) and sell on {sell_exchange} (${sell_price:.2f}) - Potential profit: {diff_percent:.2f}%"
-                    
-                    # Log the arbitrage opportunity
-                    logger.warning(f"ARBITRAGE OPPORTUNITY: {arb_message}")
-                    
-                    # Send an alert if the discrepancy exceeds 1%
-                    if diff_percent >= 1.0:
-                        alert_message = f"{self.symbol}/{self.base_currency}: {arb_message}"
-                        self.send_alert(alert_message)
-    
-    def run(self, interval_seconds=config.CHECK_INTERVAL):
+        for quote1 in valid_quotes:
+            for quote2 in valid_quotes:
+                if quote1.venue_name < quote2.venue_name:  # Skip duplicate comparisons
+                    self._compare_quotes(quote1, quote2, now, result)
+        
+        self._unchanged_result = dict(result, events=[], alerts=[], changed=False)
+        return result
+    
+    def _unchanged_since_last_check(self, valid_quotes):
+        """
+        Return True if no venue's price moved since the last evaluated check.
+        
+        Evaluation, logging and alert checks are skipped for such a check
+        (when skip_unchanged is set), and its previous result is reused.
+        """
+        versions = tuple((quote.venue, quote.version) for quote in valid_quotes)
+        if self.skip_unchanged and versions == self._evaluated_versions:
+            logger.debug(f"No price for {self.pair_id} changed since the last check")
+            self.unchanged_checks += 1
+            return True
+        self._evaluated_versions = versions
+        return False
+    
+    def _compare_quotes(self, quote1, quote2, now, result):
+        """
+        Compare two venues' quotes, recording the spread, opportunity events and alerts in a result.
+        
+        Args:
+            quote1 (Quote): First quote
+            quote2 (Quote): Second quote
+            now (float): Epoch time of the check
+            result (dict): The check result to add to
+        """
+        diff_percent = self.quote_difference(quote1, quote2)
+        if diff_percent is None:
+            return
+        
+        exchange1 = quote1.venue_name
+        exchange2 = quote2.venue_name
+        logger.info(f"Price difference for {self.pair_id} between {exchange1} and {exchange2}: {diff_percent:.2f}%")
+        
+        stats_key, signed_percent, zscore, stats = self._update_spread_stats(quote1, quote2, diff_percent)
+        result['spreads'].append({
+            'exchanges': [exchange1, exchange2],
+            'diff_percent': diff_percent,
+            'zscore': zscore if zscore == zscore else None,
+        })
+        
+        # Determine which exchange has the lower price (buy) and which has the higher price (sell)
+        buy_quote, sell_quote = (quote2, quote1) if quote1.price > quote2.price else (quote1, quote2)
+        
+        # Create the arbitrage opportunity message
+        arb_message = (f"Buy on {buy_quote.venue_name} (${buy_quote.format_price()}) and sell on "
+                       f"{sell_quote.venue_name} (${sell_quote.format_price()}) - Potential profit: {diff_percent:.2f}%")
+        
+        self._observe_opportunity(stats_key, signed_percent, diff_percent, buy_quote, sell_quote,
+                                  arb_message, now, result)
+        if self.should_alert(diff_percent, zscore, stats):
+            self._send_opportunity_alert(arb_message, zscore, stats, result)
+    
+    def _update_spread_stats(self, quote1, quote2, diff_percent):
+        """
+        Update the rolling statistics of the signed spread, keyed by venue id order.
+        
+        Returns:
+            tuple: (stats_key, signed_percent, zscore, stats)
+        """
+        price1 = quote1.price
+        price2 = quote2.price
+        if quote1.venue < quote2.venue:
+            signed_percent = diff_percent if price1 >= price2 else -diff_percent
+            stats_key = (self.pair_id, quote1.venue, quote2.venue)
+        else:
+            signed_percent = diff_percent if price2 >= price1 else -diff_percent
+            stats_key = (self.pair_id, quote2.venue, quote1.venue)
+        zscore, stats = self.spread_stats.update(stats_key, signed_percent)
+        return stats_key, signed_percent, zscore, stats
+    
+    def _observe_opportunity(self, stats_key, signed_percent, diff_percent, buy_quote, sell_quote,
+                             arb_message, now, result):
+        """Feed a spread to the opportunity lifecycle, logging its events and recording the open opportunity."""
+        buy_exchange = buy_quote.venue_name
+        sell_exchange = sell_quote.venue_name
+        buy_price = buy_quote.price
+        sell_price = sell_quote.price
+        
+        # Opportunities are logged when they open, grow or close rather than on every tick
+        for event in self.lifecycle.observe(stats_key, signed_percent, buy_exchange, sell_exchange,
+                                            buy_price, sell_price, now):
+            result['events'].append(event)
+            self._log_event(event, diff_percent, arb_message)
+        
+        opportunity = self.lifecycle.open.get(stats_key)
+        if opportunity is not None:
+            result['opportunities'].append({
+                'buy_exchange': buy_exchange,
+                'buy_price': buy_price,
+                'sell_exchange': sell_exchange,
+                'sell_price': sell_price,
+                'diff_percent': diff_percent,
+                'opened_at': opportunity.opened_at,
+                'peak_percent': opportunity.peak,
+            })
+    
+    def _log_event(self, event, diff_percent, arb_message):
+        """Log an opportunity open, update or close event."""
+        if event['event'] == EVENT_OPEN:
+            logger.warning(f"ARBITRAGE OPPORTUNITY: {self.pair_id}: {arb_message}")
+        elif event['event'] == EVENT_UPDATE:
+            logger.info(
+                f"Opportunity update: {self.pair_id}: {event['buy_exchange']} -> {event['sell_exchange']} "
+                f"open for {format_duration(event['duration'])}, now {diff_percent:.2f}%, "
+                f"peak {event['peak_percent']:.2f}%, average {event['average_percent']:.2f}%"
+            )
+        else:
+            logger.info(
+                f"Opportunity closed: {self.pair_id}: {event['buy_exchange']} -> {event['sell_exchange']} "
+                f"lasted {format_duration(event['duration'])}, "
+                f"peak {event['peak_percent']:.2f}%, average {event['average_percent']:.2f}%"
+            )
+    
+    def _send_opportunity_alert(self, arb_message, zscore, stats, result):
+        """Send an opportunity alert, adding the z-score and recent p99 when known."""
+        alert_message = f"{self.symbol}/{self.base_currency}: {arb_message}"
+        if zscore == zscore:
+            p99 = stats.quantile_values().get(0.99)
+            alert_message += f" (z-score {zscore:.1f}"
+            if p99 is not None and p99 == p99:
+                alert_message += f", recent p99 {p99:.2f}%"
+            alert_message += ")"
+        if self.send_alert(alert_message):
+            result['alerts'].append(alert_message)
+    
+    def run(self, interval_seconds=config.CHECK_INTERVAL, state_file=getattr(config, 'STATE_FILE', None)):
         """
         Run the price discrepancy finder at regular intervals.
         
         Args:
             interval_seconds (int): Time between checks in seconds
+            state_file (str): Warm-start snapshot to load on startup and write on exit (None disables it)
         """
         logger.info(f"Starting price discrepancy finder, checking every {interval_seconds} seconds")
         
+        if state_file:
+            restore_snapshot(state_file, [self], getattr(config, 'STATE_MAX_AGE', None))
+            exit_on_sigterm()
+        
+        scheduler = FixedRateScheduler(
+            interval_seconds,
+            jitter=getattr(config, 'SCHEDULE_JITTER', 0.0),
+            overrun_policy=getattr(config, 'OVERRUN_POLICY', 'skip')
+        )
+        
         try:
             while True:
+                tick = scheduler.wait()
                 logger.info(f"Checking prices for {self.symbol}/{self.base_currency}...")
+                if tick.lateness > 1.0:
+                    logger.warning(f"Tick {tick.index} started {tick.lateness:.2f}s late")
                 
                 # Check if we need to pause due to too many errors
                 if self.consecutive_errors >= config.MAX_ERRORS:
@@ -489,12 +995,16 @@ class PriceDiscrepancyFinder:
                 except Exception as e:
                     logger.error(f"Error checking arbitrage opportunity: {e}")
                     self.consecutive_errors += 1
-                
-                time.sleep(interval_seconds)
         except KeyboardInterrupt:
             logger.info("Price discrepancy finder stopped by user")
         except Exception as e:
             logger.error(f"Unexpected error: {e}")
+        finally:
+            if state_file:
+                try:
+                    save_snapshot(state_file, [self])
+                except Exception as e:
+                    logger.error(f"Error saving state snapshot: {e}")
 
 
 if __name__ == "__main__":
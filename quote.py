@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+
+"""
+Compact quote types shared by every exchange adapter.
+
+A Quote is a single top-of-book snapshot for one market on one venue.
+QuoteBatch is the struct-of-arrays form used by bulk paths (all-ticker
+snapshots, universe scans) so that the number of Python objects created
+per tick does not grow with the number of pairs.
+
+When a market's price decimals are known (from its tick size), prices are
+also kept as exact integer ticks (see fixed_point).
+"""
+
+import sys
+import time
+from array import array
+from fixed_point import SCALES, format_ticks
+
+# Venue identifiers. The index doubles as the position in VENUE_NAMES/VENUE_KEYS.
+VENUE_BINANCE = 0
+VENUE_KRAKEN = 1
+VENUE_COINGECKO = 2
+
+# Display names used in logs and alert messages
+VENUE_NAMES = ("Binance", "Kraken", "CoinGecko")
+
+# Keys used in config.EXCHANGES
+VENUE_KEYS = ("binance", "kraken", "coingecko")
+
+NAN = float('nan')
+
+
+def make_pair_id(symbol, base_currency):
+    """
+    Build the canonical pair identifier used across adapters.
+
+    Args:
+        symbol (str): The cryptocurrency symbol (e.g., 'XRP')
+        base_currency (str): The base currency (e.g., 'USDT')
+
+    Returns:
+        str: An interned pair identifier such as 'XRP/USDT'
+    """
+    return sys.intern(f"{symbol.upper()}/{base_currency.upper()}")
+
+
+def parse_pairs(spec):
+    """
+    Parse a comma-separated list of pairs.
+
+    Args:
+        spec (str or list): "BTC/USDT,ETH/USDT" or a list of "SYMBOL/BASE" strings
+
+    Returns:
+        list: (symbol, base_currency) tuples
+    """
+    items = spec.split(',') if isinstance(spec, str) else spec
+    pairs = []
+    for item in items:
+        item = item.strip()
+        if not item:
+            continue
+        if '/' not in item:
+            raise ValueError(f"Invalid pair '{item}', expected SYMBOL/BASE (e.g., BTC/USDT)")
+        symbol, base = item.split('/', 1)
+        pairs.append((symbol.strip().upper(), base.strip().upper()))
+    return pairs
+
+
+def _same(a, b):
+    """Return True if two price fields are equal, treating NaN as equal to NaN."""
+    return a == b or (a != a and b != b)
+
+
+def _to_float(value):
+    """Convert an exchange field to float, mapping missing values to NaN."""
+    if value is None or value == '':
+        return NAN
+    return float(value)
+
+
+class Quote:
+    """
+    A single top-of-book snapshot for one market on one venue.
+
+    Missing fields are stored as NaN so that every price slot is a plain
+    float. Adapters that poll repeatedly should call update() on an existing
+    Quote instead of creating a new one per tick.
+
+    Once `decimals` is set to the market's price decimals, update() also
+    stores bid, ask and last as integer ticks (0 when missing).
+
+    `version` is incremented whenever update() changes the bid, ask or last
+    price, so consumers can skip work for quotes that did not move.
+    """
+
+    __slots__ = ('venue', 'pair', 'bid', 'ask', 'last', 'volume', 'exchange_ts', 'receive_ts',
+                 'decimals', 'bid_ticks', 'ask_ticks', 'last_ticks', 'version')
+
+    def __init__(self, venue, pair, bid=NAN, ask=NAN, last=NAN, volume=NAN, exchange_ts=NAN, receive_ts=None):
+        """
+        Initialize a quote.
+
+        Args:
+            venue (int): One of the VENUE_* identifiers
+            pair (str): The pair identifier (see make_pair_id)
+            bid (float): Best bid price
+            ask (float): Best ask price
+            last (float): Last traded (or reference) price
+            volume (float): Rolling 24h volume in the base asset
+            exchange_ts (float): Exchange-side timestamp in epoch seconds
+            receive_ts (float): Local receive timestamp in epoch seconds (defaults to now)
+        """
+        self.venue = venue
+        self.pair = pair
+        self.bid = bid
+        self.ask = ask
+        self.last = last
+        self.volume = volume
+        self.exchange_ts = exchange_ts
+        self.receive_ts = time.time() if receive_ts is None else receive_ts
+        self.decimals = None
+        self.bid_ticks = self.ask_ticks = self.last_ticks = 0
+        self.version = 0
+
+    def update(self, bid, ask, last, volume=NAN, exchange_ts=NAN, receive_ts=None):
+        """
+        Overwrite the quote in place and return it.
+
+        Returns:
+            Quote: self, to allow `return quote.update(...)` in adapters
+        """
+        if not (_same(bid, self.bid) and _same(ask, self.ask) and _same(last, self.last)):
+            self.version += 1
+        self.bid = bid
+        self.ask = ask
+        self.last = last
+        self.volume = volume
+        self.exchange_ts = exchange_ts
+        self.receive_ts = time.time() if receive_ts is None else receive_ts
+        if self.decimals is not None:
+            scale = SCALES[self.decimals]
+            # NaN != NaN, so missing prices become 0 ticks
+            self.bid_ticks = round(bid * scale) if bid == bid else 0
+            self.ask_ticks = round(ask * scale) if ask == ask else 0
+            self.last_ticks = round(last * scale) if last == last else 0
+        return self
+
+    @property
+    def venue_name(self):
+        """The display name of the venue."""
+        return VENUE_NAMES[self.venue]
+
+    @property
+    def mid(self):
+        """The bid/ask midpoint, or NaN if either side is missing."""
+        return (self.bid + self.ask) / 2
+
+    @property
+    def price(self):
+        """The reference price: the last trade if known, otherwise the midpoint."""
+        last = self.last
+        if last == last:  # NaN check without a function call
+            return last
+        return self.mid
+
+    def price_ticks(self):
+        """
+        The reference price as exact ticks.
+
+        The midpoint may fall between two ticks, so it is returned at one
+        extra decimal.
+
+        Returns:
+            tuple or None: (ticks, decimals), or None if the market's decimals are unknown
+        """
+        if self.decimals is None:
+            return None
+        if self.last_ticks:
+            return self.last_ticks, self.decimals
+        return (self.bid_ticks + self.ask_ticks) * 5, self.decimals + 1
+
+    def format_price(self):
+        """
+        Format the reference price for logs.
+
+        Uses the exact tick value when the market's decimals are known (with
+        trailing zeros trimmed to two decimals), so sub-dollar prices are not
+        cut to two decimals.
+
+        Returns:
+            str: The formatted price
+        """
+        ticks = self.price_ticks()
+        if ticks is None:
+            return f"{self.price:.8g}"
+        return format_ticks(ticks[0], ticks[1], min_decimals=2)
+
+    def is_valid(self):
+        """Return True if the quote carries a usable reference price."""
+        price = self.price
+        return price == price and price > 0
+
+    def to_dict(self):
+        """
+        Convert the quote to a plain dictionary (NaN fields become None).
+
+        Returns:
+            dict: The quote fields keyed by name
+        """
+        result = {'venue': self.venue_name, 'pair': self.pair}
+        for field in ('bid', 'ask', 'last', 'volume', 'exchange_ts', 'receive_ts'):
+            value = getattr(self, field)
+            result[field] = value if value == value else None
+        return result
+
+    def __repr__(self):
+        return (f"Quote({self.venue_name}, {self.pair}, bid={self.bid}, ask={self.ask}, "
+                f"last={self.last}, volume={self.volume})")
+
+
+class QuoteBatch:
+    """
+    Struct-of-arrays storage for many quotes.
+
+    Each (venue, pair) market owns a fixed slot. Prices live in flat
+    float64 arrays, so refreshing an all-ticker snapshot only writes floats
+    into existing slots instead of allocating a Quote per market. Slots whose
+    price decimals are known (set_decimals) also get bid, ask and last as
+    int64 ticks.
+
+    Writes that change a slot's bid, ask or last price bump the slot's
+    version and add its pair to `dirty`, so consumers can re-evaluate only
+    the pairs that moved and then clear the set.
+    """
+
+    FIELDS = ('bid', 'ask', 'last', 'volume', 'exchange_ts', 'receive_ts')
+    TICK_FIELDS = ('bid_ticks', 'ask_ticks', 'last_ticks')
+
+    def __init__(self, capacity=64):
+        """
+        Initialize an empty batch.
+
+        Args:
+            capacity (int): Number of slots to preallocate
+        """
+        self.capacity = capacity
+        self.size = 0
+        self.venues = array('b', bytes(capacity))
+        self.pairs = [None] * capacity
+        for field in self.FIELDS:
+            setattr(self, field, array('d', [NAN]) * capacity)
+        # Change counter per slot and the pairs changed since the consumer last cleared the set
+        self.versions = array('Q', bytes(8 * capacity))
+        self.dirty = set()
+        # Price decimals per slot (-1 when unknown) and prices in ticks
+        self.decimals = array('b', [-1]) * capacity
+        for field in self.TICK_FIELDS:
+            setattr(self, field, array('q', bytes(8 * capacity)))
+        self._slots = {}
+
+    def __len__(self):
+        return self.size
+
+    def _grow(self):
+        """Double the capacity of every column."""
+        extra = self.capacity
+        self.venues.extend(bytes(extra))
+        self.pairs.extend([None] * extra)
+        for field in self.FIELDS:
+            getattr(self, field).extend(array('d', [NAN]) * extra)
+        self.versions.extend(array('Q', bytes(8 * extra)))
+        self.decimals.extend(array('b', [-1]) * extra)
+        for field in self.TICK_FIELDS:
+            getattr(self, field).extend(array('q', bytes(8 * extra)))
+        self.capacity += extra
+
+    def slot(self, venue, pair):
+        """
+        Return the slot index for a market, allocating it on first use.
+
+        Args:
+            venue (int): One of the VENUE_* identifiers
+            pair (str): The pair identifier
+
+        Returns:
+            int: The slot index
+        """
+        key = (venue, pair)
+        index = self._slots.get(key)
+        if index is None:
+            if self.size == self.capacity:
+                self._grow()
+            index = self.size
+            self.venues[index] = venue
+            self.pairs[index] = pair
+            self._slots[key] = index
+            self.size += 1
+        return index
+
+    def find(self, venue, pair):
+        """Return the slot index for a market, or None if it has never been set."""
+        return self._slots.get((venue, pair))
+
+    def set(self, index, bid, ask, last, volume=NAN, exchange_ts=NAN, receive_ts=NAN):
+        """Write a quote into an existing slot."""
+        if not (_same(bid, self.bid[index]) and _same(ask, self.ask[index]) and _same(last, self.last[index])):
+            self.versions[index] += 1
+            self.dirty.add(self.pairs[index])
+        self.bid[index] = bid
+        self.ask[index] = ask
+        self.last[index] = last
+        self.volume[index] = volume
+        self.exchange_ts[index] = exchange_ts
+        self.receive_ts[index] = receive_ts
+        decimals = self.decimals[index]
+        if decimals >= 0:
+            scale = SCALES[decimals]
+            self.bid_ticks[index] = round(bid * scale) if bid == bid else 0
+            self.ask_ticks[index] = round(ask * scale) if ask == ask else 0
+            self.last_ticks[index] = round(last * scale) if last == last else 0
+
+    def set_decimals(self, index, decimals):
+        """Set the price decimals of a slot so that its prices are also stored as ticks."""
+        self.decimals[index] = -1 if decimals is None else decimals
+
+    def put(self, venue, pair, bid, ask, last, volume=NAN, exchange_ts=NAN, receive_ts=NAN):
+        """Write a quote for a market, allocating its slot if needed."""
+        index = self.slot(venue, pair)
+        self.set(index, bid, ask, last, volume, exchange_ts, receive_ts)
+        return index
+
+    def price(self, index):
+        """Return the reference price (last, falling back to mid) for a slot."""
+        last = self.last[index]
+        if last == last:
+            return last
+        return (self.bid[index] + self.ask[index]) / 2
+
+    def quote(self, index, out=None):
+        """
+        Materialize a slot as a Quote.
+
+        Args:
+            index (int): The slot index
+            out (Quote): An existing Quote to fill in place (avoids an allocation)
+
+        Returns:
+            Quote: The filled quote
+        """
+        if out is None:
+            out = Quote(self.venues[index], self.pairs[index])
+        else:
+            out.venue = self.venues[index]
+            out.pair = self.pairs[index]
+        decimals = self.decimals[index]
+        out.decimals = decimals if decimals >= 0 else None
+        return out.update(self.bid[index], self.ask[index], self.last[index],
+                          self.volume[index], self.exchange_ts[index], self.receive_ts[index])
+
+    def markets(self, venue=None):
+        """
+        Iterate over (index, venue, pair) for the allocated slots.
+
+        Args:
+            venue (int): Restrict to a single venue if given
+        """
+        venues = self.venues
+        pairs = self.pairs
+        for index in range(self.size):
+            if venue is None or venues[index] == venue:
+                yield index, venues[index], pairs[index]
@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+
+"""
+Local publish/subscribe bus for quotes, spreads and opportunity events.
+
+Strategy processes on the same machine connect over a Unix domain socket
+(or local TCP), send one subscribe frame naming the topics they want, and
+then receive every matching message the moment the tracker produces it.
+
+Wire format (all integers little-endian):
+
+    frame   = u32 length | u8 type | body          (length counts type + body)
+    body    = u8 venue | u8 venue2 | u8 n | pair[n] | payload
+
+    MSG_SUBSCRIBE    client -> server; empty pair, payload is comma-separated topics
+    MSG_QUOTE        venue            | f64 bid, ask, last, volume, exchange_ts, receive_ts
+    MSG_SPREAD       venue, venue2    | f64 diff_percent, zscore, ts
+    MSG_OPPORTUNITY  buy, sell venue  | u8 event | f64 opened_at, ts, spread, peak, average,
+                                                         buy_price, sell_price
+
+Missing values are NaN and an unused venue is NO_VENUE. A topic is
+"PAIR", "PAIR:venue", "*:venue" or "*" (venue names as in config.EXCHANGES);
+an empty subscription receives everything.
+
+Each message is encoded once, whatever the number of subscribers. A slow
+subscriber never blocks the tracker: its pending quotes and spreads are
+conflated, so it receives the latest value per (type, pair, venues) when it
+catches up instead of an ever-growing backlog. Opportunity events are never
+conflated: every open, update and close is delivered in the order it
+happened. A subscriber that falls more than `max_pending_events` events
+behind is disconnected rather than silently losing transitions.
+"""
+
+import logging
+import os
+import socket
+import struct
+import threading
+from collections import OrderedDict
+from itertools import count
+from opportunity_lifecycle import EVENT_OPEN, EVENT_UPDATE, EVENT_CLOSE
+from quote import VENUE_NAMES, VENUE_KEYS, NAN
+import config
+
+logger = logging.getLogger(__name__)
+
+MSG_SUBSCRIBE = 0
+MSG_QUOTE = 1
+MSG_SPREAD = 2
+MSG_OPPORTUNITY = 3
+
+NO_VENUE = 255
+
+EVENT_KINDS = (EVENT_OPEN, EVENT_UPDATE, EVENT_CLOSE)
+
+_HEADER = struct.Struct('<IB')
+_TOPIC = struct.Struct('<BBB')
+_QUOTE = struct.Struct('<6d')
+_SPREAD = struct.Struct('<3d')
+_OPPORTUNITY = struct.Struct('<B7d')
+
+_VENUE_IDS = {name: venue for venue, name in enumerate(VENUE_NAMES)}
+_VENUE_IDS.update({key: venue for venue, key in enumerate(VENUE_KEYS)})
+
+# Maximum size of a subscribe frame
+_MAX_SUBSCRIBE = 64 * 1024
+
+
+def parse_address(address):
+    """
+    Parse a bus address.
+
+    Args:
+        address (str or tuple): A Unix socket path, "host:port", or a (host, port) tuple
+
+    Returns:
+        tuple: (socket family, address for bind/connect)
+    """
+    if isinstance(address, tuple):
+        return socket.AF_INET, address
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit() and '/' not in address:
+        return socket.AF_INET, (host or '127.0.0.1', int(port))
+    return socket.AF_UNIX, address
+
+
+def _float(value):
+    """Map None to NaN for the wire."""
+    return NAN if value is None else value
+
+
+def _venue(name):
+    """Map a venue name or config key to its id."""
+    return _VENUE_IDS.get(name, NO_VENUE)
+
+
+def encode_frame(msg_type, pair, venue, venue2, payload=b''):
+    """
+    Encode one frame.
+
+    Args:
+        msg_type (int): One of the MSG_* types
+        pair (str): The pair id (empty for MSG_SUBSCRIBE)
+        venue (int): VENUE_* id or NO_VENUE
+        venue2 (int): VENUE_* id or NO_VENUE
+        payload (bytes): The type-specific payload
+
+    Returns:
+        bytes: The frame
+    """
+    pair_bytes = pair.encode('utf-8')
+    if len(pair_bytes) > 255:
+        raise ValueError(f"Pair id too long for the wire format: {pair}")
+    body = _TOPIC.pack(venue, venue2, len(pair_bytes)) + pair_bytes + payload
+    return _HEADER.pack(len(body) + 1, msg_type) + body
+
+
+def encode_quote(pair, quote):
+    """Encode a quote dict (Quote.to_dict() output) as a MSG_QUOTE frame."""
+    payload = _QUOTE.pack(_float(quote['bid']), _float(quote['ask']), _float(quote['last']),
+                          _float(quote['volume']), _float(quote['exchange_ts']), _float(quote['receive_ts']))
+    return encode_frame(MSG_QUOTE, pair, _venue(quote['venue']), NO_VENUE, payload)
+
+
+def encode_spread(pair, spread, ts):
+    """Encode a spread dict from a check result as a MSG_SPREAD frame."""
+    exchange1, exchange2 = spread['exchanges']
+    payload = _SPREAD.pack(spread['diff_percent'], _float(spread['zscore']), ts)
+    return encode_frame(MSG_SPREAD, pair, _venue(exchange1), _venue(exchange2), payload)
+
+
+def encode_event(event):
+    """Encode an opportunity lifecycle event as a MSG_OPPORTUNITY frame."""
+    payload = _OPPORTUNITY.pack(EVENT_KINDS.index(event['event']), event['opened_at'], event['timestamp'],
+                                event['spread_percent'], event['peak_percent'], event['average_percent'],
+                                event['buy_price'], event['sell_price'])
+    return encode_frame(MSG_OPPORTUNITY, event['pair'], _venue(event['buy_exchange']),
+                        _venue(event['sell_exchange']), payload)
+
+
+def decode_frame(msg_type, body):
+    """
+    Decode a frame body (everything after the header).
+
+    Args:
+        msg_type (int): The frame's MSG_* type
+        body (bytes or bytearray): The frame body
+
+    Returns:
+        dict: The message, with a 'type' of 'quote', 'spread', 'opportunity' or 'subscribe'
+    """
+    venue, venue2, length = _TOPIC.unpack_from(body)
+    offset = _TOPIC.size
+    pair = body[offset:offset + length].decode('utf-8')
+    offset += length
+    if msg_type == MSG_SUBSCRIBE:
+        text = body[offset:].decode('utf-8')
+        return {'type': 'subscribe', 'topics': [topic for topic in text.split(',') if topic]}
+    if msg_type == MSG_QUOTE:
+        bid, ask, last, volume, exchange_ts, receive_ts = _QUOTE.unpack_from(body, offset)
+        return {'type': 'quote', 'pair': pair, 'venue': VENUE_NAMES[venue], 'bid': bid, 'ask': ask,
+                'last': last, 'volume': volume, 'exchange_ts': exchange_ts, 'receive_ts': receive_ts}
+    if msg_type == MSG_SPREAD:
+        diff_percent, zscore, ts = _SPREAD.unpack_from(body, offset)
+        return {'type': 'spread', 'pair': pair, 'exchanges': [VENUE_NAMES[venue], VENUE_NAMES[venue2]],
+                'diff_percent': diff_percent, 'zscore': zscore, 'timestamp': ts}
+    if msg_type == MSG_OPPORTUNITY:
+        kind, opened_at, ts, spread, peak, average, buy_price, sell_price = _OPPORTUNITY.unpack_from(body, offset)
+        return {'type': 'opportunity', 'event': EVENT_KINDS[kind], 'pair': pair,
+                'buy_exchange': VENUE_NAMES[venue], 'sell_exchange': VENUE_NAMES[venue2],
+                'opened_at': opened_at, 'timestamp': ts, 'spread_percent': spread, 'peak_percent': peak,
+                'average_percent': average, 'buy_price': buy_price, 'sell_price': sell_price}
+    raise ValueError(f"Unknown message type {msg_type}")
+
+
+def parse_topics(topics):
+    """
+    Parse subscription topics.
+
+    Args:
+        topics (list): Topic strings ("XRP/USDT", "XRP/USDT:kraken", "*:binance", "*")
+
+    Returns:
+        list or None: (pair or None, venue id or None) filters, or None to match everything
+    """
+    filters = []
+    for topic in topics:
+        pair, _, venue = topic.strip().partition(':')
+        pair = None if pair in ('', '*') else pair.upper()
+        if venue in ('', '*'):
+            venue = None
+        else:
+            venue = _VENUE_IDS.get(venue.lower(), _VENUE_IDS.get(venue))
+            if venue is None:
+                raise ValueError(f"Unknown venue in topic: {topic}")
+        if pair is None and venue is None:
+            return None
+        filters.append((pair, venue))
+    return filters or None
+
+
+class _Subscriber:
+    """A connected subscriber and its conflated outbox."""
+
+    def __init__(self, connection, name, filters, max_pending_events):
+        self.connection = connection
+        self.name = name
+        self.filters = filters
+        self.max_pending_events = max_pending_events
+        self.condition = threading.Condition()
+        # (type, pair, venue, venue2) -> frame for conflated messages, or a unique
+        # sequence key for events, in first-pending order
+        self.pending = OrderedDict()
+        self.pending_events = 0
+        self._sequence = count()
+        self.closed = False
+        self.overflowed = False
+        self.sent = 0
+        self.conflated = 0
+
+    def matches(self, pair, venue, venue2):
+        if self.filters is None:
+            return True
+        for want_pair, want_venue in self.filters:
+            if want_pair is not None and want_pair != pair:
+                continue
+            if want_venue is not None and want_venue != venue and want_venue != venue2:
+                continue
+            return True
+        return False
+
+    def offer(self, key, frame):
+        """Queue a frame; a key of None queues it in order without conflation."""
+        with self.condition:
+            if self.closed:
+                return
+            if key is None:
+                if self.pending_events >= self.max_pending_events:
+                    # Dropping an event would leave the subscriber with a wrong lifecycle state
+                    self.overflowed = True
+                    self.closed = True
+                    self.condition.notify()
+                    return
+                self.pending_events += 1
+                key = (None, next(self._sequence))
+            elif key in self.pending:
+                self.conflated += 1
+            self.pending[key] = frame
+            self.condition.notify()
+
+
+class QuoteBus:
+    """Publishes tracker results to local subscribers."""
+
+    def __init__(self, address, max_pending_events=None):
+        """
+        Initialize the bus (it does not accept subscribers until start() is called).
+
+        Args:
+            address (str or tuple): A Unix socket path, "host:port", or a (host, port) tuple
+            max_pending_events (int): Undelivered opportunity events after which a subscriber
+                is disconnected (defaults to config.QUOTE_BUS_MAX_PENDING_EVENTS)
+        """
+        self.family, self.address = parse_address(address)
+        if max_pending_events is None:
+            max_pending_events = getattr(config, 'QUOTE_BUS_MAX_PENDING_EVENTS', 10000)
+        self.max_pending_events = max_pending_events
+        self.subscribers = []
+        self._lock = threading.Lock()
+        self._socket = None
+        self._thread = None
+        self.published = 0
+
+    def start(self):
+        """Listen for subscribers on a background daemon thread."""
+        if self.family == socket.AF_UNIX and os.path.exists(self.address):
+            # A stale socket file from a previous run would make bind() fail
+            os.unlink(self.address)
+        sock = socket.socket(self.family, socket.SOCK_STREAM)
+        if self.family == socket.AF_INET:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(self.address)
+        sock.listen(16)
+        self._socket = sock
+        if self.family == socket.AF_INET:
+            self.address = sock.getsockname()
+        self._thread = threading.Thread(target=self._accept_loop, name="quote-bus", daemon=True)
+        self._thread.start()
+        logger.info(f"Quote bus listening on {self.address}")
+
+    def stop(self):
+        """Close the listening socket and disconnect every subscriber."""
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+            if self.family == socket.AF_UNIX and os.path.exists(self.address):
+                os.unlink(self.address)
+        for subscriber in self.subscribers:
+            self._drop(subscriber)
+
+    def _accept_loop(self):
+        while True:
+            sock = self._socket
+            if sock is None:
+                return
+            try:
+                connection, peer = sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(connection, peer or 'unix'),
+                             name="quote-bus-subscriber", daemon=True).start()
+
+    def _serve(self, connection, peer):
+        """Read the subscribe frame, then send the subscriber's pending messages as they arrive."""
+        try:
+            if self.family == socket.AF_INET:
+                connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            connection.settimeout(10)
+            length, msg_type = _HEADER.unpack(_recv_exact(connection, _HEADER.size))
+            if msg_type != MSG_SUBSCRIBE or length > _MAX_SUBSCRIBE:
+                raise ValueError("Expected a subscribe frame")
+            message = decode_frame(msg_type, _recv_exact(connection, length - 1))
+            filters = parse_topics(message['topics'])
+            connection.settimeout(None)
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning(f"Rejected quote bus subscriber {peer}: {e}")
+            connection.close()
+            return
+
+        subscriber = _Subscriber(connection, peer, filters, self.max_pending_events)
+        with self._lock:
+            # Copy on write, so publish() can iterate without taking the lock
+            self.subscribers = self.subscribers + [subscriber]
+        logger.info(f"Quote bus subscriber {peer} connected ({', '.join(message['topics']) or 'all topics'})")
+
+        while True:
+            with subscriber.condition:
+                while not subscriber.pending and not subscriber.closed:
+                    subscriber.condition.wait()
+                if subscriber.closed:
+                    break
+                frames = list(subscriber.pending.values())
+                subscriber.pending.clear()
+                subscriber.pending_events = 0
+            try:
+                connection.sendall(b''.join(frames))
+                subscriber.sent += len(frames)
+            except OSError:
+                break
+        self._drop(subscriber)
+        if subscriber.overflowed:
+            logger.warning(f"Quote bus subscriber {peer} disconnected: more than "
+                           f"{self.max_pending_events} opportunity events behind")
+        else:
+            logger.info(f"Quote bus subscriber {peer} disconnected")
+
+    def _drop(self, subscriber):
+        with self._lock:
+            if subscriber in self.subscribers:
+                self.subscribers = [other for other in self.subscribers if other is not subscriber]
+        with subscriber.condition:
+            subscriber.closed = True
+            subscriber.condition.notify()
+        try:
+            subscriber.connection.close()
+        except OSError:
+            pass
+
+    def publish(self, key, pair, venue, venue2, frame):
+        """
+        Hand an encoded frame to every matching subscriber.
+
+        Args:
+            key (tuple): Conflation key; a pending frame with the same key is replaced.
+                None queues the frame in order without conflation
+            pair (str): The pair id
+            venue (int): VENUE_* id or NO_VENUE
+            venue2 (int): VENUE_* id or NO_VENUE
+            frame (bytes): The encoded frame
+        """
+        self.published += 1
+        for subscriber in self.subscribers:
+            if subscriber.matches(pair, venue, venue2):
+                subscriber.offer(key, frame)
+
+    def publish_result(self, result):
+        """
+        Publish a check result's quotes, spreads and opportunity events.
+
+        Intended as a tracker result listener. Results where no quote
+        changed are not published.
+
+        Args:
+            result (dict): A PriceDiscrepancyFinder.check_arbitrage_opportunity() result
+        """
+        if not self.subscribers or not result.get('changed', True):
+            return
+        pair = result['pair']
+        ts = 0.0
+        for quote in result['quotes']:
+            venue = _venue(quote['venue'])
+            self.publish((MSG_QUOTE, pair, venue), pair, venue, NO_VENUE, encode_quote(pair, quote))
+            if quote['receive_ts'] is not None and quote['receive_ts'] > ts:
+                ts = quote['receive_ts']
+        for spread in result['spreads']:
+            exchange1, exchange2 = spread['exchanges']
+            venue, venue2 = _venue(exchange1), _venue(exchange2)
+            self.publish((MSG_SPREAD, pair, venue, venue2), pair, venue, venue2, encode_spread(pair, spread, ts))
+        for event in result['events']:
+            venue, venue2 = _venue(event['buy_exchange']), _venue(event['sell_exchange'])
+            # Events are delivered in order, never conflated
+            self.publish(None, pair, venue, venue2, encode_event(event))
+
+    def stats(self):
+        """
+        Return bus statistics.
+
+        Returns:
+            dict: Messages published, and per-subscriber sent, conflated and pending counts
+        """
+        subscribers = self.subscribers
+        return {
+            'published': self.published,
+            'subscribers': [
+                {'peer': str(subscriber.name), 'sent': subscriber.sent, 'conflated': subscriber.conflated,
+                 'pending': len(subscriber.pending)}
+                for subscriber in subscribers
+            ],
+        }
+
+
+def _recv_exact(connection, size):
+    """Read exactly `size` bytes from a socket."""
+    buffer = bytearray()
+    while len(buffer) < size:
+        chunk = connection.recv(size - len(buffer))
+        if not chunk:
+            raise ConnectionError("Connection closed")
+        buffer += chunk
+    return buffer
+
+
+class QuoteBusClient:
+    """Subscribes to a QuoteBus and iterates over decoded messages."""
+
+    def __init__(self, address, topics=None):
+        """
+        Connect and subscribe.
+
+        Args:
+            address (str or tuple): The bus address (see parse_address)
+            topics (list): Topic strings (see parse_topics); None subscribes to everything
+        """
+        family, address = parse_address(address)
+        self.connection = socket.socket(family, socket.SOCK_STREAM)
+        self.connection.connect(address)
+        if family == socket.AF_INET:
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.connection.sendall(encode_frame(MSG_SUBSCRIBE, '', NO_VENUE, NO_VENUE,
+                                             ','.join(topics or ()).encode('utf-8')))
+        self._buffer = bytearray()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return self.recv()
+        except ConnectionError:
+            raise StopIteration
+
+    def recv(self):
+        """
+        Block until the next message arrives.
+
+        Returns:
+            dict: The decoded message (see decode_frame)
+        """
+        buffer = self._buffer
+        while True:
+            if len(buffer) >= _HEADER.size:
+                length, msg_type = _HEADER.unpack_from(buffer)
+                end = _HEADER.size + length - 1
+                if len(buffer) >= end:
+                    message = decode_frame(msg_type, bytes(buffer[_HEADER.size:end]))
+                    del buffer[:end]
+                    return message
+            chunk = self.connection.recv(65536)
+            if not chunk:
+                raise ConnectionError("Quote bus closed the connection")
+            buffer += chunk
+
+    def close(self):
+        """Close the connection."""
+        self.connection.close()
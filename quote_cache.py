@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+
+"""
+Process-wide quote cache with single-flight request deduplication.
+
+Several PriceDiscrepancyFinder instances in one process (the multi-pair
+tracker, coin_selector, sample_run or embedded uses) often ask for the
+same ticker within moments of each other. The cache keeps each
+(venue, market) result for a short TTL, and concurrent callers asking for
+a key that is already being fetched wait for that request instead of
+issuing their own, so N consumers cost one upstream call.
+
+Cached values are plain tuples of quote fields, never Quote objects:
+every finder copies them into its own reusable Quote, which keeps its
+version counter and tick fields per finder.
+
+The number of entries is bounded: the least recently used key is evicted
+once `max_entries` is reached, so markets that are no longer tracked do not
+stay in memory.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+import config
+
+
+class _Flight:
+    """One in-flight fetch that other callers can wait on."""
+
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class QuoteCache:
+    """TTL and LRU cache keyed by (venue, market) with single-flight fetches."""
+
+    def __init__(self, ttl=1.0, clock=time.monotonic, max_entries=None):
+        """
+        Initialize the cache.
+
+        Args:
+            ttl (float): Seconds a fetched value stays fresh (0 disables caching but
+                still deduplicates concurrent fetches)
+            clock (callable): Monotonic clock returning seconds
+            max_entries (int): Most keys kept before the least recently used is evicted (None for no limit)
+        """
+        self.ttl = ttl
+        self.clock = clock
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # key -> (fetched at, value), least recently used first
+        self._entries = OrderedDict()
+        # key -> _Flight for fetches in progress
+        self._flights = {}
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.evictions = 0
+
+    def get(self, key, fetch):
+        """
+        Return the cached value for a key, fetching it if missing or stale.
+
+        Only one caller fetches a given key at a time; concurrent callers
+        wait for it and receive the same value, or the same exception.
+        Exceptions are not cached.
+
+        Args:
+            key (tuple): (venue, market) identifying the upstream request
+            fetch (callable): Called without arguments to fetch the value
+
+        Returns:
+            The value returned by fetch (possibly None)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.clock() - entry[0] < self.ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry[1]
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+                self.misses += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            value = fetch()
+        except BaseException as e:
+            flight.error = e
+            raise
+        else:
+            flight.value = value
+            return value
+        finally:
+            with self._lock:
+                if flight.error is None:
+                    self._entries[key] = (self.clock(), flight.value)
+                    self._entries.move_to_end(key)
+                    if self.max_entries is not None:
+                        while len(self._entries) > self.max_entries:
+                            self._entries.popitem(last=False)
+                            self.evictions += 1
+                del self._flights[key]
+            flight.done.set()
+
+    def invalidate(self, key=None):
+        """Drop one cached key, or every key if none is given."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def prune(self):
+        """Drop entries that are no longer fresh."""
+        now = self.clock()
+        with self._lock:
+            stale = [key for key, (fetched_at, _) in self._entries.items() if now - fetched_at >= self.ttl]
+            for key in stale:
+                del self._entries[key]
+
+    def stats(self):
+        """
+        Return cache statistics.
+
+        Returns:
+            dict: Entries, hits, misses (upstream fetches), shared in-flight waits and LRU evictions
+        """
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'shared': self.shared,
+            'evictions': self.evictions,
+        }
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_quote_cache():
+    """
+    Return the process-wide quote cache, or None if QUOTE_CACHE_TTL is None.
+
+    The cache is created on first use; later changes to QUOTE_CACHE_TTL
+    and QUOTE_CACHE_MAX_ENTRIES update it.
+
+    Returns:
+        QuoteCache or None: The shared cache
+    """
+    global _shared_cache
+    ttl = getattr(config, 'QUOTE_CACHE_TTL', 1.0)
+    if ttl is None:
+        return None
+    max_entries = getattr(config, 'QUOTE_CACHE_MAX_ENTRIES', 10000)
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = QuoteCache(ttl, max_entries=max_entries)
+        else:
+            _shared_cache.ttl = ttl
+            _shared_cache.max_entries = max_entries
+        return _shared_cache
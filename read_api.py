@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+
+"""
+Local read API serving the tracker's cached spread snapshots.
+
+Other services can ask "what is the XRP spread right now" without running
+their own tracker. The server runs on a background thread and only ever
+reads the snapshot the tracker publishes once per tick; requests never
+touch the exchanges. Each endpoint's JSON body and ETag are computed once
+per snapshot, so serving a request is a dictionary lookup and a write, and
+clients that send If-None-Match get an empty 304 when nothing changed.
+
+Endpoints:
+    /snapshot        Everything below in one document
+    /quotes          Latest quotes per pair
+    /spreads         Latest spreads per pair
+    /bbo             Consolidated best bid and ask across venues per pair
+    /opportunities   Open opportunities across all pairs
+    /health          Tracker and venue health
+"""
+
+import logging
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json_utils
+
+logger = logging.getLogger(__name__)
+
+
+def render_snapshot(snapshot):
+    """
+    Pre-render every endpoint for a snapshot.
+
+    Args:
+        snapshot (dict): The tracker snapshot (see MultiPairTracker.build_snapshot)
+
+    Returns:
+        dict: path -> (body bytes, ETag)
+    """
+    pairs = snapshot['pairs']
+    documents = {
+        '/snapshot': snapshot,
+        '/quotes': {pair: entry['quotes'] for pair, entry in pairs.items()},
+        '/spreads': {pair: entry['spreads'] for pair, entry in pairs.items()},
+        '/bbo': {pair: entry['bbo'] for pair, entry in pairs.items()},
+        '/opportunities': snapshot['opportunities'],
+        '/health': snapshot['health'],
+    }
+    responses = {}
+    for path, document in documents.items():
+        body = json_utils.dumps(document)
+        responses[path] = (body, f'"{zlib.crc32(body):08x}-{len(body):x}"')
+    return responses
+
+
+class ReadApiHandler(BaseHTTPRequestHandler):
+    """Serves pre-rendered snapshot responses."""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "CrossExchangeTracker"
+    # Buffer each response into a single write (flushed after every request) and
+    # disable Nagle, so keep-alive clients are not held up by delayed ACKs
+    wbufsize = 64 * 1024
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0].rstrip('/') or '/snapshot'
+        responses = self.server.responses
+        if responses is None:
+            self._send_empty(503)
+            return
+
+        response = responses.get(path)
+        if response is None:
+            self._send_empty(404)
+            return
+
+        body, etag = response
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_empty(self, status):
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        # Per-request access logs would dominate the tracker's log at high request rates
+        pass
+
+
+class ReadApiServer(ThreadingHTTPServer):
+    """HTTP server holding the latest pre-rendered snapshot."""
+
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=8080):
+        """
+        Initialize the server (it does not start serving until start() is called).
+
+        Args:
+            host (str): Address to bind
+            port (int): Port to bind (0 picks a free port)
+        """
+        super().__init__((host, port), ReadApiHandler)
+        self.responses = None
+        self._thread = None
+
+    def publish(self, snapshot):
+        """
+        Replace the served snapshot. Intended as a tracker snapshot listener.
+
+        Args:
+            snapshot (dict): The tracker snapshot
+        """
+        # Swapping the reference is atomic, so handlers never see a half-built set
+        self.responses = render_snapshot(snapshot)
+
+    def start(self):
+        """Serve requests on a background daemon thread."""
+        self._thread = threading.Thread(target=self.serve_forever, name="read-api", daemon=True)
+        self._thread.start()
+        host, port = self.server_address[:2]
+        logger.info(f"Read API listening on http://{host}:{port}")
+
+    def stop(self):
+        """Stop serving and close the socket."""
+        self.shutdown()
+        self.server_close()
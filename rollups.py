@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+
+"""
+Multi-resolution rollups of quotes and spreads.
+
+While the tracker runs, RollupRecorder (a tracker result listener) records
+the raw quotes to the history store and keeps 1-minute, 1-hour and 1-day
+rollups of every exchange price and exchange-pair spread: open, high, low,
+close, mean and count. Each rollup is updated in place as checks arrive and
+written when its period ends, so a 90-day hourly chart reads about two
+thousand rollup rows instead of millions of quotes.
+
+Rows are written as a segment every flush interval. To keep the number of
+files down, every few flushes the recorder merges the small segments it
+has written so far into segments of up to DEFAULT_SEGMENT_ROWS rows.
+
+Rollups still open when the tracker stops are written as they are; the
+next run continues the same period in a new row, and query() merges rows
+of the same period.
+
+Usage:
+    python3 rollups.py -p ETH/USDT -e binance,kraken -r 1h --days 90
+"""
+
+import argparse
+import csv
+import logging
+import sys
+import time
+import numpy as np
+from history_store import HistoryStore
+from quote import VENUE_NAMES, VENUE_KEYS
+import history_store
+import config
+
+logger = logging.getLogger(__name__)
+
+RESOLUTIONS = {'1m': 60, '1h': 3600, '1d': 86400}
+
+_VENUE_IDS = {name: venue for venue, name in enumerate(VENUE_NAMES)}
+_VENUE_IDS.update({key: venue for venue, key in enumerate(VENUE_KEYS)})
+
+
+class Rollup:
+    """Open, high, low, close, sum and count of the values in one period."""
+
+    __slots__ = ('start', 'open', 'high', 'low', 'close', 'total', 'count')
+
+    def __init__(self, start, value):
+        self.start = start
+        self.open = self.high = self.low = self.close = value
+        self.total = value
+        self.count = 1
+
+    def add(self, value):
+        """Add a value observed after every value so far."""
+        if value > self.high:
+            self.high = value
+        elif value < self.low:
+            self.low = value
+        self.close = value
+        self.total += value
+        self.count += 1
+
+    def merge(self, other):
+        """Merge a rollup of the same period that covers later values."""
+        self.high = max(self.high, other.high)
+        self.low = min(self.low, other.low)
+        self.close = other.close
+        self.total += other.total
+        self.count += other.count
+
+    @property
+    def mean(self):
+        return self.total / self.count
+
+    def to_dict(self):
+        """Return the rollup as a plain dictionary."""
+        return {'ts': self.start, 'open': self.open, 'high': self.high, 'low': self.low,
+                'close': self.close, 'mean': self.mean, 'count': self.count}
+
+
+def resolution_seconds(resolution):
+    """Return a resolution's length in seconds ('1h' or 3600)."""
+    if resolution in RESOLUTIONS:
+        return RESOLUTIONS[resolution]
+    return int(resolution)
+
+
+class RollupRecorder:
+    """Records raw quotes and keeps their rollups up to date."""
+
+    def __init__(self, store=None, resolutions=None, record_quotes=True, flush_interval=None, compact_every=None):
+        """
+        Initialize the recorder.
+
+        Args:
+            store (HistoryStore): Destination (defaults to config.HISTORY_DIR)
+            resolutions (list): Rollup periods, keys of RESOLUTIONS or seconds (defaults to config.ROLLUP_RESOLUTIONS)
+            record_quotes (bool): Also record every raw quote to the 'quotes' table
+            flush_interval (float): Seconds between segment writes (defaults to config.HISTORY_FLUSH_INTERVAL)
+            compact_every (int): Flushes between merges of the written segments
+                (defaults to config.HISTORY_COMPACT_FLUSHES; 0 disables merging)
+        """
+        self.store = store or HistoryStore()
+        if resolutions is None:
+            resolutions = getattr(config, 'ROLLUP_RESOLUTIONS', list(RESOLUTIONS))
+        self.resolutions = sorted(resolution_seconds(resolution) for resolution in resolutions)
+        if flush_interval is None:
+            flush_interval = getattr(config, 'HISTORY_FLUSH_INTERVAL', 300)
+        self.flush_interval = flush_interval
+        if compact_every is None:
+            compact_every = getattr(config, 'HISTORY_COMPACT_FLUSHES', 12)
+        self.compact_every = compact_every
+        self.flushes = 0
+
+        # Segments are written on the flush interval rather than by size
+        source = f"tracker-{time.time_ns()}"
+        unbounded = float('inf')
+        self.quote_writer = self.store.writer('quotes', source, unbounded) if record_quotes else None
+        self.quote_rollup_writer = self.store.writer('quote_rollups', source, unbounded)
+        self.spread_rollup_writer = self.store.writer('spread_rollups', source, unbounded)
+
+        # (pair, venue, resolution) and (pair, venue_lo, venue_hi, resolution) -> open Rollup
+        self.quote_rollups = {}
+        self.spread_rollups = {}
+        self.rollups_written = 0
+        self._next_flush = time.monotonic() + flush_interval
+
+    def record_result(self, result):
+        """
+        Record a check result's quotes and spreads.
+
+        Intended as a tracker result listener. Results where no quote
+        changed are skipped.
+
+        Args:
+            result (dict): A PriceDiscrepancyFinder.check_arbitrage_opportunity() result
+        """
+        if not result.get('changed', True):
+            return
+        pair = result['pair']
+        # One timestamp per check, so the quotes of a check share it in the raw table
+        ts = max((quote['receive_ts'] for quote in result['quotes'] if quote['receive_ts'] is not None),
+                 default=None)
+        if ts is None:
+            ts = time.time()
+        for quote in result['quotes']:
+            venue = _VENUE_IDS.get(quote['venue'])
+            price = quote_price(quote)
+            if venue is None or price is None:
+                continue
+            if self.quote_writer is not None:
+                self.quote_writer.append(ts, pair, venue, price)
+            self.observe(self.quote_rollups, (pair, venue), ts, price)
+        for spread in result['spreads']:
+            venue1, venue2 = (_VENUE_IDS.get(exchange) for exchange in spread['exchanges'])
+            if venue1 is None or venue2 is None:
+                continue
+            key = (pair, venue1, venue2) if venue1 < venue2 else (pair, venue2, venue1)
+            self.observe(self.spread_rollups, key, ts, spread['diff_percent'])
+
+        if time.monotonic() >= self._next_flush:
+            self.flush(ts)
+
+    def observe(self, rollups, key, ts, value):
+        """
+        Add a value to the open rollup of every resolution, closing periods that ended.
+
+        Args:
+            rollups (dict): self.quote_rollups or self.spread_rollups
+            key (tuple): (pair, venue) or (pair, venue_lo, venue_hi)
+            ts (float): Observation time in epoch seconds
+            value (float): Price or spread percentage
+        """
+        for resolution in self.resolutions:
+            start = ts - ts % resolution
+            slot = key + (resolution,)
+            rollup = rollups.get(slot)
+            if rollup is not None and rollup.start == start:
+                rollup.add(value)
+                continue
+            if rollup is not None:
+                self._write(rollups, slot, rollup)
+            rollups[slot] = Rollup(start, value)
+
+    def _write(self, rollups, slot, rollup):
+        """Append a rollup row to its table's writer."""
+        writer = self.quote_rollup_writer if rollups is self.quote_rollups else self.spread_rollup_writer
+        pair, *venues, resolution = slot
+        writer.append(rollup.start, pair, *venues, resolution, rollup.open, rollup.high, rollup.low,
+                      rollup.close, rollup.mean, rollup.count)
+        self.rollups_written += 1
+
+    def flush(self, now=None):
+        """
+        Write rollups whose period has ended and the buffered rows as segments.
+
+        Args:
+            now (float): Current epoch time (defaults to time.time())
+        """
+        now = time.time() if now is None else now
+        for rollups in (self.quote_rollups, self.spread_rollups):
+            for slot in [slot for slot, rollup in rollups.items() if rollup.start + slot[-1] <= now]:
+                self._write(rollups, slot, rollups.pop(slot))
+        self.flushes += 1
+        compact = self.compact_every and self.flushes % self.compact_every == 0
+        for writer in (self.quote_writer, self.quote_rollup_writer, self.spread_rollup_writer):
+            if writer is not None:
+                try:
+                    writer.flush()
+                    if compact:
+                        writer.compact()
+                except OSError as e:
+                    logger.error(f"Error writing {writer.table} history: {e}")
+        self._next_flush = time.monotonic() + self.flush_interval
+
+    def close(self):
+        """Write every rollup, including those still open, and flush and merge the segments."""
+        for rollups in (self.quote_rollups, self.spread_rollups):
+            for slot, rollup in rollups.items():
+                self._write(rollups, slot, rollup)
+            rollups.clear()
+        self.flush()
+        for writer in (self.quote_writer, self.quote_rollup_writer, self.spread_rollup_writer):
+            if writer is not None and self.compact_every:
+                try:
+                    writer.compact()
+                except OSError as e:
+                    logger.error(f"Error merging {writer.table} history segments: {e}")
+        logger.info(f"Recorded {self.rollups_written} rollups to {self.store.root}")
+
+
+def quote_price(quote):
+    """Return a quote dictionary's reference price (last, falling back to mid), or None."""
+    if quote['last'] is not None:
+        return quote['last']
+    if quote['bid'] is not None and quote['ask'] is not None:
+        return (quote['bid'] + quote['ask']) / 2
+    return None
+
+
+def query(store, pair, resolution='1h', start=None, end=None, venues=None, table='spread_rollups'):
+    """
+    Read rollups of one pair, merging rows of the same period.
+
+    Args:
+        store (HistoryStore): Source of rollups
+        pair (str): Pair id
+        resolution (str or int): Key of RESOLUTIONS or seconds
+        start (float): Only periods starting at or after this epoch time
+        end (float): Only periods starting before this epoch time
+        venues (tuple): Exchange names or keys to keep: two for spreads, one for quotes (None for all)
+        table (str): 'spread_rollups' or 'quote_rollups'
+
+    Returns:
+        list: Rollup dictionaries in time order, with the exchange names under 'exchanges'
+    """
+    seconds = resolution_seconds(resolution)
+    venue_columns = ('venue_lo', 'venue_hi') if table == 'spread_rollups' else ('venue',)
+    columns, _ = store.load_arrays(table, [pair], start, end)
+    mask = columns['resolution'] == seconds
+    if venues is not None:
+        wanted = sorted(_VENUE_IDS[venue] for venue in venues)
+        for name, venue in zip(venue_columns, wanted):
+            mask &= columns[name] == venue
+    rows = {name: values[mask] for name, values in columns.items()}
+    if not len(rows['ts']):
+        return []
+
+    # Group rows of the same period and exchanges. The sort is stable, so rows of a
+    # group keep segment order, in which later rows continue the period.
+    order = np.lexsort([rows[name] for name in reversed(venue_columns)] + [rows['ts']])
+    rows = {name: values[order] for name, values in rows.items()}
+    keys = np.column_stack([rows[name] for name in venue_columns] + [rows['ts']])
+    starts = np.flatnonzero(np.r_[True, (keys[1:] != keys[:-1]).any(axis=1)])
+    ends = np.r_[starts[1:], len(keys)] - 1
+    counts = np.add.reduceat(rows['count'].astype(np.int64), starts)
+    totals = np.add.reduceat(rows['mean'] * rows['count'], starts)
+    merged = {
+        'ts': rows['ts'][starts],
+        'open': rows['open'][starts],
+        'high': np.maximum.reduceat(rows['high'], starts),
+        'low': np.minimum.reduceat(rows['low'], starts),
+        'close': rows['close'][ends],
+        'mean': totals / counts,
+        'count': counts,
+    }
+    exchanges = [[VENUE_NAMES[venue] for venue in key] for key in
+                 np.column_stack([rows[name][starts] for name in venue_columns]).tolist()]
+    result = [dict(zip(merged, values)) for values in zip(*(merged[name].tolist() for name in merged))]
+    for row, names in zip(result, exchanges):
+        row['exchanges'] = names
+    return result
+
+
+def main():
+    """Parse command-line arguments and print rollups."""
+    parser = argparse.ArgumentParser(
+        description="Query spread or price rollups recorded by the tracker",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("-p", "--pair", required=True, help="Pair (e.g., ETH/USDT)")
+    parser.add_argument("-e", "--exchanges", default=None,
+                        help="Two exchanges for spreads or one with --prices (defaults to all)")
+    parser.add_argument("-r", "--resolution", choices=list(RESOLUTIONS), default="1h", help="Rollup period")
+    parser.add_argument("--days", type=float, default=7, help="How many days back to read")
+    parser.add_argument("--prices", action="store_true", help="Show exchange price rollups instead of spreads")
+    parser.add_argument("--csv", action="store_true", help="Print CSV instead of a table")
+    parser.add_argument("--history-dir", default=history_store.default_history_dir(), help="History store directory")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    venues = [venue.strip() for venue in args.exchanges.split(',')] if args.exchanges else None
+    table = 'quote_rollups' if args.prices else 'spread_rollups'
+    if venues is not None and (len(venues) != (1 if args.prices else 2)
+                               or any(venue not in _VENUE_IDS for venue in venues)):
+        parser.error("--exchanges needs two exchange names (one with --prices), e.g. binance,kraken")
+    rows = query(HistoryStore(args.history_dir), args.pair.upper(), args.resolution,
+                 start=time.time() - args.days * 86400, venues=venues, table=table)
+
+    headers = ['time', 'exchanges', 'open', 'high', 'low', 'close', 'mean', 'count']
+    if args.csv:
+        writer = csv.writer(sys.stdout)
+        writer.writerow(headers)
+        for row in rows:
+            writer.writerow([row['ts'], '-'.join(row['exchanges'])] + [row[name] for name in headers[2:]])
+        return
+    if not rows:
+        print(f"No {args.resolution} rollups for {args.pair.upper()}")
+        return
+    print(f"{'Time (UTC)':<17} {'Exchanges':<18} {'Open':>12} {'High':>12} {'Low':>12} {'Close':>12} "
+          f"{'Mean':>12} {'Count':>7}")
+    for row in rows:
+        stamp = time.strftime("%Y-%m-%d %H:%M", time.gmtime(row['ts']))
+        values = ' '.join(f"{row[name]:>12.4f}" for name in headers[2:7])
+        print(f"{stamp:<17} {'-'.join(row['exchanges']):<18} {values} {row['count']:>7}")
+
+
+if __name__ == "__main__":
+    main()
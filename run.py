@@ -6,10 +6,29 @@ This script allows you to run the finder with custom parameters without editing
 """
 
 import argparse
+import atexit
 import logging
-from price_discrepancy_finder import PriceDiscrepancyFinder
+import math
+import sys
+import threading
+import time
+from datetime import datetime
+from tracker import MultiPairTracker
+from quote import parse_pairs
+from read_api import ReadApiServer
+from quote_bus import QuoteBus
+from config_reload import ConfigWatcher
+from adaptive_sampler import AdaptiveSampler
+from backfill import seed_spread_stats
+from rollups import RollupRecorder
+from dashboard import Dashboard
+from memory_budget import MemoryBudget
+from state_snapshot import exit_on_sigterm
+from universe_scanner import UniverseScanner, print_scan_results
 import config
 
+logger = logging.getLogger(__name__)
+
 def main():
     """Parse command-line arguments and run the price discrepancy finder."""
     parser = argparse.ArgumentParser(
@@ -68,6 +87,122 @@ def main():
         help="Disable CoinGecko exchange"
     )
     
+    parser.add_argument(
+        "-p", "--pairs",
+        default=",".join(getattr(config, 'PAIRS', [])) or None,
+        help="Comma-separated pairs to track (e.g., BTC/USDT,ETH/USDT); overrides --symbol/--base"
+    )
+    
+    parser.add_argument(
+        "--once",
+        action="store_true",
+        help="Check every pair once, write a summary and exit"
+    )
+    
+    parser.add_argument(
+        "--duration",
+        type=float,
+        help="Check every pair repeatedly for this many seconds, write a summary and exit"
+    )
+    
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        help="Hard time limit in seconds for --once/--duration runs (default: duration plus one interval)"
+    )
+    
+    parser.add_argument(
+        "--summary-json",
+        default=getattr(config, 'SUMMARY_FILE', None),
+        help="Write a JSON summary of quotes, spreads and alerts to this file (--once/--duration)"
+    )
+    
+    parser.add_argument(
+        "--serve-port",
+        type=int,
+        default=getattr(config, 'READ_API_PORT', None),
+        help="Serve the latest quotes, spreads and health over HTTP on this local port"
+    )
+    
+    parser.add_argument(
+        "--bus",
+        default=getattr(config, 'QUOTE_BUS_ADDRESS', None),
+        metavar="ADDRESS",
+        help="Publish quotes, spreads and opportunity events to local subscribers on this "
+             "Unix socket path or host:port"
+    )
+    
+    parser.add_argument(
+        "--seed-history",
+        action="store_true",
+        default=getattr(config, 'SEED_FROM_HISTORY', False),
+        help="Seed the rolling spread statistics from backfilled candles (see backfill.py) "
+             "for series without saved state"
+    )
+    
+    parser.add_argument(
+        "--record-history",
+        action="store_true",
+        default=getattr(config, 'RECORD_HISTORY', False),
+        help="Record quotes and 1m/1h/1d price and spread rollups to the history store (see rollups.py)"
+    )
+    
+    parser.add_argument(
+        "--memory-limit",
+        type=float,
+        default=getattr(config, 'MEMORY_LIMIT_MB', None),
+        metavar="MB",
+        help="Keep resident memory under this many MB by shedding the lowest-priority pairs"
+    )
+    
+    parser.add_argument(
+        "--dashboard",
+        action="store_true",
+        help="Show a live terminal dashboard instead of console logs (the log file is still written)"
+    )
+    
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        default=getattr(config, 'ADAPTIVE_SAMPLING', False),
+        help="Check pairs near the threshold or with volatile spreads more often than quiet ones "
+             "(--interval becomes the slowest per-pair interval)"
+    )
+    
+    parser.add_argument(
+        "--watch-config",
+        nargs="?",
+        const=config.__file__,
+        default=getattr(config, 'WATCH_CONFIG', None),
+        metavar="PATH",
+        help="Apply changes to this config file (default: config.py) while running, without a restart"
+    )
+    
+    parser.add_argument(
+        "--state-file",
+        default=getattr(config, 'STATE_FILE', None),
+        help="Warm-start snapshot file loaded on startup and written on exit"
+    )
+    
+    parser.add_argument(
+        "--no-state",
+        action="store_true",
+        help="Do not load or write the warm-start snapshot"
+    )
+    
+    parser.add_argument(
+        "--scan",
+        action="store_true",
+        help="Scan every market listed on more than one exchange and rank them by spread, then exit"
+    )
+    
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=20,
+        help="Number of markets to show in scan mode"
+    )
+    
     args = parser.parse_args()
     
     # Configure logging
@@ -79,7 +214,6 @@ def main():
             logging.StreamHandler()
         ]
     )
-    logger = logging.getLogger(__name__)
     
     # Override exchange settings from command line
     if args.disable_binance:
@@ -91,22 +225,156 @@ def main():
     if args.disable_coingecko:
         config.EXCHANGES["coingecko"] = False
     
+    if args.scan:
+        _run_scan(args)
+        return
+    
+    try:
+        pairs = parse_pairs(args.pairs) if args.pairs else [(args.symbol.upper(), args.base.upper())]
+    except ValueError as e:
+        parser.error(str(e))
+    
     # Log the configuration
     logger.info(f"Starting with configuration:")
-    logger.info(f"Symbol: {args.symbol}")
-    logger.info(f"Base currency: {args.base}")
+    if len(pairs) == 1:
+        logger.info(f"Symbol: {pairs[0][0]}")
+        logger.info(f"Base currency: {pairs[0][1]}")
+    else:
+        logger.info(f"Pairs: {', '.join(f'{symbol}/{base}' for symbol, base in pairs)}")
     logger.info(f"Threshold: {args.threshold}%")
     logger.info(f"Check interval: {args.interval} seconds")
     logger.info(f"Enabled exchanges: {', '.join([k for k, v in config.EXCHANGES.items() if v])}")
     
-    # Create and run the finder
-    finder = PriceDiscrepancyFinder(
-        symbol=args.symbol,
-        base_currency=args.base,
-        threshold_percent=args.threshold
-    )
+    # Create and run the tracker
+    tracker = MultiPairTracker(pairs, threshold_percent=args.threshold)
+    state_file = None if args.no_state else args.state_file
+    
+    _configure_tracker(tracker, args, pairs)
+    _attach_listeners(tracker, args)
+    
+    if args.once or args.duration is not None:
+        _run_bounded(tracker, args, state_file)
+    
+    interval = _set_up_sampling(tracker, args, len(pairs))
+    
+    if args.dashboard:
+        _run_dashboard(tracker, interval, state_file, args)
+        return
+    
+    tracker.run(interval_seconds=interval, state_file=state_file)
+
+
+def _run_scan(args):
+    """Scan every market listed on more than one exchange and log those above the threshold."""
+    scanner = UniverseScanner()
+    results = scanner.scan(top=args.top)
+    print_scan_results(results)
+    for result in results:
+        if result['spread_percent'] >= args.threshold:
+            logger.warning(
+                f"ARBITRAGE OPPORTUNITY: {result['pair']}: Buy on {result['buy_exchange']} "
+                f"(${result['buy_price']:.8g}) and sell on {result['sell_exchange']} "
+                f"(${result['sell_price']:.8g}) - Potential profit: {result['spread_percent']:.2f}%"
+            )
+
+
+def _configure_tracker(tracker, args, pairs):
+    """Seed the tracker's statistics from history and watch the config file, as requested."""
+    if args.seed_history:
+        # Saved state, restored when the run starts, takes precedence for the series it covers
+        since = time.time() - getattr(config, 'SEED_HISTORY_HOURS', 24) * 3600
+        for finder in tracker.finders.values():
+            seed_spread_stats(finder, interval=getattr(config, 'SEED_HISTORY_INTERVAL', '1m'), since=since)
+    
+    if args.watch_config:
+        # Command-line values stay in effect until the same setting is edited in the file
+        if args.pairs:
+            config.PAIRS = [f"{symbol}/{base}" for symbol, base in pairs]
+        else:
+            config.SYMBOL, config.BASE_CURRENCY = pairs[0]
+        config.THRESHOLD_PERCENT = args.threshold
+        config.CHECK_INTERVAL = args.interval
+        tracker.config_watcher = ConfigWatcher(args.watch_config, tracker)
+
+
+def _attach_listeners(tracker, args):
+    """Start the read API, quote bus, memory budget and history recorder, as requested."""
+    if args.serve_port is not None:
+        read_api = ReadApiServer(getattr(config, 'READ_API_HOST', '127.0.0.1'), args.serve_port)
+        tracker.snapshot_listeners.append(read_api.publish)
+        read_api.start()
+    
+    if args.bus:
+        bus = QuoteBus(args.bus)
+        tracker.result_listeners.append(bus.publish_result)
+        bus.start()
     
-    finder.run(interval_seconds=args.interval)
+    if args.memory_limit is not None or getattr(config, 'MEMORY_TRACEMALLOC', False):
+        tracker.memory_budget = MemoryBudget(tracker, limit_mb=args.memory_limit)
+        if args.memory_limit is not None:
+            logger.info(f"Memory budget: {args.memory_limit:g} MB")
+    
+    if args.record_history:
+        recorder = RollupRecorder()
+        tracker.result_listeners.append(recorder.record_result)
+        # Open rollups and buffered rows are written on exit
+        atexit.register(recorder.close)
+
+
+def _run_bounded(tracker, args, state_file):
+    """Run a --once or --duration check, write the summary and exit with the run's status."""
+    started_at = datetime.now()
+    duration = 0 if args.once else args.duration
+    tracker.restore_state(state_file)
+    try:
+        code = tracker.run_for(duration, args.interval, deadline_seconds=args.deadline)
+    finally:
+        tracker.save_state(state_file)
+    if args.summary_json:
+        tracker.write_summary(args.summary_json, started_at)
+    logger.info(f"Run finished with exit status {code}")
+    sys.exit(code)
+
+
+def _set_up_sampling(tracker, args, pair_count):
+    """
+    Enable adaptive sampling if requested.
+
+    Returns:
+        int: The tracker's tick interval in seconds
+    """
+    if not args.adaptive:
+        return args.interval
+    min_interval = min(getattr(config, 'SAMPLER_MIN_INTERVAL', 10), args.interval)
+    budget = getattr(config, 'SAMPLER_BUDGET', None)
+    if budget is None:
+        budget = max(1, math.ceil(pair_count * min_interval / args.interval))
+    tracker.set_sampler(AdaptiveSampler(min_interval, args.interval, budget))
+    logger.info(f"Adaptive sampling: every {min_interval}-{args.interval} seconds per pair, "
+                f"up to {budget} pair(s) per tick")
+    return min_interval
+
+
+def _run_dashboard(tracker, interval, state_file, args):
+    """Run the tracker in a background thread under the live terminal dashboard."""
+    # Console log lines would break the curses screen
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if not isinstance(handler, logging.FileHandler):
+            root.removeHandler(handler)
+    exit_on_sigterm()
+    stop = threading.Event()
+    thread = threading.Thread(target=tracker.run, name="tracker", daemon=True,
+                              kwargs={'interval_seconds': interval, 'state_file': state_file, 'stop_event': stop})
+    thread.start()
+    try:
+        # Under adaptive sampling the coldest pairs are checked every --interval seconds
+        Dashboard(lambda: tracker.snapshot, threshold_percent=args.threshold,
+                  refresh=getattr(config, 'DASHBOARD_REFRESH', 0.5), interval=args.interval).run()
+    finally:
+        # The tracker finishes its current tick and writes the state file once on the way out
+        stop.set()
+        thread.join()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
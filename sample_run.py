@@ -3,11 +3,11 @@
 """
 Sample script to generate a quick output from the Cross-Exchange Price Discrepancy Finder.
 This script runs the finder for a limited number of checks to demonstrate the output format.
+Email, SMS and webhook alerts are turned off for the run, so alerts are only logged.
 """
 
 import logging
 import time
-from datetime import datetime
 from price_discrepancy_finder import PriceDiscrepancyFinder
 import config
 
@@ -23,6 +23,11 @@ def main():
     )
     logger = logging.getLogger(__name__)
     
+    # The demo (also run by CI) must not send alerts through the configured channels
+    config.ENABLE_EMAIL_ALERTS = False
+    config.ENABLE_SMS_ALERTS = False
+    config.ENABLE_WEBHOOK_ALERTS = False
+    
     # Log the configuration
     logger.info(f"Starting sample run with configuration:")
     logger.info(f"Symbol: {config.SYMBOL}")
@@ -40,60 +45,11 @@ def main():
     # Run for a limited number of checks
     logger.info("Running for 3 price checks with 5 second intervals")
     
+    # The finder logs prices, differences and opportunities itself
     for i in range(3):
         logger.info(f"Price check #{i+1}")
         
-        # Get prices from each exchange
-        binance_price = finder.get_binance_price()
-        kraken_price = finder.get_kraken_price()
-        coingecko_price = finder.get_coingecko_price()
-        
-        # Store prices in a dictionary for easier display
-        prices = {
-            "Binance": binance_price,
-            "Kraken": kraken_price,
-            "CoinGecko": coingecko_price
-        }
-        
-        # Filter out None values
-        valid_prices = {k: v for k, v in prices.items() if v is not None}
-        
-        if valid_prices:
-            # Display current prices
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            price_strings = []
-            for exchange, price in valid_prices.items():
-                price_strings.append(f"{exchange}: ${price:.6f}")
-            
-            logger.info(f"[{timestamp}] Current prices - {', '.join(price_strings)}")
-            
-            # Compare all pairs of exchanges
-            for exchange1, price1 in valid_prices.items():
-                for exchange2, price2 in valid_prices.items():
-                    if exchange1 >= exchange2:  # Skip duplicate comparisons
-                        continue
-                    
-                    diff_percent = finder.calculate_price_difference(price1, price2)
-                    
-                    if diff_percent is None:
-                        continue
-                    
-                    logger.info(f"Price difference between {exchange1} and {exchange2}: {diff_percent:.2f}%")
-                    
-                    if diff_percent >= finder.threshold_percent:
-                        # Determine which exchange has the lower price (buy) and which has the higher price (sell)
-                        buy_exchange = exchange2 if price1 > price2 else exchange1
-                        sell_exchange = exchange1 if price1 > price2 else exchange2
-                        buy_price = min(price1, price2)
-                        sell_price = max(price1, price2)
-                        
-                        # Create the arbitrage opportunity message
-                        arb_message = f"Buy on {buy_exchange} (${buy_price:.6f}) and sell on {sell_exchange} (${sell_price:.6f}) - Potential profit: {diff_percent:.2f}%"
-                        
-                        # Log the arbitrage opportunity
-                        logger.warning(f"ARBITRAGE OPPORTUNITY: {arb_message}")
-        else:
-            logger.warning("Could not fetch prices from any exchange")
+        finder.check_arbitrage_opportunity()
         
         # Wait before next check (except for the last iteration)
         if i < 2:
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+
+"""
+Drift-free fixed-rate tick scheduler.
+
+Ticks are scheduled on a fixed grid (start + n * interval) measured with
+the monotonic clock, so the real period does not grow by the time spent
+fetching prices and sending alerts. When the work for a tick overruns the
+period, the missed ticks are either skipped or merged into one immediate
+tick, and the lateness of every tick is recorded.
+"""
+
+import logging
+import math
+import random
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# What to do when a tick's work takes longer than the interval
+OVERRUN_SKIP = "skip"    # Wait for the next slot on the grid, dropping the missed ones
+OVERRUN_MERGE = "merge"  # Fire one tick immediately for all missed slots, then realign to the grid
+
+
+class TickInfo:
+    """Timing information for one scheduled tick."""
+
+    __slots__ = ('index', 'scheduled', 'started', 'lateness', 'skipped')
+
+    def __init__(self, index, scheduled, started, skipped):
+        self.index = index
+        self.scheduled = scheduled
+        self.started = started
+        self.lateness = started - scheduled
+        self.skipped = skipped
+
+
+class FixedRateScheduler:
+    """Fires ticks at a fixed rate on the monotonic clock."""
+
+    def __init__(self, interval, jitter=0.0, overrun_policy=OVERRUN_SKIP,
+                 clock=time.monotonic, sleep=time.sleep, history=1000):
+        """
+        Initialize the scheduler.
+
+        Args:
+            interval (float): Tick period in seconds
+            jitter (float): Maximum random delay in seconds added to each tick (does not accumulate)
+            overrun_policy (str): OVERRUN_SKIP or OVERRUN_MERGE
+            clock (callable): Monotonic clock returning seconds
+            sleep (callable): Sleep function taking seconds
+            history (int): Number of recent tick lateness values kept for statistics
+        """
+        if interval <= 0:
+            raise ValueError("Scheduler interval must be positive")
+        if overrun_policy not in (OVERRUN_SKIP, OVERRUN_MERGE):
+            raise ValueError(f"Unknown overrun policy: {overrun_policy}")
+        self.interval = interval
+        self.jitter = jitter
+        self.overrun_policy = overrun_policy
+        self.clock = clock
+        self.sleep = sleep
+
+        self.start = None
+        self.slot = 0
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.max_lateness = 0.0
+        self.lateness = deque(maxlen=history)
+
+    def next_deadline(self):
+        """
+        Return the monotonic time of the next scheduled slot.
+
+        Work started for the current tick should finish by then.
+        """
+        if self.start is None:
+            return self.clock() + self.interval
+        return self.start + (self.slot + 1) * self.interval
+
+    def set_interval(self, interval):
+        """
+        Change the tick period, re-anchoring the grid at the current slot.
+
+        Args:
+            interval (float): The new tick period in seconds
+        """
+        if interval <= 0:
+            raise ValueError("Scheduler interval must be positive")
+        if self.start is not None:
+            self.start = self.start + self.slot * self.interval
+            self.slot = 0
+        self.interval = interval
+
+    def wait(self):
+        """
+        Block until the next tick is due and return its timing.
+
+        The first call fires immediately and anchors the grid.
+
+        Returns:
+            TickInfo: Timing information for the tick
+        """
+        now = self.clock()
+        skipped = 0
+
+        if self.start is None:
+            self.start = now
+            self.slot = 0
+        else:
+            self.slot += 1
+            scheduled = self.start + self.slot * self.interval
+            if now > scheduled:
+                # The previous tick overran the period
+                missed = int(math.floor((now - scheduled) / self.interval))
+                self.overruns += 1
+                if self.overrun_policy == OVERRUN_SKIP:
+                    skipped = missed + 1
+                    self.slot += skipped
+                else:
+                    skipped = missed
+                    self.slot += missed
+                self.skipped += skipped
+                logger.warning(
+                    f"Tick work overran the {self.interval:g}s period and is {now - scheduled:.2f}s behind schedule; "
+                    f"{'skipping' if self.overrun_policy == OVERRUN_SKIP else 'merging'} {skipped} tick(s)"
+                )
+
+        scheduled = self.start + self.slot * self.interval
+        fire_at = scheduled
+        if self.jitter > 0:
+            fire_at += random.uniform(0, min(self.jitter, self.interval))
+        if self.overrun_policy == OVERRUN_MERGE and skipped:
+            # Merged ticks fire immediately rather than on their (past) slot
+            fire_at = now
+
+        delay = fire_at - self.clock()
+        if delay > 0:
+            self.sleep(delay)
+
+        tick = TickInfo(self.ticks, scheduled, self.clock(), skipped)
+        self.ticks += 1
+        self.lateness.append(tick.lateness)
+        if tick.lateness > self.max_lateness:
+            self.max_lateness = tick.lateness
+        return tick
+
+    def stats(self):
+        """
+        Return scheduling statistics.
+
+        Returns:
+            dict: Tick, overrun and skip counts plus lateness statistics in seconds
+        """
+        recent = sorted(self.lateness)
+        if recent:
+            mean = sum(recent) / len(recent)
+            p99 = recent[min(len(recent) - 1, int(len(recent) * 0.99))]
+        else:
+            mean = p99 = 0.0
+        return {
+            'interval': self.interval,
+            'ticks': self.ticks,
+            'overruns': self.overruns,
+            'skipped': self.skipped,
+            'mean_lateness': mean,
+            'p99_lateness': p99,
+            'max_lateness': self.max_lateness,
+        }
@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+
+"""
+Offline spread analytics over recorded quote history.
+
+Reads the 'quotes' table of the history store (filled by log_importer.py or
+the tracker) and reports, per pair:
+
+- spread distributions per exchange pair (mean, deviation, quantiles, histogram)
+- how often the threshold is hit, by hour of day (UTC)
+- opportunity durations (runs of consecutive checks at or above the threshold)
+- exchange uptime (share of checks with a price from each exchange)
+
+Every aggregate is computed with NumPy array operations (sorting, bincount,
+reduceat) over all rows at once; Python only loops over output rows. Quote
+rows that share a pair and timestamp form one check.
+
+Usage:
+    python3 spread_report.py --days 30 --format md -o report.md
+"""
+
+import argparse
+import csv
+import html
+import logging
+import os
+import time
+import numpy as np
+from history_store import HistoryStore
+from quote import VENUE_NAMES
+import history_store
+import config
+
+logger = logging.getLogger(__name__)
+
+# Upper edges of the spread histogram buckets, in percent
+HISTOGRAM_EDGES = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0)
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+# Venue pairs in venue id order
+VENUE_PAIRS = tuple((a, b) for a in range(len(VENUE_NAMES)) for b in range(a + 1, len(VENUE_NAMES)))
+
+
+def build_checks(columns):
+    """
+    Pivot quote rows into checks with one price column per exchange.
+
+    Args:
+        columns (dict): 'ts', 'pair', 'venue' and 'price' arrays
+
+    Returns:
+        tuple: (check pair codes, check timestamps, prices[check, venue] with NaN where missing),
+        ordered by pair then time
+    """
+    pair = columns['pair']
+    ts = columns['ts']
+    if not len(ts):
+        return np.empty(0, np.int64), np.empty(0), np.empty((0, len(VENUE_NAMES)))
+    order = np.lexsort((ts, pair))
+    pair = pair[order]
+    ts = ts[order]
+    new = np.empty(len(ts), dtype=bool)
+    new[0] = True
+    new[1:] = (pair[1:] != pair[:-1]) | (ts[1:] != ts[:-1])
+    check = np.cumsum(new) - 1
+    prices = np.full((int(check[-1]) + 1, len(VENUE_NAMES)), np.nan)
+    prices[check, columns['venue'][order]] = columns['price'][order]
+    return pair[new].astype(np.int64), ts[new], prices
+
+
+def spread_series(prices, venue1, venue2):
+    """
+    Spread percentage between two exchanges for every check.
+
+    Returns:
+        ndarray: The spread (difference over the average price), NaN where either price is missing
+    """
+    a = prices[:, venue1]
+    b = prices[:, venue2]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        spread = np.abs(a - b) / ((a + b) / 2) * 100
+    spread[~((a > 0) & (b > 0))] = np.nan
+    return spread
+
+
+def grouped_quantiles(groups, values, n_groups, quantiles):
+    """
+    Nearest-rank quantiles of values per group, without a Python loop over rows.
+
+    Returns:
+        tuple: (counts per group, ndarray[group, quantile] with NaN for empty groups)
+    """
+    order = np.lexsort((values, groups))
+    values = values[order]
+    counts = np.bincount(groups, minlength=n_groups)
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    result = np.full((n_groups, len(quantiles)), np.nan)
+    present = counts > 0
+    for column, q in enumerate(quantiles):
+        index = offsets[present] + np.floor(q * (counts[present] - 1)).astype(np.int64)
+        result[present, column] = values[index]
+    return counts, result
+
+
+def spread_distributions(check_pair, prices, n_pairs):
+    """
+    Spread distribution per (pair, exchange pair).
+
+    Returns:
+        list: Rows of [pair code, venue1, venue2, count, mean, std, quantiles..., max, histogram shares...]
+    """
+    rows = []
+    bins = len(HISTOGRAM_EDGES) + 1
+    for venue1, venue2 in VENUE_PAIRS:
+        spread = spread_series(prices, venue1, venue2)
+        valid = ~np.isnan(spread)
+        if not valid.any():
+            continue
+        groups = check_pair[valid]
+        values = spread[valid]
+        counts, quantiles = grouped_quantiles(groups, values, n_pairs, QUANTILES + (1.0,))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.bincount(groups, weights=values, minlength=n_pairs) / counts
+            variance = np.bincount(groups, weights=values * values, minlength=n_pairs) / counts - mean * mean
+        std = np.sqrt(np.maximum(variance, 0))
+        buckets = np.searchsorted(HISTOGRAM_EDGES, values, side='right')
+        histogram = np.bincount(groups * bins + buckets, minlength=n_pairs * bins).reshape(n_pairs, bins)
+        for code in np.flatnonzero(counts):
+            rows.append([code, venue1, venue2, int(counts[code]), mean[code], std[code],
+                         *quantiles[code], *(histogram[code] / counts[code] * 100)])
+    return rows
+
+
+def best_spread(prices):
+    """Widest spread across exchange pairs for every check (NaN if fewer than two prices)."""
+    spreads = np.column_stack([spread_series(prices, venue1, venue2) for venue1, venue2 in VENUE_PAIRS])
+    valid = ~np.isnan(spreads).all(axis=1)
+    best = np.full(len(prices), np.nan)
+    best[valid] = np.nanmax(spreads[valid], axis=1)
+    return best
+
+
+def hourly_hits(check_pair, check_ts, best, threshold, n_pairs):
+    """
+    Threshold hits by hour of day (UTC).
+
+    Returns:
+        tuple: (checks[pair, hour], hits[pair, hour]) for checks with at least two prices
+    """
+    valid = ~np.isnan(best)
+    hour = (check_ts[valid] // 3600 % 24).astype(np.int64)
+    groups = check_pair[valid] * 24 + hour
+    checks = np.bincount(groups, minlength=n_pairs * 24).reshape(n_pairs, 24)
+    hit = best[valid] >= threshold
+    hits = np.bincount(groups[hit], minlength=n_pairs * 24).reshape(n_pairs, 24)
+    return checks, hits
+
+
+def median_interval(check_pair, check_ts):
+    """Return the median interval in seconds between consecutive checks of a pair, or None."""
+    if len(check_ts) < 2:
+        return None
+    gaps = np.diff(check_ts)[check_pair[1:] == check_pair[:-1]]
+    gaps = gaps[gaps > 0]
+    return float(np.median(gaps)) if len(gaps) else None
+
+
+def opportunity_runs(check_pair, check_ts, best, threshold, max_gap, interval):
+    """
+    Find runs of consecutive checks at or above the threshold.
+
+    A run ends at the first check below the threshold, at a gap of more
+    than max_gap seconds between checks, or at a change of pair. Its
+    duration runs from its first check to that check below the threshold;
+    when there is none (a gap, the pair's last check), the run is taken to
+    last one sampling interval past its last check.
+
+    Args:
+        interval (float): The sampling interval in seconds
+
+    Returns:
+        tuple: (pair code, duration in seconds, peak spread) arrays, one entry per run
+    """
+    valid = ~np.isnan(best)
+    pair = check_pair[valid]
+    ts = check_ts[valid]
+    spread = best[valid]
+    hit = spread >= threshold
+    if not hit.any():
+        return np.empty(0, np.int64), np.empty(0), np.empty(0)
+    continues = np.zeros(len(hit), dtype=bool)
+    continues[1:] = hit[1:] & hit[:-1] & (pair[1:] == pair[:-1]) & (np.diff(ts) <= max_gap)
+    starts = np.flatnonzero(hit & ~continues)
+    next_continues = np.append(continues[1:], False)
+    ends = np.flatnonzero(hit & ~next_continues)
+    # Peak per run: runs are contiguous stretches of hit checks
+    hit_index = np.flatnonzero(hit)
+    run_offsets = np.searchsorted(hit_index, starts)
+    peaks = np.maximum.reduceat(spread[hit_index], run_offsets)
+    following = np.minimum(ends + 1, len(ts) - 1)
+    observed = (ends + 1 < len(ts)) & (pair[following] == pair[ends]) & (ts[following] - ts[ends] <= max_gap)
+    run_end = np.where(observed, ts[following], ts[ends] + interval)
+    return pair[starts], run_end - ts[starts], peaks
+
+
+def venue_uptime(check_pair, prices, n_pairs):
+    """
+    Share of each pair's checks that had a price from each exchange.
+
+    Returns:
+        tuple: (checks per pair, ndarray[pair, venue] of checks with a price)
+    """
+    checks = np.bincount(check_pair, minlength=n_pairs)
+    present = np.column_stack([
+        np.bincount(check_pair[~np.isnan(prices[:, venue])], minlength=n_pairs)
+        for venue in range(len(VENUE_NAMES))
+    ])
+    return checks, present
+
+
+def build_report(store, pairs=None, start=None, end=None, threshold=None, max_gap=None):
+    """
+    Compute every report section.
+
+    Args:
+        store (HistoryStore): Source of quote history
+        pairs (list): Pair ids to include (None for all)
+        start (float): Epoch time to start from
+        end (float): Epoch time to stop at
+        threshold (float): Opportunity threshold in percent (defaults to config.THRESHOLD_PERCENT)
+        max_gap (float): Longest gap in seconds between checks of one opportunity
+            (defaults to three times the median check interval)
+
+    Returns:
+        dict: 'summary' facts and 'sections' as (title, headers, rows) tuples
+    """
+    threshold = config.THRESHOLD_PERCENT if threshold is None else threshold
+    started = time.monotonic()
+    columns, pair_ids = store.load_arrays('quotes', pairs, start, end)
+    loaded = time.monotonic() - started
+    check_pair, check_ts, prices = build_checks(columns)
+    n_pairs = len(pair_ids)
+
+    interval = median_interval(check_pair, check_ts) or getattr(config, 'CHECK_INTERVAL', 60)
+    if max_gap is None:
+        max_gap = 3 * interval
+
+    sections = []
+    percentiles = [f"p{int(q * 100)}" for q in QUANTILES]
+    # Bucket i holds spreads in [HISTOGRAM_EDGES[i - 1], HISTOGRAM_EDGES[i])
+    buckets = ([f"<{HISTOGRAM_EDGES[0]:g}%"]
+               + [f"{low:g}-{high:g}%" for low, high in zip(HISTOGRAM_EDGES, HISTOGRAM_EDGES[1:])]
+               + [f">={HISTOGRAM_EDGES[-1]:g}%"])
+    rows = [[pair_ids[code], f"{VENUE_NAMES[v1]}-{VENUE_NAMES[v2]}", count, *values]
+            for code, v1, v2, count, *values in spread_distributions(check_pair, prices, n_pairs)]
+    rows.sort(key=lambda row: (row[0], row[1]))
+    sections.append((
+        "Spread distribution",
+        ["Pair", "Exchanges", "Checks", "Mean %", "Std %", *[f"{name} %" for name in percentiles], "Max %",
+         *buckets],
+        rows,
+    ))
+
+    best = best_spread(prices) if len(prices) else np.empty(0)
+    checks, hits = hourly_hits(check_pair, check_ts, best, threshold, n_pairs)
+    total_checks = checks.sum(axis=0)
+    total_hits = hits.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rate = total_hits / total_checks * 100
+    sections.append((
+        f"Threshold hits by hour (UTC, spread >= {threshold:g}%)",
+        ["Hour", "Checks", "Hits", "Hit rate %"],
+        [[f"{hour:02d}:00", int(total_checks[hour]), int(total_hits[hour]), rate[hour]] for hour in range(24)],
+    ))
+
+    run_pair, durations, peaks = opportunity_runs(check_pair, check_ts, best, threshold, max_gap, interval)
+    rows = []
+    if len(run_pair):
+        counts, duration_quantiles = grouped_quantiles(run_pair, durations, n_pairs, (0.5, 0.9, 1.0))
+        total = np.bincount(run_pair, weights=durations, minlength=n_pairs)
+        peak = np.full(n_pairs, -np.inf)
+        np.maximum.at(peak, run_pair, peaks)
+        rows = [[pair_ids[code], int(counts[code]), *duration_quantiles[code], total[code], peak[code]]
+                for code in np.flatnonzero(counts)]
+    sections.append((
+        f"Opportunity durations (runs at or above {threshold:g}%, gaps up to {max_gap:g}s)",
+        ["Pair", "Opportunities", "Median s", "p90 s", "Max s", "Total s", "Peak %"],
+        rows,
+    ))
+
+    checks_per_pair, present = venue_uptime(check_pair, prices, n_pairs)
+    rows = []
+    for code in np.flatnonzero(checks_per_pair):
+        uptime = present[code] / checks_per_pair[code] * 100
+        rows.append([pair_ids[code], int(checks_per_pair[code]), *uptime])
+    rows.sort(key=lambda row: row[0])
+    sections.append((
+        "Exchange uptime (share of checks with a price)",
+        ["Pair", "Checks", *[f"{name} %" for name in VENUE_NAMES]],
+        rows,
+    ))
+
+    summary = {
+        'pairs': n_pairs,
+        'quotes': int(len(columns['ts'])),
+        'checks': int(len(check_ts)),
+        'start': float(check_ts.min()) if len(check_ts) else None,
+        'end': float(check_ts.max()) if len(check_ts) else None,
+        'threshold_percent': threshold,
+        'load_seconds': loaded,
+        'compute_seconds': time.monotonic() - started - loaded,
+    }
+    return {'summary': summary, 'sections': sections}
+
+
+def _format(value):
+    """Format a report cell."""
+    if isinstance(value, (float, np.floating)):
+        if value != value or value in (float('inf'), float('-inf')):
+            return "-"
+        return f"{value:.3f}"
+    return str(value)
+
+
+def _format_time(ts):
+    return time.strftime("%Y-%m-%d %H:%M", time.gmtime(ts)) if ts is not None else "-"
+
+
+def summary_lines(summary):
+    """Human-readable summary facts."""
+    return [
+        f"Period: {_format_time(summary['start'])} to {_format_time(summary['end'])} UTC",
+        f"Pairs: {summary['pairs']}, checks: {summary['checks']}, quotes: {summary['quotes']}",
+        f"Computed in {summary['load_seconds'] + summary['compute_seconds']:.2f}s "
+        f"({summary['load_seconds']:.2f}s loading)",
+    ]
+
+
+def render_markdown(report):
+    """Render the report as Markdown."""
+    lines = ["# Spread Report", ""]
+    lines.extend(f"- {line}" for line in summary_lines(report['summary']))
+    for title, headers, rows in report['sections']:
+        lines += ["", f"## {title}", ""]
+        if not rows:
+            lines.append("No data.")
+            continue
+        lines.append("| " + " | ".join(headers) + " |")
+        lines.append("|" + "|".join("---" for _ in headers) + "|")
+        lines.extend("| " + " | ".join(_format(value) for value in row) + " |" for row in rows)
+    return "\n".join(lines) + "\n"
+
+
+def render_html(report):
+    """Render the report as a standalone HTML page."""
+    parts = ["<!DOCTYPE html>", "<html><head><meta charset=\"utf-8\"><title>Spread Report</title>",
+             "<style>body{font-family:sans-serif}table{border-collapse:collapse}"
+             "td,th{border:1px solid #ccc;padding:2px 8px;text-align:right}</style>",
+             "</head><body>", "<h1>Spread Report</h1>", "<ul>"]
+    parts.extend(f"<li>{html.escape(line)}</li>" for line in summary_lines(report['summary']))
+    parts.append("</ul>")
+    for title, headers, rows in report['sections']:
+        parts.append(f"<h2>{html.escape(title)}</h2>")
+        if not rows:
+            parts.append("<p>No data.</p>")
+            continue
+        parts.append("<table><tr>" + "".join(f"<th>{html.escape(header)}</th>" for header in headers) + "</tr>")
+        parts.extend("<tr>" + "".join(f"<td>{html.escape(_format(value))}</td>" for value in row) + "</tr>"
+                     for row in rows)
+        parts.append("</table>")
+    parts.append("</body></html>")
+    return "\n".join(parts) + "\n"
+
+
+def write_csv(report, path):
+    """
+    Write one CSV file per section next to `path` (report.csv -> report_spread_distribution.csv, ...).
+
+    Returns:
+        list: The written paths
+    """
+    stem, _ = os.path.splitext(path)
+    written = []
+    for title, headers, rows in report['sections']:
+        name = title.split(' (')[0].lower().replace(' ', '_')
+        section_path = f"{stem}_{name}.csv"
+        with open(section_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(headers)
+            writer.writerows([[value.item() if isinstance(value, np.generic) else value for value in row]
+                              for row in rows])
+        written.append(section_path)
+    return written
+
+
+def main():
+    """Parse command-line arguments and write the report."""
+    parser = argparse.ArgumentParser(
+        description="Spread analytics report over recorded quote history",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("-p", "--pairs", default=None, help="Comma-separated pairs (defaults to all recorded pairs)")
+    parser.add_argument("--days", type=float, default=None, help="Only the last N days (defaults to all history)")
+    parser.add_argument("-t", "--threshold", type=float, default=config.THRESHOLD_PERCENT,
+                        help="Opportunity threshold in percent")
+    parser.add_argument("--max-gap", type=float, default=None,
+                        help="Longest gap in seconds between checks of one opportunity "
+                             "(defaults to three times the median check interval)")
+    parser.add_argument("-f", "--format", choices=["md", "html", "csv"], default="md", help="Output format")
+    parser.add_argument("-o", "--output", default=None,
+                        help="Output file (Markdown is printed when omitted; CSV writes one file per section)")
+    parser.add_argument("--history-dir", default=history_store.default_history_dir(), help="History store directory")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    pairs = [pair.strip().upper() for pair in args.pairs.split(',')] if args.pairs else None
+    start = time.time() - args.days * 86400 if args.days is not None else None
+    report = build_report(HistoryStore(args.history_dir), pairs, start, threshold=args.threshold,
+                          max_gap=args.max_gap)
+
+    if args.format == 'csv':
+        for path in write_csv(report, args.output or "spread_report.csv"):
+            print(f"Wrote {path}")
+        return
+    text = render_markdown(report) if args.format == 'md' else render_html(report)
+    if args.output is None:
+        print(text, end="")
+        return
+    with open(args.output, 'w') as f:
+        f.write(text)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+
+"""
+Incremental rolling statistics for cross-exchange spreads.
+
+Every (pair, venue, venue) combination keeps an exponentially weighted
+mean and variance plus a few windowed quantiles estimated with the P²
+streaming algorithm. Each update is O(1) and the memory per combination is
+a fixed handful of floats, so thousands of combinations can be tracked per
+tick.
+"""
+
+import math
+
+NAN = float('nan')
+
+
+class P2Quantile:
+    """
+    Streaming quantile estimator using the P² algorithm (Jain & Chlamtac, 1985).
+
+    Keeps five markers regardless of how many observations are added.
+    """
+
+    __slots__ = ('p', 'count', 'heights', 'positions', 'desired', 'increments')
+
+    def __init__(self, p):
+        """
+        Initialize the estimator.
+
+        Args:
+            p (float): The quantile to estimate, between 0 and 1
+        """
+        self.p = p
+        self.count = 0
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x):
+        """Add an observation."""
+        if self.count < 5:
+            self.heights.append(x)
+            self.count += 1
+            if self.count == 5:
+                self.heights.sort()
+            return
+
+        self.count += 1
+        q = self.heights
+        n = self.positions
+
+        # Find the cell containing x, extending the extremes if needed
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+
+        for i in range(k + 1, 5):
+            n[i] += 1
+        desired = self.desired
+        increments = self.increments
+        for i in range(5):
+            desired[i] += increments[i]
+
+        # Adjust the middle markers towards their desired positions
+        for i in (1, 2, 3):
+            d = desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = self._parabolic(i, d)
+                if not q[i - 1] < height < q[i + 1]:
+                    height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = height
+                n[i] += d
+
+    def _parabolic(self, i, d):
+        """Piecewise-parabolic prediction of marker i moved by d."""
+        q = self.heights
+        n = self.positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def to_state(self):
+        """Return a JSON-serializable representation of the estimator."""
+        return [self.count, list(self.heights), list(self.positions), list(self.desired)]
+
+    @classmethod
+    def from_state(cls, p, state):
+        """Rebuild an estimator from to_state() output."""
+        estimator = cls(p)
+        estimator.count, heights, positions, desired = state
+        estimator.heights = list(heights)
+        estimator.positions = list(positions)
+        estimator.desired = list(desired)
+        return estimator
+
+    def value(self):
+        """Return the current quantile estimate (NaN if there are no observations)."""
+        if self.count == 0:
+            return NAN
+        if self.count < 5:
+            ordered = sorted(self.heights)
+            return ordered[int(round(self.p * (self.count - 1)))]
+        return self.heights[2]
+
+
+class WindowedQuantile:
+    """
+    Approximately windowed quantile built from two alternating P² estimators.
+
+    The current estimator collects up to `window` observations and then
+    replaces the previous one, so the reported value always reflects between
+    one and two windows of recent data.
+    """
+
+    __slots__ = ('p', 'window', 'current', 'previous')
+
+    def __init__(self, p, window=1000):
+        """
+        Initialize the estimator.
+
+        Args:
+            p (float): The quantile to estimate, between 0 and 1
+            window (int): Number of observations per window
+        """
+        self.p = p
+        self.window = window
+        self.current = P2Quantile(p)
+        self.previous = None
+
+    def add(self, x):
+        """Add an observation."""
+        current = self.current
+        current.add(x)
+        if current.count >= self.window:
+            self.previous = current
+            self.current = P2Quantile(self.p)
+
+    def to_state(self):
+        """Return a JSON-serializable representation of the estimator."""
+        previous = self.previous.to_state() if self.previous is not None else None
+        return [self.current.to_state(), previous]
+
+    def load_state(self, state):
+        """Restore the estimator from to_state() output."""
+        current, previous = state
+        self.current = P2Quantile.from_state(self.p, current)
+        self.previous = P2Quantile.from_state(self.p, previous) if previous is not None else None
+
+    def value(self):
+        """Return the quantile estimate over the recent window."""
+        if self.previous is not None and self.current.count < self.window // 2:
+            return self.previous.value()
+        return self.current.value()
+
+
+class SpreadStats:
+    """Rolling statistics for one (pair, venue, venue) spread series."""
+
+    __slots__ = ('alpha', 'count', 'mean', 'var', 'last', 'quantiles')
+
+    def __init__(self, alpha=0.05, quantiles=(0.5, 0.95, 0.99), window=1000):
+        """
+        Initialize the statistics.
+
+        Args:
+            alpha (float): EWMA smoothing factor (higher reacts faster)
+            quantiles (tuple): Quantiles of the absolute spread to track
+            window (int): Observations per quantile window
+        """
+        self.alpha = alpha
+        self.count = 0
+        self.mean = 0.0
+        self.var = 0.0
+        self.last = NAN
+        self.quantiles = tuple(WindowedQuantile(p, window) for p in quantiles)
+
+    @property
+    def std(self):
+        """The EWMA standard deviation."""
+        return math.sqrt(self.var)
+
+    def zscore(self, x):
+        """
+        Return how many standard deviations x is from the rolling mean.
+
+        Returns:
+            float: The z-score, or NaN if there is no variance yet
+        """
+        std = math.sqrt(self.var)
+        if std <= 0:
+            return NAN
+        return (x - self.mean) / std
+
+    def update(self, x):
+        """
+        Add a signed spread observation.
+
+        The z-score is computed before the observation is folded in, so an
+        outlier is scored against the history that preceded it.
+
+        Args:
+            x (float): The signed spread percentage
+
+        Returns:
+            float: The z-score of x against the previous statistics (NaN during warm-up)
+        """
+        if self.count == 0:
+            z = NAN
+            self.mean = x
+            self.var = 0.0
+        else:
+            z = self.zscore(x)
+            diff = x - self.mean
+            increment = self.alpha * diff
+            self.mean += increment
+            self.var = (1 - self.alpha) * (self.var + diff * increment)
+        self.count += 1
+        self.last = x
+
+        magnitude = abs(x)
+        for quantile in self.quantiles:
+            quantile.add(magnitude)
+        return z
+
+    def to_state(self):
+        """Return a JSON-serializable representation of the statistics."""
+        last = self.last if self.last == self.last else None
+        return [self.count, self.mean, self.var, last, [quantile.to_state() for quantile in self.quantiles]]
+
+    def load_state(self, state):
+        """
+        Restore the statistics from to_state() output.
+
+        Quantile states are matched by position, so a snapshot taken with a
+        different SPREAD_QUANTILES setting only restores the EWMA values.
+        """
+        count, mean, var, last, quantiles = state
+        self.count = count
+        self.mean = mean
+        self.var = var
+        self.last = NAN if last is None else last
+        if len(quantiles) == len(self.quantiles):
+            for quantile, quantile_state in zip(self.quantiles, quantiles):
+                quantile.load_state(quantile_state)
+
+    def quantile_values(self):
+        """
+        Return the current windowed quantiles of the absolute spread.
+
+        Returns:
+            dict: quantile -> estimate
+        """
+        return {quantile.p: quantile.value() for quantile in self.quantiles}
+
+
+class SpreadStatsRegistry:
+    """Holds SpreadStats for every (pair, venue, venue) key seen so far."""
+
+    def __init__(self, alpha=0.05, quantiles=(0.5, 0.95, 0.99), window=1000):
+        """
+        Initialize the registry.
+
+        Args:
+            alpha (float): EWMA smoothing factor for new series
+            quantiles (tuple): Quantiles to track for new series
+            window (int): Observations per quantile window for new series
+        """
+        self.alpha = alpha
+        self.quantiles = tuple(quantiles)
+        self.window = window
+        self.stats = {}
+
+    def __len__(self):
+        return len(self.stats)
+
+    def get(self, key):
+        """
+        Return the statistics for a key, creating them on first use.
+
+        Args:
+            key (tuple): (pair id, venue id, venue id)
+
+        Returns:
+            SpreadStats: The statistics for the key
+        """
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = SpreadStats(self.alpha, self.quantiles, self.window)
+            self.stats[key] = stats
+        return stats
+
+    def to_state(self, pair=None):
+        """
+        Return a JSON-serializable representation of the registry.
+
+        Args:
+            pair (str): Only include keys for this pair id
+
+        Returns:
+            list: [pair id, venue id, venue id, stats state] entries
+        """
+        return [
+            [key[0], key[1], key[2], stats.to_state()]
+            for key, stats in self.stats.items()
+            if pair is None or key[0] == pair
+        ]
+
+    def load_state(self, entries):
+        """Restore statistics from to_state() output."""
+        for pair, venue1, venue2, state in entries:
+            self.get((pair, venue1, venue2)).load_state(state)
+
+    def update(self, key, x):
+        """
+        Update the statistics for a key.
+
+        Returns:
+            tuple: (z-score before the update, SpreadStats)
+        """
+        stats = self.get(key)
+        return stats.update(x), stats
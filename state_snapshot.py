@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+
+"""
+Warm-start state snapshots for the Cross-Exchange Price Discrepancy Finder.
+
+Short scheduled runs lose everything they learned when the process exits:
+resolved symbol mappings, the last quotes, alert cooldowns and the rolling
+spread statistics. These helpers write that state to a single compact JSON
+file on exit and load it back on startup.
+"""
+
+import logging
+import os
+import signal
+import time
+import json_utils
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+
+def load_snapshot(path, max_age=None):
+    """
+    Load a snapshot file.
+
+    Args:
+        path (str): Path to the snapshot file
+        max_age (float): Ignore snapshots older than this many seconds
+
+    Returns:
+        dict or None: The snapshot, or None if it is missing, unreadable or stale
+    """
+    try:
+        with open(path, 'rb') as f:
+            snapshot = json_utils.loads(f.read())
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable state snapshot {path}: {e}")
+        return None
+
+    if snapshot.get('version') != SNAPSHOT_VERSION:
+        logger.warning(f"Ignoring state snapshot {path} with unsupported version {snapshot.get('version')}")
+        return None
+
+    age = time.time() - snapshot.get('saved_at', 0)
+    if max_age is not None and age > max_age:
+        logger.info(f"Ignoring state snapshot {path} saved {age:.0f} seconds ago")
+        return None
+
+    return snapshot
+
+
+def save_snapshot(path, finders):
+    """
+    Write the state of one or more finders to a snapshot file.
+
+    State for pairs that are not in `finders` but already exist in the file
+    is kept, so several trackers watching different pairs can share a file.
+    The file is replaced atomically.
+
+    Args:
+        path (str): Path to the snapshot file
+        finders (iterable): PriceDiscrepancyFinder instances
+    """
+    snapshot = load_snapshot(path) or {}
+    pairs = snapshot.get('pairs', {})
+    for finder in finders:
+        pairs[finder.pair_id] = finder.get_state()
+
+    snapshot = {
+        'version': SNAPSHOT_VERSION,
+        'saved_at': time.time(),
+        'pairs': pairs,
+    }
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(json_utils.dumps(snapshot))
+    os.replace(temp_path, path)
+    logger.info(f"Saved state snapshot for {len(pairs)} pair(s) to {path}")
+
+
+def restore_snapshot(path, finders, max_age=None):
+    """
+    Restore finders from a snapshot file.
+
+    Args:
+        path (str): Path to the snapshot file
+        finders (iterable): PriceDiscrepancyFinder instances
+        max_age (float): Ignore snapshots older than this many seconds
+
+    Returns:
+        int: The number of finders restored
+    """
+    started = time.perf_counter()
+    snapshot = load_snapshot(path, max_age)
+    if snapshot is None:
+        return 0
+
+    restored = 0
+    pairs = snapshot.get('pairs', {})
+    for finder in finders:
+        state = pairs.get(finder.pair_id)
+        if state is None:
+            continue
+        try:
+            finder.restore_state(state)
+            restored += 1
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Ignoring snapshot state for {finder.pair_id}: {e}")
+
+    logger.info(
+        f"Restored {restored} pair(s) from state snapshot {path} "
+        f"in {(time.perf_counter() - started) * 1000:.1f} ms"
+    )
+    return restored
+
+
+def exit_on_sigterm():
+    """
+    Turn SIGTERM into a normal SystemExit.
+
+    Scheduled runs are stopped with `timeout`, which sends SIGTERM. Raising
+    SystemExit lets `finally` blocks run so the snapshot still gets written.
+    """
+    def handler(signum, frame):
+        raise SystemExit(128 + signum)
+
+    try:
+        signal.signal(signal.SIGTERM, handler)
+    except ValueError:
+        # Signal handlers can only be installed from the main thread
+        pass
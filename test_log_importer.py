@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+"""
+Tests for log_importer's manifest handling of growing and rotated logs.
+
+Run with:
+    python -m pytest test_log_importer.py
+"""
+
+import gzip
+import os
+import shutil
+from history_store import HistoryStore
+import log_importer
+
+
+def _check_line(second):
+    return (f"2025-03-18 00:41:{second:02d},000 - INFO - [2025-03-18 00:41:{second:02d}] "
+            f"Current prices for XRP/USDT - Binance: $2.3364, Kraken: $2.33673\n")
+
+
+def _append_checks(path, first, count):
+    with open(path, 'a') as f:
+        for second in range(first, first + count):
+            f.write(_check_line(second))
+
+
+def _quote_rows(store):
+    columns, _ = store.load('quotes')
+    return len(columns['ts'])
+
+
+def test_grown_then_rotated_log_is_reimported(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history'))
+    log = str(tmp_path / 'arbitrage.log')
+
+    _append_checks(log, 0, 4)
+    log_importer.import_logs([log], store, workers=1)
+    assert _quote_rows(store) == 8
+
+    # The live log keeps growing, then is rotated before the next import
+    _append_checks(log, 4, 5)
+    os.rename(log, f"{log}.1")
+    totals = log_importer.import_logs([f"{log}.1"], store, workers=1)
+    assert totals['files'] == 1
+    assert _quote_rows(store) == 18
+
+    manifest = log_importer.load_manifest(store)
+    assert [entry['path'] for entry in manifest.values()] == [os.path.abspath(f"{log}.1")]
+
+    # A compressed copy of the same content is not imported again
+    with open(f"{log}.1", 'rb') as src, gzip.open(f"{log}.2.gz", 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(f"{log}.1")
+    totals = log_importer.import_logs([f"{log}.2.gz"], store, workers=1)
+    assert totals['files'] == 0
+    assert _quote_rows(store) == 18
+
+
+def test_unchanged_rotated_log_is_skipped(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history'))
+    log = str(tmp_path / 'arbitrage.log')
+
+    _append_checks(log, 0, 4)
+    log_importer.import_logs([log], store, workers=1)
+    os.rename(log, f"{log}.1")
+    totals = log_importer.import_logs([f"{log}.1"], store, workers=1)
+    assert totals['files'] == 0
+    assert _quote_rows(store) == 8
@@ -0,0 +1,640 @@
+#!/usr/bin/env python3
+
+"""
+Multi-pair tracker for the Cross-Exchange Price Discrepancy Finder.
+
+Runs one PriceDiscrepancyFinder per configured pair and checks them
+concurrently on a small pool of daemon worker threads. Besides the
+continuous mode, it supports single-shot and fixed-duration runs with a
+hard deadline, a meaningful exit status and a JSON summary, which is what
+scheduled jobs need.
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from price_discrepancy_finder import PriceDiscrepancyFinder
+from scheduler import FixedRateScheduler
+from adaptive_sampler import spread_heat
+from quote_cache import get_quote_cache
+from quote import parse_pairs
+from state_snapshot import restore_snapshot, save_snapshot, exit_on_sigterm
+import json_utils
+import config
+
+logger = logging.getLogger(__name__)
+
+# Exit status codes for single-shot and fixed-duration runs
+EXIT_OK = 0           # Every pair was evaluated
+EXIT_PARTIAL = 3      # Some pairs could not be evaluated (missing prices or deadline)
+EXIT_FAILED = 4       # No pair could be evaluated
+
+# Per-pair status values reported in summaries
+STATUS_OK = "ok"
+STATUS_INSUFFICIENT_DATA = "insufficient_data"
+STATUS_TIMEOUT = "timeout"
+STATUS_ERROR = "error"
+STATUS_PAUSED = "paused"
+STATUS_PENDING = "pending"  # Not checked yet (adaptive sampling)
+
+
+class MultiPairTracker:
+    """Tracks several pairs, each with its own PriceDiscrepancyFinder."""
+
+    def __init__(self, pairs, threshold_percent=config.THRESHOLD_PERCENT,
+                 max_workers=getattr(config, 'MAX_CONCURRENT_PAIRS', 8)):
+        """
+        Initialize the tracker.
+
+        Args:
+            pairs (list): (symbol, base_currency) tuples to track
+            threshold_percent (float): Minimum price difference percentage for an opportunity
+            max_workers (int): Maximum number of pairs checked at the same time
+        """
+        self.threshold_percent = threshold_percent
+        self.max_workers = max_workers
+        self.finders = {}
+        for symbol, base in pairs:
+            finder = PriceDiscrepancyFinder(symbol=symbol, base_currency=base, threshold_percent=threshold_percent)
+            self.finders[finder.pair_id] = finder
+        self.state_file = None
+
+        # Optional ConfigWatcher polled at the start of every tick
+        self.config_watcher = None
+
+        # Optional AdaptiveSampler choosing which pairs are checked on each tick (see set_sampler)
+        self.sampler = None
+
+        # Optional MemoryBudget checked after every tick
+        self.memory_budget = None
+
+        # Latest result per pair, and the most recent alerts and opportunity events of this run
+        self.results = {}
+        self.statuses = {}
+        max_events = getattr(config, 'MAX_RECORDED_EVENTS', 10000)
+        self.alerts = deque(maxlen=max_events)
+        self.events = deque(maxlen=max_events)
+        self.ticks = 0
+        self.scheduler = None
+        self.started_at = time.time()
+
+        # In-memory snapshot rebuilt once per tick, and callables notified with each new one
+        self.snapshot = None
+        self.snapshot_listeners = []
+        # Callables notified with each pair's check result as soon as it arrives
+        self.result_listeners = []
+
+        self._tasks = queue.Queue()
+        # Results of every check, including checks that finish after their tick's deadline
+        self._results = queue.Queue()
+        self._workers = []
+        self._busy = set()
+        self._busy_lock = threading.Lock()
+        self._paused_until = {}
+
+    def _start_workers(self):
+        """Start the worker threads on first use."""
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(target=self._worker, name=f"tracker-worker-{len(self._workers)}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def _worker(self):
+        """Check finders taken from the task queue and report to the results queue."""
+        while True:
+            pair_id, finder = self._tasks.get()
+            try:
+                result = finder.check_arbitrage_opportunity()
+                outcome = (STATUS_OK, result) if result is not None else (STATUS_INSUFFICIENT_DATA, None)
+            except Exception as e:
+                logger.error(f"Error checking arbitrage opportunity for {pair_id}: {e}")
+                finder.consecutive_errors += 1
+                outcome = (STATUS_ERROR, None)
+            finally:
+                with self._busy_lock:
+                    self._busy.discard(pair_id)
+            self._results.put((pair_id, outcome))
+
+    def check_all(self, deadline=None):
+        """
+        Check every pair concurrently.
+
+        Pairs still running when the deadline passes are reported as timed
+        out; their worker keeps running in the background and the pair is
+        skipped until it finishes. A result that arrives after its deadline
+        is recorded and published at the start of the next tick.
+
+        Args:
+            deadline (float): time.monotonic() value by which results are needed
+
+        Returns:
+            dict: pair id -> status
+        """
+        self._start_workers()
+        # Late results from earlier ticks first, so their events keep their order
+        self._collect_results(set(), {}, deadline=time.monotonic())
+        statuses = {}
+        sampled = set(self.sampler.due(time.monotonic())) if self.sampler is not None else None
+
+        submitted = self._submit_checks(statuses, sampled)
+        self._collect_results(submitted, statuses, deadline)
+
+        for pair_id in self.finders:
+            if pair_id not in statuses:
+                logger.warning(f"Deadline reached before {pair_id} finished")
+                statuses[pair_id] = STATUS_TIMEOUT
+
+        self._finish_tick(statuses, sampled)
+        return statuses
+
+    def _submit_checks(self, statuses, sampled):
+        """
+        Queue a check of every pair that is due, not paused and not still busy.
+
+        Args:
+            statuses (dict): Receives the status of each pair that is not checked
+            sampled (set): Pair ids due under adaptive sampling (None checks every pair)
+
+        Returns:
+            set: Pair ids whose check was queued
+        """
+        now = time.monotonic()
+        submitted = set()
+        for pair_id, finder in self.finders.items():
+            if sampled is not None and pair_id not in sampled:
+                # Not due under adaptive sampling; report the pair's last status
+                statuses[pair_id] = self.statuses.get(pair_id, STATUS_PENDING)
+                continue
+            if self._paused_until.get(pair_id, 0) > now:
+                statuses[pair_id] = STATUS_PAUSED
+                continue
+            if finder.consecutive_errors >= config.MAX_ERRORS:
+                logger.error(f"Too many consecutive errors for {pair_id} ({finder.consecutive_errors}). "
+                             f"Pausing for {config.ERROR_PAUSE_DURATION} seconds.")
+                self._paused_until[pair_id] = now + config.ERROR_PAUSE_DURATION
+                finder.consecutive_errors = 0
+                statuses[pair_id] = STATUS_PAUSED
+                continue
+            with self._busy_lock:
+                if pair_id in self._busy:
+                    # The previous check for this pair has not finished yet
+                    statuses[pair_id] = STATUS_TIMEOUT
+                    continue
+                self._busy.add(pair_id)
+            self._tasks.put((pair_id, finder))
+            submitted.add(pair_id)
+        return submitted
+
+    def _finish_tick(self, statuses, sampled):
+        """Feed the sampler, check the memory budget and publish the tick's snapshot."""
+        if sampled is not None:
+            now = time.monotonic()
+            for pair_id in sampled:
+                heat = spread_heat(self.finders[pair_id]) if statuses.get(pair_id) == STATUS_OK else None
+                self.sampler.record(pair_id, now, heat)
+
+        self.statuses = statuses
+        self.ticks += 1
+        if self.memory_budget is not None:
+            try:
+                self.memory_budget.check()
+            except Exception as e:
+                logger.error(f"Error checking the memory budget: {e}")
+        self.publish_snapshot()
+
+    def _collect_results(self, pending, statuses, deadline):
+        """
+        Record results from the results queue until every pending pair has reported or the deadline passes.
+
+        Args:
+            pending (set): Pair ids checked during this tick (emptied as they report)
+            statuses (dict): Receives the status of each pending pair that reports
+            deadline (float): time.monotonic() value to wait until (None waits for every pending pair)
+        """
+        while True:
+            if pending:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            else:
+                # Nothing left to wait for; only take what has already arrived
+                timeout = 0.0
+            try:
+                pair_id, (status, result) = self._results.get(timeout=timeout)
+            except queue.Empty:
+                return
+            if pair_id in pending:
+                pending.discard(pair_id)
+                if pair_id in self.finders:
+                    statuses[pair_id] = status
+            else:
+                logger.info(f"Recording the late result of {pair_id}")
+            if result is not None:
+                self._record_result(pair_id, result)
+
+    def _record_result(self, pair_id, result):
+        """Store a check result and hand it to the result listeners."""
+        if pair_id in self.finders:
+            # A pair removed by a config reload while being checked keeps no latest result
+            self.results[pair_id] = result
+        self.alerts.extend(result['alerts'])
+        self.events.extend(result['events'])
+        for listener in self.result_listeners:
+            try:
+                listener(result)
+            except Exception as e:
+                logger.error(f"Error publishing result for {pair_id}: {e}")
+
+    def build_snapshot(self):
+        """
+        Build a read-only snapshot of the tracker's latest state.
+
+        Returns:
+            dict: Latest quotes, spreads and opportunities per pair plus health information
+        """
+        now = time.time()
+        pairs = {}
+        opportunities = []
+        venue_last_seen = {}
+        pairs_ok = 0
+
+        for pair_id, finder in self.finders.items():
+            status = self.statuses.get(pair_id, STATUS_TIMEOUT)
+            if status == STATUS_OK:
+                pairs_ok += 1
+            result = self.results.get(pair_id)
+            quotes = [quote.to_dict() for quote in finder.quotes if quote.is_valid()]
+            for quote in quotes:
+                venue = quote['venue']
+                if quote['receive_ts'] > venue_last_seen.get(venue, 0):
+                    venue_last_seen[venue] = quote['receive_ts']
+            pairs[pair_id] = {
+                'status': status,
+                'timestamp': result['timestamp'] if result else None,
+                'quotes': quotes,
+                'spreads': result['spreads'] if result else [],
+                'opportunities': result['opportunities'] if result else [],
+                'bbo': result['bbo'] if result else None,
+            }
+            if result:
+                for opportunity in result['opportunities']:
+                    opportunities.append(dict(opportunity, pair=pair_id))
+
+        if pairs_ok == len(self.finders):
+            health_status = "ok"
+        elif pairs_ok:
+            health_status = "degraded"
+        else:
+            health_status = "down"
+
+        return {
+            'generated_at': now,
+            'tick': self.ticks,
+            'pairs': pairs,
+            'opportunities': opportunities,
+            'health': {
+                'status': health_status,
+                'uptime_seconds': now - self.started_at,
+                'pairs_ok': pairs_ok,
+                'pairs_total': len(self.finders),
+                'venues': {
+                    venue: {'last_quote_age_seconds': now - last_seen}
+                    for venue, last_seen in venue_last_seen.items()
+                },
+                'schedule': self.scheduler.stats() if self.scheduler is not None else None,
+                'memory': self.memory_budget.stats() if self.memory_budget is not None else None,
+            },
+        }
+
+    def set_sampler(self, sampler):
+        """
+        Check pairs adaptively instead of all of them on every tick.
+
+        Args:
+            sampler (AdaptiveSampler): The sampler; ticks should run at its min_interval
+        """
+        self.sampler = sampler
+        now = time.monotonic()
+        for pair_id in self.finders:
+            sampler.add(pair_id, now)
+
+    def publish_snapshot(self):
+        """Rebuild the snapshot and hand it to every listener."""
+        self.snapshot = self.build_snapshot()
+        for listener in self.snapshot_listeners:
+            try:
+                listener(self.snapshot)
+            except Exception as e:
+                logger.error(f"Error publishing tracker snapshot: {e}")
+
+    def exit_code(self):
+        """
+        Return the exit status for the most recent tick.
+
+        Returns:
+            int: EXIT_OK, EXIT_PARTIAL or EXIT_FAILED
+        """
+        ok = sum(1 for status in self.statuses.values() if status == STATUS_OK)
+        if ok == len(self.finders):
+            return EXIT_OK
+        if ok == 0:
+            return EXIT_FAILED
+        return EXIT_PARTIAL
+
+    def run_for(self, duration, interval_seconds, deadline_seconds=None):
+        """
+        Check every pair repeatedly for a fixed duration, then return.
+
+        A duration of zero performs a single check. The whole run, including
+        the last check, finishes within `deadline_seconds` (defaults to the
+        duration plus one interval).
+
+        Args:
+            duration (float): How long to keep checking, in seconds
+            interval_seconds (float): Time between checks in seconds
+            deadline_seconds (float): Hard limit for the whole run, in seconds
+
+        Returns:
+            int: The exit status (see exit_code)
+        """
+        exit_on_sigterm()
+        scheduler = self.make_scheduler(interval_seconds)
+        started = time.monotonic()
+        if deadline_seconds is None:
+            deadline_seconds = duration + interval_seconds
+        hard_deadline = started + deadline_seconds
+        stop_at = started + duration
+
+        while True:
+            tick = scheduler.wait()
+            if self.config_watcher is not None:
+                try:
+                    self.config_watcher.poll()
+                except Exception as e:
+                    logger.error(f"Error applying config changes: {e}")
+            self.check_all(deadline=min(hard_deadline, scheduler.next_deadline()) if duration else hard_deadline)
+            next_tick = scheduler.next_deadline()
+            if next_tick > stop_at or next_tick >= hard_deadline:
+                break
+            logger.debug(f"Tick {tick.index} started {tick.lateness * 1000:.1f} ms late")
+
+        # Record results that finished after the last tick's deadline
+        self._collect_results(set(), {}, deadline=time.monotonic())
+        return self.exit_code()
+
+    def make_scheduler(self, interval_seconds, sleep=time.sleep):
+        """Create the fixed-rate scheduler used by run() and run_for()."""
+        self.scheduler = FixedRateScheduler(
+            interval_seconds,
+            jitter=getattr(config, 'SCHEDULE_JITTER', 0.0),
+            overrun_policy=getattr(config, 'OVERRUN_POLICY', 'skip'),
+            sleep=sleep
+        )
+        return self.scheduler
+
+    def summary(self, started_at=None):
+        """
+        Build a machine-readable summary of the run.
+
+        Args:
+            started_at (datetime): When the run started
+
+        Returns:
+            dict: Quotes, spreads, opportunities and alerts per pair
+        """
+        quote_cache = get_quote_cache()
+        # The HTTP market data client is shared by every finder, so latency is reported per venue
+        market_data = next((finder.market_data for finder in self.finders.values()
+                            if finder.market_data is not None), None)
+        pairs = {}
+        opportunities = []
+        for pair_id, finder in self.finders.items():
+            result = self.results.get(pair_id)
+            entry = {'status': self.statuses.get(pair_id, STATUS_TIMEOUT)}
+            entry['unchanged_checks'] = finder.unchanged_checks
+            if result is not None:
+                entry.update({
+                    'timestamp': result['timestamp'],
+                    'quotes': result['quotes'],
+                    'spreads': result['spreads'],
+                    'opportunities': result['opportunities'],
+                    'bbo': result['bbo'],
+                })
+                for opportunity in result['opportunities']:
+                    opportunities.append(dict(opportunity, pair=pair_id))
+            pairs[pair_id] = entry
+
+        return {
+            'started_at': started_at.isoformat() if started_at else None,
+            'finished_at': datetime.now().isoformat(),
+            'ticks': self.ticks,
+            'threshold_percent': self.threshold_percent,
+            'exit_code': self.exit_code(),
+            'schedule': self.scheduler.stats() if self.scheduler is not None else None,
+            'sampling': self.sampler.stats() if self.sampler is not None else None,
+            'quote_cache': quote_cache.stats() if quote_cache is not None else None,
+            'latency': market_data.latency_stats() if market_data is not None else None,
+            'memory': self.memory_budget.stats() if self.memory_budget is not None else None,
+            'pairs': pairs,
+            'opportunities': opportunities,
+            'events': list(self.events),
+            'alerts': list(self.alerts),
+        }
+
+    def write_summary(self, path, started_at=None):
+        """Write the run summary as JSON."""
+        with open(path, 'wb') as f:
+            f.write(json_utils.dumps(self.summary(started_at)))
+        logger.info(f"Wrote run summary to {path}")
+
+    def restore_state(self, state_file):
+        """Load the warm-start snapshot for every pair."""
+        self.state_file = state_file
+        if state_file:
+            restore_snapshot(state_file, self.finders.values(), getattr(config, 'STATE_MAX_AGE', None))
+
+    def save_state(self, state_file):
+        """Write the warm-start snapshot for every pair."""
+        if state_file:
+            try:
+                save_snapshot(state_file, self.finders.values())
+            except Exception as e:
+                logger.error(f"Error saving state snapshot: {e}")
+
+    def add_pair(self, symbol, base_currency):
+        """
+        Start tracking a pair, warm-starting it from the state snapshot if there is one.
+
+        Args:
+            symbol (str): Cryptocurrency symbol
+            base_currency (str): Base currency
+
+        Returns:
+            PriceDiscrepancyFinder: The new finder
+        """
+        finder = PriceDiscrepancyFinder(symbol=symbol, base_currency=base_currency,
+                                        threshold_percent=self.threshold_percent)
+        if self.state_file:
+            restore_snapshot(self.state_file, [finder], getattr(config, 'STATE_MAX_AGE', None))
+        self.finders[finder.pair_id] = finder
+        if self.sampler is not None:
+            self.sampler.add(finder.pair_id, time.monotonic())
+        logger.info(f"Added pair {finder.pair_id}")
+        return finder
+
+    def remove_pair(self, pair_id):
+        """
+        Stop tracking a pair.
+
+        Its warm-start state is written first so that adding it back later
+        does not start cold, and the finder's own connections are closed.
+
+        Args:
+            pair_id (str): The pair id ("SYMBOL/BASE")
+        """
+        finder = self.finders.get(pair_id)
+        if finder is None:
+            return
+        if self.state_file:
+            try:
+                save_snapshot(self.state_file, [finder])
+            except Exception as e:
+                logger.error(f"Error saving state snapshot for {pair_id}: {e}")
+        del self.finders[pair_id]
+        if self.sampler is not None:
+            self.sampler.remove(pair_id)
+        self.results.pop(pair_id, None)
+        self.statuses.pop(pair_id, None)
+        self._paused_until.pop(pair_id, None)
+        try:
+            finder.close()
+        except Exception as e:
+            logger.error(f"Error closing connections for {pair_id}: {e}")
+        logger.info(f"Removed pair {pair_id}")
+
+    def configured_pairs(self):
+        """Return the (symbol, base_currency) pairs the current config asks for."""
+        pairs = getattr(config, 'PAIRS', [])
+        if pairs:
+            return parse_pairs(pairs)
+        return [(config.SYMBOL.upper(), config.BASE_CURRENCY.upper())]
+
+    def apply_config(self, changes):
+        """
+        Apply reloaded config settings in place.
+
+        Only what changed is touched: pairs are added or removed individually,
+        and the finders of unchanged pairs keep their clients, quotes,
+        statistics and alert cooldowns.
+
+        Args:
+            changes (dict): Setting name -> new value, for the settings that changed
+        """
+        if 'PAIRS' in changes or 'SYMBOL' in changes or 'BASE_CURRENCY' in changes:
+            self._apply_pairs()
+        self._apply_schedule(changes)
+        self._apply_finder_settings(changes)
+        self._apply_resources(changes)
+
+    def _apply_pairs(self):
+        """Add and remove pairs to match the reloaded PAIRS setting."""
+        try:
+            wanted = self.configured_pairs()
+        except ValueError as e:
+            logger.error(f"Ignoring invalid PAIRS setting: {e}")
+            return
+        wanted_ids = [f"{symbol}/{base}" for symbol, base in wanted]
+        for pair_id in [pair_id for pair_id in self.finders if pair_id not in wanted_ids]:
+            self.remove_pair(pair_id)
+        for (symbol, base), pair_id in zip(wanted, wanted_ids):
+            if pair_id not in self.finders:
+                self.add_pair(symbol, base)
+
+    def _apply_schedule(self, changes):
+        """Apply reloaded check interval and jitter settings to the scheduler or sampler."""
+        if 'CHECK_INTERVAL' in changes and self.sampler is not None:
+            # Under adaptive sampling CHECK_INTERVAL is the interval of the coldest pairs
+            self.sampler.max_interval = max(config.CHECK_INTERVAL, self.sampler.min_interval)
+            logger.info(f"Maximum check interval set to {self.sampler.max_interval} seconds")
+        elif 'CHECK_INTERVAL' in changes and self.scheduler is not None:
+            self.scheduler.set_interval(config.CHECK_INTERVAL)
+            logger.info(f"Check interval set to {config.CHECK_INTERVAL} seconds")
+
+        if 'SCHEDULE_JITTER' in changes and self.scheduler is not None:
+            self.scheduler.jitter = config.SCHEDULE_JITTER
+
+    def _apply_finder_settings(self, changes):
+        """Apply reloaded threshold, exchange, latency and alert settings to every finder."""
+        if 'THRESHOLD_PERCENT' in changes:
+            self.threshold_percent = config.THRESHOLD_PERCENT
+            for finder in self.finders.values():
+                finder.threshold_percent = config.THRESHOLD_PERCENT
+                finder.lifecycle.set_threshold(config.THRESHOLD_PERCENT)
+            logger.info(f"Arbitrage threshold set to {config.THRESHOLD_PERCENT}%")
+
+        if 'EXCHANGES' in changes:
+            for finder in self.finders.values():
+                finder.ensure_clients()
+            logger.info(f"Enabled exchanges: {', '.join([k for k, v in config.EXCHANGES.items() if v])}")
+
+        if 'VENUE_BUDGETS' in changes or 'HEDGE_REQUESTS' in changes or 'HEDGE_QUANTILE' in changes:
+            for finder in self.finders.values():
+                finder.load_latency_settings()
+
+        if any(key.startswith(('ALERT_', 'ZSCORE_')) for key in changes):
+            for finder in self.finders.values():
+                finder.load_alert_settings()
+
+    def _apply_resources(self, changes):
+        """Apply reloaded quote cache and memory budget settings."""
+        if 'QUOTE_CACHE_TTL' in changes or 'QUOTE_CACHE_MAX_ENTRIES' in changes:
+            quote_cache = get_quote_cache()
+            for finder in self.finders.values():
+                finder.quote_cache = quote_cache
+
+        if 'MEMORY_LIMIT_MB' in changes and self.memory_budget is not None:
+            limit_mb = config.MEMORY_LIMIT_MB
+            self.memory_budget.limit = limit_mb * 1024 * 1024 if limit_mb else None
+            logger.info(f"Memory budget set to {limit_mb} MB")
+
+    def run(self, interval_seconds=config.CHECK_INTERVAL, state_file=getattr(config, 'STATE_FILE', None),
+            stop_event=None):
+        """
+        Check every pair at regular intervals until interrupted.
+
+        Args:
+            interval_seconds (int): Time between checks in seconds
+            state_file (str): Warm-start snapshot to load on startup and write on exit (None disables it)
+            stop_event (threading.Event): Stops the loop after the current tick when set, for callers
+                running the tracker on another thread
+        """
+        logger.info(f"Starting tracker for {len(self.finders)} pair(s), checking every {interval_seconds} seconds")
+        self.restore_state(state_file)
+        exit_on_sigterm()
+
+        if stop_event is None:
+            stop_event = threading.Event()
+        # Waiting on the event lets a stop request cut the sleep between ticks short
+        scheduler = self.make_scheduler(interval_seconds, sleep=stop_event.wait)
+        try:
+            while not stop_event.is_set():
+                tick = scheduler.wait()
+                if stop_event.is_set():
+                    break
+                if self.config_watcher is not None:
+                    try:
+                        self.config_watcher.poll()
+                    except Exception as e:
+                        logger.error(f"Error applying config changes: {e}")
+                logger.info(f"Checking prices for {', '.join(self.finders)}...")
+                if tick.lateness > 1.0:
+                    logger.warning(f"Tick {tick.index} started {tick.lateness:.2f}s late")
+                # Give slow pairs until the next tick before reporting them as timed out
+                self.check_all(deadline=scheduler.next_deadline())
+        except KeyboardInterrupt:
+            logger.info("Tracker stopped by user")
+        except Exception as e:
+            logger.error(f"Unexpected error: {e}")
+        finally:
+            self.save_state(state_file)
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+
+"""
+Universe scanner for the Cross-Exchange Price Discrepancy Finder.
+
+Instead of checking hand-picked pairs, the scanner pulls the full market
+list and an all-ticker snapshot from each exchange, intersects them into
+the set of (symbol, quote) markets listed on more than one venue, and ranks
+the whole universe by spread in a single pass.
+
+A full scan costs four requests: one market list and one bulk ticker per
+exchange. CoinGecko is a reference price source without a market list, so
+it does not take part in the scan. Exchanges disabled in config.EXCHANGES
+are left out of the scan as well.
+"""
+
+import heapq
+import logging
+import time
+from exchange_http import MarketDataClient
+from fixed_point import SCALES
+from quote import QuoteBatch, VENUE_BINANCE, VENUE_KRAKEN, VENUE_NAMES, VENUE_KEYS, make_pair_id
+import config
+
+logger = logging.getLogger(__name__)
+
+# Common precision (decimals) that midpoints in ticks are brought to before comparing venues
+RANK_DECIMALS = 12
+
+# Exchanges with a market list and a bulk ticker
+SCAN_VENUES = (VENUE_BINANCE, VENUE_KRAKEN)
+
+# Kraken uses legacy asset codes for some assets in its websocket names
+KRAKEN_ASSET_ALIASES = {
+    'XBT': 'BTC',
+    'XDG': 'DOGE',
+}
+
+
+def normalize_kraken_asset(asset):
+    """
+    Convert a Kraken asset code to the common symbol used by other exchanges.
+
+    Args:
+        asset (str): The Kraken asset code (e.g., 'XBT')
+
+    Returns:
+        str: The common symbol (e.g., 'BTC')
+    """
+    return KRAKEN_ASSET_ALIASES.get(asset, asset)
+
+
+class UniverseScanner:
+    """Discovers markets listed on multiple exchanges and ranks them by spread."""
+
+    def __init__(self, client=None, min_venues=2):
+        """
+        Initialize the scanner.
+
+        Args:
+            client (MarketDataClient): Market data client to use (a new one is created if omitted)
+            min_venues (int): Minimum number of venues a market must be listed on
+        """
+        self.client = client if client is not None else MarketDataClient()
+        self.min_venues = min_venues
+        # pair id -> {venue id: venue market name}
+        self.markets = {}
+        # Venues the markets were discovered on
+        self.venues = ()
+        # venue market name -> pair id, per venue, used to filter the bulk tickers
+        self.pair_ids = {VENUE_BINANCE: {}, VENUE_KRAKEN: {}}
+        self.batch = QuoteBatch(capacity=4096)
+        # pair id -> ranking tuple (or None), recomputed only for pairs whose quotes changed
+        self._spreads = {}
+
+    def enabled_venues(self):
+        """Return the scannable venues enabled in config.EXCHANGES."""
+        return tuple(venue for venue in SCAN_VENUES if config.EXCHANGES.get(VENUE_KEYS[venue], False))
+
+    def discover(self, venues=SCAN_VENUES):
+        """
+        Fetch each exchange's market list and keep the markets listed on enough venues.
+
+        Args:
+            venues (tuple): Venue ids to scan (a subset of SCAN_VENUES)
+
+        Returns:
+            dict: pair id -> {venue id: venue market name}
+        """
+        listings = {}
+        # (venue id, venue market name) -> price decimals
+        decimals = {}
+
+        markets = self.client.binance_markets() if VENUE_BINANCE in venues else ()
+        for symbol, base_asset, quote_asset, price_decimals in markets:
+            pair = make_pair_id(base_asset, quote_asset)
+            listings.setdefault(pair, {})[VENUE_BINANCE] = symbol
+            decimals[(VENUE_BINANCE, symbol)] = price_decimals
+
+        asset_pairs = self.client.kraken_asset_pairs() if VENUE_KRAKEN in venues else {}
+        for key, info in asset_pairs.items():
+            # Dark pool pairs (".d" suffix) have no websocket name and are not comparable
+            wsname = info.get('wsname')
+            if not wsname or '/' not in wsname:
+                continue
+            base_asset, quote_asset = wsname.split('/', 1)
+            pair = make_pair_id(normalize_kraken_asset(base_asset), normalize_kraken_asset(quote_asset))
+            listings.setdefault(pair, {})[VENUE_KRAKEN] = key
+            decimals[(VENUE_KRAKEN, key)] = info.get('pair_decimals')
+
+        self.venues = tuple(venues)
+        self.markets = {pair: listed for pair, listed in listings.items() if len(listed) >= self.min_venues}
+        self.pair_ids = {VENUE_BINANCE: {}, VENUE_KRAKEN: {}}
+        for pair, listed in self.markets.items():
+            for venue, market in listed.items():
+                self.pair_ids[venue][market] = pair
+                # Slots with known decimals also keep their prices as exact ticks
+                self.batch.set_decimals(self.batch.slot(venue, pair), decimals.get((venue, market)))
+        self._spreads = {}
+        self.batch.dirty.update(self.markets)
+
+        logger.info(f"Discovered {len(self.markets)} markets listed on at least {self.min_venues} exchanges")
+        return self.markets
+
+    def refresh(self):
+        """
+        Pull one all-ticker snapshot per exchange into the scanner's QuoteBatch.
+
+        Returns:
+            int: The number of markets written
+        """
+        written = 0
+        if VENUE_BINANCE in self.venues:
+            written += self.client.binance_quotes(self.batch, self.pair_ids[VENUE_BINANCE])
+        if VENUE_KRAKEN in self.venues:
+            written += self.client.kraken_quotes(self.batch, self.pair_ids[VENUE_KRAKEN])
+        return written
+
+    def rank(self, top=None, threshold_percent=None):
+        """
+        Rank every discovered market by cross-exchange spread in one pass.
+
+        Spreads compare bid/ask midpoints so that Binance's book ticker (which
+        has no last price) and Kraken's ticker are measured the same way.
+        Midpoints are compared as integer ticks (bid + ask, brought to a
+        common precision), so the ordering and spread numerator are exact.
+        Only pairs with a changed quote since the previous ranking are
+        recomputed; the others reuse their cached spread.
+
+        Args:
+            top (int): Only return the N widest spreads
+            threshold_percent (float): Only return spreads at or above this percentage
+
+        Returns:
+            list: Result dictionaries sorted by spread, widest first
+        """
+        batch = self.batch
+        bids = batch.bid
+        asks = batch.ask
+        bid_ticks = batch.bid_ticks
+        ask_ticks = batch.ask_ticks
+        slot_decimals = batch.decimals
+        spreads = self._spreads
+        markets = self.markets
+
+        for pair in batch.dirty:
+            venues = markets.get(pair)
+            if venues is None:
+                continue
+            spreads[pair] = None
+            low_venue = high_venue = None
+            low_price = high_price = None
+            low_key = high_key = None
+            for venue in venues:
+                index = batch.find(venue, pair)
+                if index is None:
+                    continue
+                price = (bids[index] + asks[index]) / 2
+                if not price > 0:
+                    continue
+                decimals = slot_decimals[index]
+                if 0 <= decimals <= RANK_DECIMALS:
+                    # Twice the midpoint, in ticks of the common precision
+                    key = (bid_ticks[index] + ask_ticks[index]) * SCALES[RANK_DECIMALS - decimals]
+                else:
+                    key = 2 * price * SCALES[RANK_DECIMALS]
+                if low_key is None or key < low_key:
+                    low_venue, low_price, low_key = venue, price, key
+                if high_key is None or key > high_key:
+                    high_venue, high_price, high_key = venue, price, key
+
+            if low_venue is None or low_venue == high_venue:
+                continue
+
+            spread_percent = 200.0 * (high_key - low_key) / (high_key + low_key)
+            spreads[pair] = (spread_percent, pair, low_venue, low_price, high_venue, high_price)
+        batch.dirty.clear()
+
+        results = [
+            entry for entry in spreads.values()
+            if entry is not None and (threshold_percent is None or entry[0] >= threshold_percent)
+        ]
+
+        if top is not None:
+            ranked = heapq.nlargest(top, results)
+        else:
+            ranked = sorted(results, reverse=True)
+
+        return [
+            {
+                'pair': pair,
+                'spread_percent': spread_percent,
+                'buy_exchange': VENUE_NAMES[buy_venue],
+                'buy_price': buy_price,
+                'sell_exchange': VENUE_NAMES[sell_venue],
+                'sell_price': sell_price,
+            }
+            for spread_percent, pair, buy_venue, buy_price, sell_venue, sell_price in ranked
+        ]
+
+    def scan(self, top=None, threshold_percent=None):
+        """
+        Run a full scan: discover markets (once), refresh tickers and rank.
+
+        Only exchanges enabled in config.EXCHANGES are scanned; markets are
+        discovered again if that set changed since the last scan.
+
+        Args:
+            top (int): Only return the N widest spreads
+            threshold_percent (float): Only return spreads at or above this percentage
+
+        Returns:
+            list: Result dictionaries sorted by spread, widest first
+        """
+        venues = self.enabled_venues()
+        if len(venues) < self.min_venues:
+            logger.warning(f"Scanning needs at least {self.min_venues} of "
+                           f"{', '.join(VENUE_NAMES[venue] for venue in SCAN_VENUES)} enabled in EXCHANGES")
+            return []
+        if not self.markets or venues != self.venues:
+            self.discover(venues)
+
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        self.refresh()
+        results = self.rank(top=top, threshold_percent=threshold_percent)
+        logger.info(
+            f"Scanned {len(self.markets)} markets in {time.perf_counter() - started:.2f}s "
+            f"({(time.process_time() - cpu_started) * 1000:.0f} ms CPU)"
+        )
+        return results
+
+
+def print_scan_results(results):
+    """Print scan results as a table."""
+    print("\n" + "=" * 80)
+    print("  CROSS-EXCHANGE UNIVERSE SCAN")
+    print("=" * 80)
+    print(f"{'Pair':<14}{'Spread':>9}  {'Buy on':<10}{'Price':>16}  {'Sell on':<10}{'Price':>16}")
+    print("-" * 80)
+    for result in results:
+        print(
+            f"{result['pair']:<14}{result['spread_percent']:>8.3f}%  "
+            f"{result['buy_exchange']:<10}{result['buy_price']:>16.8g}  "
+            f"{result['sell_exchange']:<10}{result['sell_price']:>16.8g}"
+        )
+    print()